@@ -14,24 +14,14 @@ Out of scope: hard-suspend, monitoring, admin password gate, password hashing.
 """
 from __future__ import annotations
 
-import os
-
 from fastapi import APIRouter, Depends, Form, Request
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 
-from api.database import ENVIRONMENT, SessionLocal
+from api.database import SessionLocal
 from api.models import User, AllowedUser, TabGroup
-from api.permissions import allowed_tabs_for, parse_tab_keys, require_admin
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-
-# Jinja2 env for admin templates. Must register allowed_tabs_for because
-# base.html (which admin_00.html extends) calls it to render the top bar.
-templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
-templates.env.globals["allowed_tabs_for"] = allowed_tabs_for
-templates.env.globals["ENVIRONMENT"] = ENVIRONMENT
+from api.permissions import invalidate_tab_cache, parse_tab_keys, require_admin
+from api.templating import templates
 
 # Canonical tab definitions (key, label) — single source of truth for the
 # tab_group checkbox editor. Order matches the top bar in base.html; 'admin'
@@ -101,7 +91,7 @@ def _render_admin(request: Request, db: Session,
 
 
 @router.get("/admin/")
-async def admin_home(request: Request, db: Session = Depends(get_db)):
+def admin_home(request: Request, db: Session = Depends(get_db)):
     guard = require_admin(request)
     if guard:
         return guard
@@ -111,7 +101,7 @@ async def admin_home(request: Request, db: Session = Depends(get_db)):
 # ----------------------- Allowed Users -----------------------
 
 @router.post("/admin/allowed_users/add/")
-async def allowed_users_add(request: Request,
+def allowed_users_add(request: Request,
                             username: str = Form(...),
                             email: str = Form(...),
                             password: str = Form(...),
@@ -135,7 +125,7 @@ async def allowed_users_add(request: Request,
 
 
 @router.post("/admin/allowed_users/edit/")
-async def allowed_users_edit(request: Request,
+def allowed_users_edit(request: Request,
                              row_id: int = Form(...),
                              username: str = Form(...),
                              email: str = Form(...),
@@ -168,7 +158,7 @@ async def allowed_users_edit(request: Request,
 
 
 @router.post("/admin/allowed_users/delete/")
-async def allowed_users_delete(request: Request,
+def allowed_users_delete(request: Request,
                                row_id: int = Form(...),
                                db: Session = Depends(get_db)):
     guard = require_admin(request)
@@ -184,7 +174,7 @@ async def allowed_users_delete(request: Request,
 # ----------------------- Users -----------------------
 
 @router.post("/admin/users/set_group/")
-async def users_set_group(request: Request,
+def users_set_group(request: Request,
                           user_id: int = Form(...),
                           tab_group: str = Form(""),
                           db: Session = Depends(get_db)):
@@ -208,13 +198,14 @@ async def users_set_group(request: Request,
                                  message_color="#f00")
     user.tab_group = new_group  # '' clears => default deny (soft-suspend)
     db.commit()
+    invalidate_tab_cache(user.username)
     return RedirectResponse(url="/admin/", status_code=303)
 
 
 # ----------------------- Tab Groups -----------------------
 
 @router.post("/admin/tab_group/add/")
-async def tab_group_add(request: Request,
+def tab_group_add(request: Request,
                         group_key: str = Form(...),
                         group_name: str = Form(""),
                         tabs: list[str] = Form(default=[]),
@@ -231,6 +222,8 @@ async def tab_group_add(request: Request,
         db.add(TabGroup(group_key=key, group_name=group_name.strip(),
                         tab_keys=build_tab_keys(tabs)))
         db.commit()
+        # Users already pointing at this key were cached as 'no tabs'.
+        invalidate_tab_cache()
     except Exception as e:
         db.rollback()
         return _render_admin(request, db, message=f"Add failed: {e}", message_color="#f00")
@@ -238,7 +231,7 @@ async def tab_group_add(request: Request,
 
 
 @router.post("/admin/tab_group/edit/")
-async def tab_group_edit(request: Request,
+def tab_group_edit(request: Request,
                          row_id: int = Form(...),
                          group_name: str = Form(""),
                          tabs: list[str] = Form(default=[]),
@@ -262,11 +255,12 @@ async def tab_group_edit(request: Request,
     group.group_name = group_name.strip()
     group.tab_keys = new_keys
     db.commit()
+    invalidate_tab_cache()
     return RedirectResponse(url="/admin/", status_code=303)
 
 
 @router.post("/admin/tab_group/delete/")
-async def tab_group_delete(request: Request,
+def tab_group_delete(request: Request,
                            row_id: int = Form(...),
                            db: Session = Depends(get_db)):
     guard = require_admin(request)
@@ -289,4 +283,5 @@ async def tab_group_delete(request: Request,
                              message_color="#f00")
     db.delete(group)
     db.commit()
+    invalidate_tab_cache()
     return RedirectResponse(url="/admin/", status_code=303)
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, MetaData, Sequence
+from sqlalchemy import create_engine, event, make_url, Column, Integer, String, MetaData, Sequence
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 # from fastapi import FastAPI, Depends, Request, Form, Query, HTTPException
@@ -13,7 +13,13 @@ def get_database_path():
     Get the appropriate database path based on environment.
     Local: ./test.db (in project directory)
     Render: /var/data/test.db (persistent disk)
+    DATABASE_PATH, when set, overrides both (the test suite points it at a
+    copy, so WAL mode and test writes never touch the checked-in test.db).
     """
+    override = os.getenv("DATABASE_PATH")
+    if override:
+        return override
+
     # Check if we're running on Render
     is_render = bool(os.getenv("RENDER"))
     
@@ -53,12 +59,90 @@ print(f"Database path: {db_path}")
 print(f"Database URL: {DATABASE_URL}")
 print(f"Database exists: {os.path.exists(db_path)}")
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False, "timeout": 30}
+# Per-connection SQLite settings, applied on every new DBAPI connection.
+#   journal_mode=WAL   readers no longer block on (or block) a writer; the mode
+#                      is persistent in the file, re-issuing it is a no-op.
+#                      Not for the checked-in test.db (see TRACKED_DB_PATH).
+#   synchronous=NORMAL safe with WAL (a power cut can lose the last commits,
+#                      never corrupt the file) and avoids an fsync per commit.
+#   cache_size         negative = KiB of page cache per connection (32 MiB).
+#   mmap_size          read pages through the OS page cache (256 MiB).
+#   temp_store=MEMORY  sorts / temp b-trees stay off disk.
+#   busy_timeout       wait up to 30 s for a lock instead of failing at once.
+# Same WAL / synchronous / busy_timeout settings as translator_on_drawings'
+# pipeline._connect().
+SQLITE_PRAGMAS = (
+    ("synchronous", "NORMAL"),
+    ("cache_size", "-32000"),
+    ("mmap_size", "268435456"),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", "30000"),
 )
 
+# Connection pool: FastAPI runs the get_db dependency in its worker threadpool
+# (40 threads), so keep enough pooled connections that requests don't queue
+# for one; overflow connections are closed when returned.
+POOL_SIZE = 10
+MAX_OVERFLOW = 20
+POOL_TIMEOUT = 30
+
+
+# The local development DB is tracked in git. WAL mode is recorded in the file
+# header, so running it in WAL would leave test.db modified after any local run
+# (uvicorn, a migration script, a plain import); it keeps the default rollback
+# journal. Every other database, the deployed /var/data/test.db included, gets WAL.
+TRACKED_DB_PATH = os.path.realpath(os.path.join(os.path.dirname(__file__), '..', 'test.db'))
+
+
+def uses_wal(database_url: str) -> bool:
+    """Whether create_app_engine() runs this database in WAL mode."""
+    database = make_url(database_url).database
+    return bool(database) and database != ":memory:" \
+        and os.path.realpath(database) != TRACKED_DB_PATH
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None, wal=True):
+    """'connect' event hook: apply SQLITE_PRAGMAS to a new sqlite3 connection,
+    and journal_mode=WAL when wal (DELETE otherwise, which also undoes WAL
+    left in the file by an older version)."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}")
+        for name, value in SQLITE_PRAGMAS:
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def create_app_engine(database_url: str):
+    """Create the main app engine (used at import and by /upload_db/)."""
+    new_engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False, "timeout": 30},
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+    )
+    wal = uses_wal(database_url)
+    event.listen(new_engine, "connect",
+                 lambda dbapi_connection, connection_record: apply_sqlite_pragmas(
+                     dbapi_connection, connection_record, wal=wal))
+    return new_engine
+
+
+def checkpoint_wal(target_engine) -> None:
+    """Fold the WAL back into the main file and truncate it.
+
+    Call before copying or serving the .db file: with WAL, recent commits live
+    in test.db-wal until a checkpoint, so a plain file copy could miss them.
+    """
+    with target_engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+# Create SQLAlchemy engine
+engine = create_app_engine(DATABASE_URL)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -10,9 +10,9 @@ time (e.g. 08:00 in UTC+8).
 """
 from __future__ import annotations
 
-from zoneinfo import ZoneInfo
+from datetime import date
 
-import pandas as pd
+from api.local_time import utc_to_local_fields
 
 
 def edit_form_time_fields(item, time_zone: str):
@@ -34,13 +34,11 @@ def edit_form_time_fields(item, time_zone: str):
             item.repeat_end_time or "00:00",
         )
 
-    # Regular task: convert the stored UTC datetimes to the viewer's local time.
-    utc_start_datetime = pd.Timestamp(item.start_datetime).tz_localize("UTC")
-    utc_end_datetime = pd.Timestamp(item.end_datetime).tz_localize("UTC")
-    local_start_datetime = utc_start_datetime.astimezone(ZoneInfo(time_zone))
-    local_end_datetime = utc_end_datetime.astimezone(ZoneInfo(time_zone))
+    # Regular task: convert the stored UTC datetimes to the viewer's local time,
+    # through the same conversion the schedule grid uses.
+    local = utc_to_local_fields([item.start_datetime], [item.end_datetime], time_zone)
     return (
-        local_start_datetime.date(),
-        local_start_datetime.time().strftime("%H:%M"),
-        local_end_datetime.time().strftime("%H:%M"),
+        date.fromisoformat(local["local_start_date"][0]),
+        local["local_start_time"][0],
+        local["local_end_time"][0],
     )
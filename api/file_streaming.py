@@ -0,0 +1,174 @@
+"""File downloads with byte ranges, conditional requests and cache headers.
+
+RangeFileResponse is a FileResponse that also answers:
+
+- Range: bytes=a-b / a- / -n with 206 Partial Content (416 when the range
+  starts past the end), so players can seek and clients can resume. A
+  request for several ranges gets the whole file, which RFC 9110 allows.
+- If-Range, If-None-Match and If-Modified-Since against the ETag and
+  Last-Modified that FileResponse derives from the file's stat, with 304
+  Not Modified when the client's copy is current.
+- Cache-Control, from the route: long-lived for files that do not change
+  under their URL, "no-cache" (revalidate every time) for ones that do.
+
+The body goes out through the ASGI "http.response.zerocopysend" extension
+(os.sendfile in the server) when the server offers it; otherwise it is read
+in chunks on a worker thread, only the requested span.
+"""
+from __future__ import annotations
+
+import os
+import stat
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import anyio
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+# Cache-Control values for the routes that serve files.
+CACHE_IMMUTABLE = "private, max-age=31536000, immutable"  # content fixed for the URL's lifetime
+CACHE_LONG = "private, max-age=2592000"  # 30 days, then revalidate by ETag
+CACHE_REVALIDATE = "private, no-cache"  # always revalidate; 304 while unchanged
+
+CHUNK_SIZE = 256 * 1024
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """(start, end) inclusive for a single "bytes=" range, clamped to size.
+
+    None when the header should be ignored (not bytes, malformed, several
+    ranges); (size, size - 1) when it is unsatisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:  # suffix: the last n bytes
+            length = int(last)
+            if length <= 0:
+                return (size, size - 1)
+            return (max(0, size - length), size - 1)
+        start = int(first)
+        end = int(last) if last else None
+    except ValueError:
+        return None
+    if start < 0 or (end is not None and end < start):
+        return None
+    if start >= size:
+        return (size, size - 1)
+    return (start, size - 1 if end is None else min(end, size - 1))
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match uses."""
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in header.split(","))
+
+
+def _not_modified_since(header: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return since is not None and since.timestamp() >= int(mtime)
+
+
+class RangeFileResponse(FileResponse):
+    chunk_size = CHUNK_SIZE
+
+    def __init__(self, path, *, cache_control: str = CACHE_REVALIDATE, **kwargs) -> None:
+        super().__init__(path, **kwargs)
+        self.headers["cache-control"] = cache_control
+        self.headers["accept-ranges"] = "bytes"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            st = await anyio.to_thread.run_sync(os.stat, self.path)
+        except FileNotFoundError:
+            raise RuntimeError(f"File at path {self.path} does not exist.")
+        if not stat.S_ISREG(st.st_mode):
+            raise RuntimeError(f"File at path {self.path} is not a file.")
+        self.set_stat_headers(st)
+
+        request_headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        method = scope["method"].upper()
+        etag, size = self.headers["etag"], st.st_size
+
+        byte_range = None
+        if method == "GET" and "range" in request_headers and self._if_range_holds(
+                request_headers.get("if-range"), etag, st.st_mtime):
+            byte_range = parse_range(request_headers["range"], size)
+
+        if method in ("GET", "HEAD") and self._is_not_modified(request_headers, etag, st.st_mtime):
+            await self._send_not_modified(send)
+        elif byte_range is not None and byte_range[0] >= size:
+            await self._send_unsatisfiable(send, size)
+        else:
+            start, end = 0, size - 1
+            if byte_range is not None:
+                start, end = byte_range
+                self.status_code = 206
+                self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+            await send({"type": "http.response.start", "status": self.status_code,
+                        "headers": self.raw_headers})
+            if method == "HEAD":
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            else:
+                await self._send_body(scope, send, start, end - start + 1)
+        if self.background is not None:
+            await self.background()
+
+    @staticmethod
+    def _is_not_modified(request_headers: dict, etag: str, mtime: float) -> bool:
+        # If-None-Match takes precedence; If-Modified-Since only counts without it.
+        if "if-none-match" in request_headers:
+            return _etag_matches(request_headers["if-none-match"], etag)
+        if "if-modified-since" in request_headers:
+            return _not_modified_since(request_headers["if-modified-since"], mtime)
+        return False
+
+    @staticmethod
+    def _if_range_holds(if_range: Optional[str], etag: str, mtime: float) -> bool:
+        """A Range is honoured only while the client's copy is still this file."""
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith(('"', "W/")):
+            return if_range == etag  # If-Range needs a strong match
+        return _not_modified_since(if_range, mtime)
+
+    async def _send_not_modified(self, send: Send) -> None:
+        headers = [(k, v) for k, v in self.raw_headers
+                   if k in (b"etag", b"last-modified", b"cache-control", b"vary")]
+        await send({"type": "http.response.start", "status": 304, "headers": headers})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_unsatisfiable(self, send: Send, size: int) -> None:
+        headers = [(b"content-range", f"bytes */{size}".encode()), (b"content-length", b"0"),
+                   (b"accept-ranges", b"bytes")]
+        await send({"type": "http.response.start", "status": 416, "headers": headers})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _send_body(self, scope: Scope, send: Send, offset: int, count: int) -> None:
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({"type": "http.response.zerocopysend", "file": file.fileno(),
+                            "offset": offset, "count": count, "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(offset)
+            remaining = count
+            while True:
+                chunk = await file.read(min(self.chunk_size, remaining)) if remaining else b""
+                remaining -= len(chunk)
+                more_body = bool(chunk) and remaining > 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                if not more_body:
+                    return
@@ -0,0 +1,40 @@
+"""Convert stored naive-UTC start/end datetimes to the viewer's local strings.
+
+Regular Schedule rows keep start_datetime / end_datetime as naive UTC. The grid
+and the edit form need them as local 'YYYY-MM-DD' dates and 'HH:MM' times in
+the session time zone. The conversion is one list comprehension per column
+over the C-implemented zoneinfo, formatted with a single isoformat() call per
+row and sliced — no pandas on the request path, and on par with the pandas
+tz_convert version (scripts/bench_local_time.py).
+"""
+from __future__ import annotations
+
+from datetime import timezone
+from typing import Sequence
+from zoneinfo import ZoneInfo
+
+LOCAL_FIELDS = ("local_start_date", "local_start_time", "local_end_date", "local_end_time")
+
+
+def _local_date_and_time(values: Sequence, zone: ZoneInfo) -> tuple[list[str], list[str]]:
+    """Naive-UTC datetimes -> (['YYYY-MM-DD', ...], ['HH:MM', ...]) in `zone`."""
+    # 'YYYY-MM-DD HH:MM' per row, then slice the date and time out of the fixed
+    # width strings.
+    iso = [v.replace(tzinfo=timezone.utc).astimezone(zone).isoformat(" ", "minutes") for v in values]
+    return [s[:10] for s in iso], [s[11:16] for s in iso]
+
+
+def utc_to_local_fields(starts: Sequence, ends: Sequence, time_zone: str) -> dict[str, list[str]]:
+    """Return {field: [str, ...]} for LOCAL_FIELDS, one entry per input row.
+
+    `starts` / `ends` are naive UTC datetimes (as stored by SQLAlchemy).
+    """
+    zone = ZoneInfo(time_zone)
+    start_dates, start_times = _local_date_and_time(starts, zone)
+    end_dates, end_times = _local_date_and_time(ends, zone)
+    return {
+        "local_start_date": start_dates,
+        "local_start_time": start_times,
+        "local_end_date": end_dates,
+        "local_end_time": end_times,
+    }
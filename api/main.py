@@ -6,38 +6,41 @@ load_dotenv()
 import logging
 from fastapi import FastAPI, Depends, Request, Form, Query, HTTPException, UploadFile, File, BackgroundTasks
 from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, FileResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
-from api.database import SessionLocal, engine, Base, ENVIRONMENT, get_database_path # Use absolute import
+from api.database import SessionLocal, engine, Base, ENVIRONMENT, get_database_path, create_app_engine, checkpoint_wal # Use absolute import
 from api.models import User, AllowedUser, Schedule, Link, Todo, Diary  # Use absolute import
-from api.permissions import allowed_tabs_for, tab_guard, landing_url_for
+from api.permissions import allowed_tabs_for, invalidate_tab_cache, tab_guard, landing_url_for
 from api.edit_time_fields import edit_form_time_fields
+from api.local_time import utc_to_local_fields
 from api.repeat_task_update import apply_repeat_update
 from api.schema_check import missing_schema, format_warning, is_missing_schema_error, MIGRATION_COMMAND
+from api.schedule_index import index_by_date
+from api.schedule_query import visible_schedule_rows
+from api import music as _music
+from api import music_peaks as _music_peaks
+from api.music import download_workers, get_cookies_path, get_music_dir
+from api.progress import progress_hub, sse_response
+from api import project_datasets as _datasets
+from api.file_streaming import CACHE_LONG, CACHE_REVALIDATE, RangeFileResponse
+from api.templating import templates
 from sqlalchemy.exc import OperationalError
-import pandas as pd
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 import json
 from starlette.middleware.sessions import SessionMiddleware
 
 
-from pandas import Timestamp
-
 import os
 
 from fastapi.staticfiles import StaticFiles
 
-app = FastAPI()
+app = FastAPI(lifespan=download_workers)
 base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 # Mount the static directory to serve static files
 app.mount("/static", StaticFiles(directory=os.path.join(base_dir, "static")), name="static")
 
-# Set up Jinja2 templates
-templates = Jinja2Templates(directory=os.path.join(base_dir, "templates"))
-templates.env.globals['ENVIRONMENT'] = ENVIRONMENT
 
 
 
@@ -52,11 +55,6 @@ app.add_middleware(SessionMiddleware, secret_key="your_secret_key")
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 
-# Set up Jinja2 templates
-templates = Jinja2Templates(directory="templates")
-# Make the allowed-tab resolver callable from templates (base.html).
-templates.env.globals["allowed_tabs_for"] = allowed_tabs_for
-templates.env.globals['ENVIRONMENT'] = ENVIRONMENT
 
 # Create the database tables if they don't exist
 Base.metadata.create_all(bind=engine)
@@ -124,28 +122,98 @@ def today_in_session_tz(request: Request) -> str:
     return datetime.now(zone).strftime('%Y-%m-%d')
 
 
-def _schedule_sort_key(item):
-    """Display order within a day cell:
-      0) daily tasks (no time), 1) repeat tasks with no time,
-      2) ordinary + timed repeat tasks sorted by start time
-         (ordinary before repeat when start times are equal).
-    The sort is stable, so insertion order is preserved within groups 0 and 1.
+def _regular_task_dicts(regular_tasks, time_zone: str) -> list[dict]:
+    """Render dicts for regular (timed) Schedule rows in the viewer's time zone.
+
+    The UTC->local conversion runs once over the whole column (see
+    api.local_time); start/end_datetime are kept as UTC ISO strings.
     """
-    is_repeat = bool(item.get('is_repeat_task'))
-    is_daily = bool(item.get('is_daily_task')) and not is_repeat
-    start_time = item.get('local_start_time') or ''
-    if is_daily:
-        return (0, '', 0)
-    if is_repeat and not start_time:
-        return (1, '', 0)
-    type_rank = 1 if is_repeat else 0
-    return (2, start_time, type_rank)
+    local = utc_to_local_fields(
+        [t.start_datetime for t in regular_tasks],
+        [t.end_datetime for t in regular_tasks],
+        time_zone,
+    )
+    return [{
+        'id': t.id,
+        'name': t.name,
+        'link': t.link,
+        'start_datetime': t.start_datetime.isoformat() + '+00:00',
+        'end_datetime': t.end_datetime.isoformat() + '+00:00',
+        'local_start_date': local['local_start_date'][i],
+        'local_start_time': local['local_start_time'][i],
+        'local_end_date': local['local_end_date'][i],
+        'local_end_time': local['local_end_time'][i],
+        'is_daily_task': 0,
+    } for i, t in enumerate(regular_tasks)]
+
+
+# The schedule grid covers SCHEDULE_WEEKS weeks from the session's start Monday.
+# Only the first SCHEDULE_FIRST_WEEKS are rendered with the page; the rest are
+# fetched on scroll from /schedule/weeks/ (static/schedule_weeks.js), at most
+# SCHEDULE_MAX_FETCH_WEEKS per request.
+SCHEDULE_WEEKS = 50
+SCHEDULE_FIRST_WEEKS = 4
+SCHEDULE_MAX_FETCH_WEEKS = 12
+
+
+def _schedule_start_day(request: Request) -> date:
+    """Monday of the first grid week (today's week moved by start_date_adjust)."""
+    start_date_adjust = request.session.get('start_date_adjust', 0)
+    return (datetime.today() - timedelta(days=datetime.today().weekday() + start_date_adjust)).date()
+
+
+def _week_dates(first_day: date, weeks: int) -> list[str]:
+    return [(first_day + timedelta(days=i)).isoformat() for i in range(7 * weeks)]
+
+
+def _schedule_items(db: Session, date_sequence: list[str], time_zone: str, today_date: str):
+    """Return (rows, render dicts) for every task visible in `date_sequence`.
+
+    Regular tasks are converted to the viewer's time zone; daily tasks are
+    passed through with their fixed date (no TZ conversion); repeat templates
+    are expanded into one virtual dict per matching date.
+    """
+    # Fetch only the tasks that can land in the visible window (regular + daily
+    # + repeat templates).
+    tasks = visible_schedule_rows(db, date_sequence)
+
+    # Split: daily tasks bypass the TZ pipeline entirely.
+    regular_tasks = [t for t in tasks if not t.is_daily_task and not t.is_repeat_task]
+    daily_tasks_rows = [t for t in tasks if t.is_daily_task and not t.is_repeat_task]
+    repeat_templates = [t for t in tasks if t.is_repeat_task]
+
+    items = _regular_task_dicts(regular_tasks, time_zone) if regular_tasks else []
+
+    # Append daily tasks as plain dicts with the date already in local form.
+    for t in daily_tasks_rows:
+        task_date_iso = t.task_date.isoformat() if t.task_date else None
+        items.append({
+            'id': t.id,
+            'name': t.name,
+            'link': t.link,
+            'start_datetime': None,
+            'end_datetime': None,
+            'local_start_date': task_date_iso,
+            'local_start_time': '',
+            'local_end_date': task_date_iso,
+            'local_end_time': '',
+            'is_daily_task': 1,
+        })
+
+    # Expand repeat templates into virtual per-date dicts within the visible window.
+    # The window is parsed once and shared by every template.
+    from .repeat_tasks import RepeatWindow, expand_template  # local import keeps top-of-file tidy
+    repeat_window = RepeatWindow(date_sequence)
+    for t in repeat_templates:
+        items.extend(expand_template(t, repeat_window, today=today_date))
+    return tasks, items
+
 # --------------------
 
 @app.get("/", response_class=HTMLResponse)
 
 # @app.get("/")
-async def login_signup(request: Request):
+def login_signup(request: Request):
     message = "Please Log in or Sing up"
     message_color = "#0f0"
     
@@ -183,7 +251,7 @@ async def login_signup(request: Request):
 # --------------------
 
 @app.get("/download_db/")
-async def download_db(request: Request, db: Session = Depends(get_db)):
+def download_db(request: Request, db: Session = Depends(get_db)):
     from api.database import get_database_path
     
     # Get the current database path (works for both local and Render)
@@ -204,16 +272,22 @@ async def download_db(request: Request, db: Session = Depends(get_db)):
         logger.error(f"Download request - Database file not found at: {db_path}")
         raise HTTPException(status_code=404, detail="Database file not found")
 
+    # WAL mode: fold committed pages still in test.db-wal into the file first.
+    checkpoint_wal(engine)
+
     # Generate filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"test_backup_{timestamp}.db"
     
     logger.info(f"Download request - Serving file as: {filename}")
 
-    return FileResponse(db_path, media_type='application/octet-stream', filename=filename)
+    # The file changes with every write: clients revalidate, and get a 304
+    # while it is unchanged or a 206 when resuming an interrupted download.
+    return RangeFileResponse(db_path, media_type='application/octet-stream', filename=filename,
+                             cache_control=CACHE_REVALIDATE)
 
 @app.post("/upload_db/")
-async def upload_db(request: Request, database_file: UploadFile = File(...)):
+def upload_db(request: Request, database_file: UploadFile = File(...)):
     """
     Upload and replace the production database.
     Steps:
@@ -252,6 +326,7 @@ async def upload_db(request: Request, database_file: UploadFile = File(...)):
         backup_path = os.path.join("/var/data", backup_filename)
         
         if os.path.exists(current_db_path):
+            checkpoint_wal(engine)  # so the copy includes commits still in the WAL
             shutil.copy2(current_db_path, backup_path)
             logger.info(f"Backup created at: {backup_path}")
         else:
@@ -268,7 +343,7 @@ async def upload_db(request: Request, database_file: UploadFile = File(...)):
             })
         
         # Read uploaded file content
-        file_content = await database_file.read()
+        file_content = database_file.file.read()
         file_size = len(file_content)
         logger.info(f"Uploaded file size: {file_size} bytes")
         
@@ -314,24 +389,25 @@ async def upload_db(request: Request, database_file: UploadFile = File(...)):
         
         # Step 3: Close existing database connections
         logger.info("Disposing existing database engine connections")
+        checkpoint_wal(engine)
         engine.dispose()
         
-        # Step 4: Replace the database file
+        # Step 4: Replace the database file. Drop the old WAL / shared-memory
+        # files too, or SQLite would replay the old DB's frames onto the new one.
         logger.info(f"Replacing database file at: {current_db_path}")
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(current_db_path + suffix):
+                os.remove(current_db_path + suffix)
         with open(current_db_path, 'wb') as f:
             f.write(file_content)
         
         # Step 5: Recreate database connections
         logger.info("Recreating database engine and connections")
-        from sqlalchemy import create_engine
         from sqlalchemy.orm import sessionmaker
         
         # Create new engine
         new_database_url = f"sqlite:///{current_db_path}"
-        new_engine = create_engine(
-            new_database_url, 
-            connect_args={"check_same_thread": False, "timeout": 30}
-        )
+        new_engine = create_app_engine(new_database_url)
         
         # Update global engine
         engine = new_engine
@@ -374,13 +450,13 @@ async def upload_db(request: Request, database_file: UploadFile = File(...)):
             # Try to restore backup if verification fails
             if os.path.exists(backup_path):
                 logger.info("Attempting to restore backup due to verification failure")
-                shutil.copy2(backup_path, current_db_path)
                 engine.dispose()
+                for suffix in ("-wal", "-shm"):
+                    if os.path.exists(current_db_path + suffix):
+                        os.remove(current_db_path + suffix)
+                shutil.copy2(backup_path, current_db_path)
                 # Recreate engine again with restored database
-                restored_engine = create_engine(
-                    f"sqlite:///{current_db_path}", 
-                    connect_args={"check_same_thread": False, "timeout": 30}
-                )
+                restored_engine = create_app_engine(f"sqlite:///{current_db_path}")
                 engine = restored_engine
                 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=restored_engine)
                 
@@ -406,7 +482,7 @@ async def upload_db(request: Request, database_file: UploadFile = File(...)):
         })
 
 @app.get("/download-db-info")
-async def download_db_info():
+def download_db_info():
     """Debug endpoint to show what database file would be downloaded."""
     from api.database import get_database_path
     
@@ -449,7 +525,7 @@ async def download_db_info():
     return info
 
 @app.get("/diagnostic-database")
-async def diagnostic_database():
+def diagnostic_database():
     """Comprehensive database diagnostic for troubleshooting."""
     from api.database import get_database_path, get_database_url, ENVIRONMENT
     
@@ -569,7 +645,7 @@ async def diagnostic_database():
 # --------------------
 
 @app.get("/debug-info")
-async def debug_info():
+def debug_info():
     """Debug endpoint to check database configuration and environment."""
     from api.database import get_database_path, get_database_url, ENVIRONMENT
     
@@ -645,7 +721,7 @@ async def debug_info():
 # --------------------
 
 @app.post("/login_signup/add_user/")
-async def add_user(request: Request, username: str = Form(...), email: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+def add_user(request: Request, username: str = Form(...), email: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
     """Sign-up route, gated by the SQLite allowed_users allowlist.
 
     Steps:
@@ -691,6 +767,7 @@ async def add_user(request: Request, username: str = Form(...), email: str = For
             db.add(new_user)
             db.commit()
             db.refresh(new_user)
+            invalidate_tab_cache(username)
         except Exception as e:
             db.rollback()
             logger.error(f"add_user: failed to insert User row: {e}")
@@ -713,6 +790,9 @@ async def add_user(request: Request, username: str = Form(...), email: str = For
         return templates.TemplateResponse("schedule_indicate_00.html", {
             "request": request,
             "dates": date_sequence,
+            "week_dates": date_sequence,
+            "weeks": len(date_sequence) // 7,
+            "weeks_left": 0,
             "today": today_date,
             "login_username": username,
             "time_zone_message": "Sign-up complete — please select your time zone:",
@@ -737,7 +817,7 @@ today_date = datetime.today().strftime('%Y-%m-%d')
 # --------------------
 
 @app.post("/login_signup/check_user/")
-async def check_user(request: Request, date_sequence = date_sequence, today_date = today_date, username: str = Form(...), email: str = Form(...), password: str = Form(None), db: Session = Depends(get_db), skip: int = Query(0), limit: int = Query(50)):
+def check_user(request: Request, date_sequence = date_sequence, today_date = today_date, username: str = Form(...), email: str = Form(...), password: str = Form(None), db: Session = Depends(get_db), skip: int = Query(0), limit: int = Query(50)):
     db_user = db.query(User).filter(User.username == username, User.email == email, User.password == password).first()
     today_date = today_in_session_tz(request)
 
@@ -753,9 +833,13 @@ async def check_user(request: Request, date_sequence = date_sequence, today_date
         if "schedule" not in allowed_tabs_for(request):
             return RedirectResponse(landing_url_for(request), status_code=303)
 
+        # Empty grid until a time zone is chosen, so nothing to fetch on scroll.
         return templates.TemplateResponse("schedule_indicate_00.html", {
             "request": request,
             "dates": date_sequence,
+            "week_dates": date_sequence,
+            "weeks": len(date_sequence) // 7,
+            "weeks_left": 0,
             "today": today_date,
             "login_username": login_username,
             "time_zone_message": time_zone_message,
@@ -786,7 +870,7 @@ async def schedule_view_mode(request: Request, mode: str = Form(...)):
 
 
 @app.get("/schedule/")
-async def schedule(request: Request, time_zone: str = "UTC", db: Session = Depends(get_db), skip: int = Query(0), limit: int = Query(200)):
+def schedule(request: Request, time_zone: str = "UTC", db: Session = Depends(get_db), skip: int = Query(0), limit: int = Query(200)):
     login_username = request.session.get('login_username')
     guard = tab_guard(request, "schedule")
     if guard:
@@ -795,119 +879,44 @@ async def schedule(request: Request, time_zone: str = "UTC", db: Session = Depen
     schedule_view_mode = request.session.get('schedule_view_mode', 'A')
     logger.info(f"Time zone is {time_zone}")
 
-    # Fetch all tasks (regular + daily). Daily tasks have NULL start/end_datetime
-    # and a populated task_date — we handle them with a separate code path below
-    # because the pandas TZ pipeline chokes on NaT.
-    tasks = db.query(Schedule).with_entities(
-        Schedule.id,
-        Schedule.name,
-        Schedule.start_datetime,
-        Schedule.end_datetime,
-        Schedule.link,
-        Schedule.is_daily_task,
-        Schedule.task_date,
-        Schedule.is_repeat_task,
-        Schedule.repeat_type,
-        Schedule.repeat_weekdays,
-        Schedule.range_start,
-        Schedule.range_end,
-        Schedule.today_only,
-        Schedule.repeat_start_time,
-        Schedule.repeat_end_time,
-    ).order_by(Schedule.start_datetime).all()
+    # Only the first weeks of the window are rendered with the page; the rest
+    # are fetched on scroll from /schedule/weeks/.
+    first_day = _schedule_start_day(request)
+    date_sequence = _week_dates(first_day, SCHEDULE_FIRST_WEEKS)
+    today_date = datetime.today().astimezone(ZoneInfo(time_zone)).strftime('%Y-%m-%d')
+    # today_date = datetime.today().strftime('%Y-%m-%d')
 
-    # Split: daily tasks bypass the TZ pipeline entirely.
-    regular_tasks = [t for t in tasks if not t.is_daily_task and not t.is_repeat_task]
-    daily_tasks_rows = [t for t in tasks if t.is_daily_task and not t.is_repeat_task]
-    repeat_templates = [t for t in tasks if t.is_repeat_task]
+    tasks, df_combined_dict = _schedule_items(db, date_sequence, time_zone, today_date)
 
-    # Check if there are more records to fetch
-    total_tasks = db.query(Schedule).count()
+    # Paging counts refer to the rows already loaded for this window; a second
+    # COUNT(*) over the whole table is not needed.
+    total_tasks = len(tasks)
     has_more = skip + limit < total_tasks
 
     # Calculate current page and total pages
     current_page = (skip // limit) + 1
     total_pages = (total_tasks // limit) + (1 if total_tasks % limit > 0 else 0)
 
-    start_date_adjust = request.session.get('start_date_adjust', 0)
-    start_date = datetime.today() - timedelta(days=datetime.today().weekday() + start_date_adjust)
-    date_sequence = [str((start_date + timedelta(days=i)).strftime('%Y-%m-%d')) for i in range(7*50)]
-    today_date = datetime.today().astimezone(ZoneInfo(time_zone)).strftime('%Y-%m-%d')
-    # today_date = datetime.today().strftime('%Y-%m-%d')
-
-    df_combined_dict = []
     local_start_date = None
     local_start_time = None
-
-    if regular_tasks:
-        data = [{
-            'id': task.id,
-            'name': task.name,
-            'link': task.link,
-            'start_datetime': task.start_datetime,
-            'end_datetime': task.end_datetime,
-        } for task in regular_tasks]
-
-        df_tasks = pd.DataFrame(data)
-        df_tasks['start_datetime'] = pd.to_datetime(df_tasks['start_datetime']).dt.tz_localize('UTC')
-        df_tasks['end_datetime'] = pd.to_datetime(df_tasks['end_datetime']).dt.tz_localize('UTC')
-
-        local_start_dates = []
-        local_start_times = []
-        local_end_dates = []
-        local_end_times = []
-
-        for i in range(len(df_tasks)):
-            df_task = df_tasks.iloc[i]
-            local_start_datetime = df_task["start_datetime"].astimezone(ZoneInfo(time_zone))
-            local_start_date = local_start_datetime.date()
-            local_start_time = local_start_datetime.time().strftime("%H:%M")
-            local_start_dates.append(str(local_start_date))
-            local_start_times.append(str(local_start_time))
-
-            local_end_datetime = df_task["end_datetime"].astimezone(ZoneInfo(time_zone))
-            local_end_date = local_end_datetime.date()
-            local_end_time = local_end_datetime.time().strftime("%H:%M")
-            local_end_dates.append(str(local_end_date))
-            local_end_times.append(str(local_end_time))
-
-        df_local_start_dates = pd.DataFrame(local_start_dates, columns=['local_start_date'])
-        df_local_start_times = pd.DataFrame(local_start_times, columns=['local_start_time'])
-        df_local_end_dates = pd.DataFrame(local_end_dates, columns=['local_end_date'])
-        df_local_end_times = pd.DataFrame(local_end_times, columns=['local_end_time'])
-
-        df_combined = pd.concat([df_tasks, df_local_start_dates, df_local_start_times, df_local_end_dates, df_local_end_times], axis=1)
-        df_combined['is_daily_task'] = 0
-
-        # Convert Timestamp objects to strings
-        df_combined = df_combined.apply(lambda col: col.map(lambda x: x.isoformat() if isinstance(x, pd.Timestamp) else x))
-
-        df_combined_dict = df_combined.to_dict(orient='records')
-
-    # Append daily tasks as plain dicts with the date already in local form.
-    for t in daily_tasks_rows:
-        task_date_iso = t.task_date.isoformat() if t.task_date else None
-        df_combined_dict.append({
-            'id': t.id,
-            'name': t.name,
-            'link': t.link,
-            'start_datetime': None,
-            'end_datetime': None,
-            'local_start_date': task_date_iso,
-            'local_start_time': '',
-            'local_end_date': task_date_iso,
-            'local_end_time': '',
-            'is_daily_task': 1,
-        })
-
-    # Expand repeat templates into virtual per-date dicts within the visible window.
-    from .repeat_tasks import expand_template  # local import keeps top-of-file tidy
-    for t in repeat_templates:
-        df_combined_dict.extend(expand_template(t, date_sequence, today=today_date))
-
-    # Order each day cell: daily tasks, then timeless repeat tasks, then ordinary
-    # + timed repeat tasks merged and sorted by start time.
-    df_combined_dict.sort(key=_schedule_sort_key)
+    regular_dicts = [d for d in df_combined_dict if not d['is_daily_task']]
+    if regular_dicts:
+        local_start_date = regular_dicts[-1]['local_start_date']
+        local_start_time = regular_dicts[-1]['local_start_time']
+
+    # Bucket by local date so each grid cell is one dict lookup in the template
+    # instead of a scan over every item. Each day's list is already ordered:
+    # daily tasks, then timeless repeat tasks, then ordinary + timed repeat
+    # tasks merged and sorted by start time.
+    items_by_date = index_by_date(df_combined_dict)
+
+    # View B's Today cell spans the whole grid, so it needs today's items even
+    # when today falls in a week that is not rendered yet.
+    today_items = items_by_date.get(today_date, [])
+    window_end = first_day + timedelta(days=7 * SCHEDULE_WEEKS - 1)
+    if schedule_view_mode == 'B' and today_date not in date_sequence \
+            and first_day.isoformat() <= today_date <= window_end.isoformat():
+        today_items = index_by_date(_schedule_items(db, [today_date], time_zone, today_date)[1]).get(today_date, [])
 
     length_df_combined = len(df_combined_dict)
 
@@ -923,7 +932,14 @@ async def schedule(request: Request, time_zone: str = "UTC", db: Session = Depen
     return templates.TemplateResponse("schedule_indicate_00.html", {
         "request": request,
         "df_combined": df_combined_dict,
+        "items_by_date": items_by_date,
+        "today_items": today_items,
         "dates": date_sequence,
+        "week_dates": date_sequence,
+        "weeks": SCHEDULE_FIRST_WEEKS,
+        "weeks_next": (first_day + timedelta(days=7 * SCHEDULE_FIRST_WEEKS)).isoformat(),
+        "weeks_left": SCHEDULE_WEEKS - SCHEDULE_FIRST_WEEKS,
+        "grid_view": schedule_view_mode,
         "today": today_date,
         "time_zone": time_zone,
         "length_df_combined": length_df_combined,
@@ -945,9 +961,51 @@ async def schedule(request: Request, time_zone: str = "UTC", db: Session = Depen
     })
 
 
+@app.get("/schedule/weeks/", response_class=JSONResponse)
+def schedule_weeks(request: Request, db: Session = Depends(get_db), from_: str = Query(..., alias="from"), n: int = Query(SCHEDULE_FIRST_WEEKS), view: str = Query(None)):
+    """Grid rows for `n` weeks starting at the Monday of `from` (YYYY-MM-DD).
+
+    Used by static/schedule_weeks.js to extend the grid on scroll. Runs the
+    same query, TZ conversion and repeat expansion as /schedule/, and returns
+    both the per-date items and the rows rendered with schedule_weeks_00.html,
+    so the client only appends markup. `next` is the `from` of the following
+    batch.
+    """
+    guard = tab_guard(request, "schedule")
+    if guard:
+        return guard
+    try:
+        first_day = date.fromisoformat(from_)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"invalid from date: {from_!r}")
+    first_day -= timedelta(days=first_day.weekday())  # grid rows start on Monday
+    n = max(1, min(n, SCHEDULE_MAX_FETCH_WEEKS))
+    time_zone = request.session.get('time_zone', 'UTC')
+    today_date = today_in_session_tz(request)
+    grid_view = 'B' if (view or request.session.get('schedule_view_mode', 'A')) == 'B' else 'A'
+
+    week_dates = _week_dates(first_day, n)
+    _, items = _schedule_items(db, week_dates, time_zone, today_date)
+    items_by_date = index_by_date(items)
+    html = templates.get_template("schedule_weeks_00.html").render({
+        "week_dates": week_dates,
+        "weeks": n,
+        "grid_view": grid_view,
+        "today": today_date,
+        "items_by_date": items_by_date,
+    })
+    return {
+        "from": week_dates[0],
+        "n": n,
+        "next": (first_day + timedelta(days=7 * n)).isoformat(),
+        "items_by_date": items_by_date,
+        "html": html,
+    }
+
+
 # --------------------
 @app.get("/schedule_reload/", response_class=JSONResponse)
-async def get_schedule_data(db: Session = Depends(get_db)):
+def get_schedule_data(db: Session = Depends(get_db)):
     tasks = db.query(Link).all()
     data = [{
         'id': task.id,
@@ -962,7 +1020,7 @@ async def get_schedule_data(db: Session = Depends(get_db)):
 
 
 @app.post("/schedule/select_time_zone/")
-async def select_time_zone(request: Request, time_zone: str = Form(...), login_username: str = Form(""), db: Session = Depends(get_db)):
+def select_time_zone(request: Request, time_zone: str = Form(...), login_username: str = Form(""), db: Session = Depends(get_db)):
     if login_username:
         request.session['login_username'] = login_username  # Save to session
     request.session['time_zone'] = time_zone  # Save to session
@@ -979,7 +1037,7 @@ async def select_time_zone(request: Request, time_zone: str = Form(...), login_u
 # --------------------
 
 @app.get("/schedule/edit_task/{item_id}")
-async def edit_task(item_id: int, request: Request, db: Session = Depends(get_db), skip: int = Query(0), limit: int = Query(50)):
+def edit_task(item_id: int, request: Request, db: Session = Depends(get_db), skip: int = Query(0), limit: int = Query(50)):
     # Fetch the task from the database
     db_item = db.query(Schedule).filter(Schedule.id == item_id).first()
 
@@ -995,102 +1053,24 @@ async def edit_task(item_id: int, request: Request, db: Session = Depends(get_db
         edit_form_time_fields(db_item, time_zone)
     )
 
-    # Generate date sequence for the template
-    start_date_adjust = request.session.get('start_date_adjust', 0)
-    start_date = datetime.today() - timedelta(days=datetime.today().weekday() + start_date_adjust)
-    date_sequence = [str((start_date + timedelta(days=i)).strftime('%Y-%m-%d')) for i in range(7*50)]
+    # Date sequence for the grid preview: first weeks only, like /schedule/.
+    first_day = _schedule_start_day(request)
+    date_sequence = _week_dates(first_day, SCHEDULE_FIRST_WEEKS)
     today_date = today_in_session_tz(request)
 
-    # Fetch tasks for the day-column preview (regular + daily, like /schedule/).
-    tasks = db.query(Schedule).with_entities(
-        Schedule.id,
-        Schedule.name,
-        Schedule.start_datetime,
-        Schedule.end_datetime,
-        Schedule.link,
-        Schedule.is_daily_task,
-        Schedule.task_date,
-        Schedule.is_repeat_task,
-        Schedule.repeat_type,
-        Schedule.repeat_weekdays,
-        Schedule.range_start,
-        Schedule.range_end,
-        Schedule.today_only,
-        Schedule.repeat_start_time,
-        Schedule.repeat_end_time,
-    ).order_by(Schedule.start_datetime).all()
-
-    regular_tasks = [t for t in tasks if not t.is_daily_task and not t.is_repeat_task]
-    daily_tasks_rows = [t for t in tasks if t.is_daily_task and not t.is_repeat_task]
-    repeat_templates = [t for t in tasks if t.is_repeat_task]
+    # Fetch tasks for the day-column preview (regular + daily + repeat, like /schedule/).
+    tasks, df_combined_dict = _schedule_items(db, date_sequence, time_zone, today_date)
 
-    total_tasks = db.query(Schedule).count()
+    total_tasks = len(tasks)
     has_more = skip + limit < total_tasks
     current_page = (skip // limit) + 1
     total_pages = (total_tasks // limit) + (1 if total_tasks % limit > 0 else 0)
 
-    df_combined_dict = []
-
-    if regular_tasks:
-        data = [{
-            'id': task.id,
-            'name': task.name,
-            'link': task.link,
-            'start_datetime': task.start_datetime,
-            'end_datetime': task.end_datetime,
-        } for task in regular_tasks]
-
-        df_tasks = pd.DataFrame(data)
-        df_tasks['start_datetime'] = pd.to_datetime(df_tasks['start_datetime']).dt.tz_localize('UTC')
-        df_tasks['end_datetime'] = pd.to_datetime(df_tasks['end_datetime']).dt.tz_localize('UTC')
-
-        local_start_dates = []
-        local_start_times = []
-        local_end_dates = []
-        local_end_times = []
-
-        for i in range(len(df_tasks)):
-            df_task = df_tasks.iloc[i]
-            local_start_dt = df_task["start_datetime"].astimezone(ZoneInfo(time_zone))
-            local_end_dt = df_task["end_datetime"].astimezone(ZoneInfo(time_zone))
-            local_start_dates.append(str(local_start_dt.date()))
-            local_start_times.append(local_start_dt.time().strftime("%H:%M"))
-            local_end_dates.append(str(local_end_dt.date()))
-            local_end_times.append(local_end_dt.time().strftime("%H:%M"))
-
-        df_local_start_dates = pd.DataFrame(local_start_dates, columns=['local_start_date'])
-        df_local_start_times = pd.DataFrame(local_start_times, columns=['local_start_time'])
-        df_local_end_dates = pd.DataFrame(local_end_dates, columns=['local_end_date'])
-        df_local_end_times = pd.DataFrame(local_end_times, columns=['local_end_time'])
-
-        df_combined = pd.concat([df_tasks, df_local_start_dates, df_local_start_times, df_local_end_dates, df_local_end_times], axis=1)
-        df_combined['is_daily_task'] = 0
-        df_combined = df_combined.apply(lambda col: col.map(lambda x: x.isoformat() if isinstance(x, pd.Timestamp) else x))
-        df_combined_dict = df_combined.to_dict(orient='records')
-
-    for t in daily_tasks_rows:
-        task_date_iso = t.task_date.isoformat() if t.task_date else None
-        df_combined_dict.append({
-            'id': t.id,
-            'name': t.name,
-            'link': t.link,
-            'start_datetime': None,
-            'end_datetime': None,
-            'local_start_date': task_date_iso,
-            'local_start_time': '',
-            'local_end_date': task_date_iso,
-            'local_end_time': '',
-            'is_daily_task': 1,
-        })
-
-    # Expand repeat templates into virtual per-date dicts within the visible window.
-    from .repeat_tasks import expand_template  # local import keeps top-of-file tidy
-    for t in repeat_templates:
-        df_combined_dict.extend(expand_template(t, date_sequence, today=today_date))
-
-    # Order each day cell: daily tasks, then timeless repeat tasks, then ordinary
-    # + timed repeat tasks merged and sorted by start time.
-    df_combined_dict.sort(key=_schedule_sort_key)
+    # Bucket by local date so each grid cell is one dict lookup in the template
+    # instead of a scan over every item. Each day's list is already ordered:
+    # daily tasks, then timeless repeat tasks, then ordinary + timed repeat
+    # tasks merged and sorted by start time.
+    items_by_date = index_by_date(df_combined_dict)
 
     # Render the template with the task data
     return templates.TemplateResponse("schedule_edit_00.html", {
@@ -1101,8 +1081,14 @@ async def edit_task(item_id: int, request: Request, db: Session = Depends(get_db
         "selected_local_end_time": selected_local_end_time,
         "time_zone": time_zone,
         "dates": date_sequence,
+        "week_dates": date_sequence,
+        "weeks": SCHEDULE_FIRST_WEEKS,
+        "weeks_next": (first_day + timedelta(days=7 * SCHEDULE_FIRST_WEEKS)).isoformat(),
+        "weeks_left": SCHEDULE_WEEKS - SCHEDULE_FIRST_WEEKS,
+        "grid_view": "A",
         "today": today_date,
         "df_combined": df_combined_dict,
+        "items_by_date": items_by_date,
         "skip": skip,
         "limit": limit,
         "has_more": has_more,
@@ -1118,7 +1104,7 @@ async def edit_task(item_id: int, request: Request, db: Session = Depends(get_db
 
 # async def create_item(name: str = Form(...), date1: str = Form(...), link: str = Form(...), tel: str = Form(...), db: Session = Depends(get_db)):
 # async def create_item(name: str = Form(...), date1: date1 = Form(...), link: str = Form(...), tel: str = Form(...), db: Session = Depends(get_db)):
-async def create_item(request: Request, name: str = Form(...), date1: str = Form(...), start_time: str = Form(None), end_time: str = Form(None), start_time_hour: str = Form(None), start_time_minute: str = Form(None), end_time_hour: str = Form(None), end_time_minute: str = Form(None), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), time_zone: str = Form(None), db: Session = Depends(get_db)):
+def create_item(request: Request, name: str = Form(...), date1: str = Form(...), start_time: str = Form(None), end_time: str = Form(None), start_time_hour: str = Form(None), start_time_minute: str = Form(None), end_time_hour: str = Form(None), end_time_minute: str = Form(None), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), time_zone: str = Form(None), db: Session = Depends(get_db)):
 # async def create_item(request: Request, name: str = Form(...), date1: str = Form(...), start_time: str = Form(...), end_time: str = Form(...), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), local_time_zone = local_time_zone, db: Session = Depends(get_db)):
     if start_time_hour is not None and start_time_minute is not None:
         start_time = f"{start_time_hour}:{start_time_minute}"
@@ -1193,7 +1179,7 @@ async def create_item(request: Request, name: str = Form(...), date1: str = Form
 # --------------------
 
 @app.post("/schedule/add_daily_task/")
-async def add_daily_task(
+def add_daily_task(
     request: Request,
     name: str = Form(...),
     date1: str = Form(...),
@@ -1231,13 +1217,15 @@ async def add_daily_task(
 
 
 @app.post("/schedule/add_repeat_task/")
-async def add_repeat_task(
+def add_repeat_task(
     request: Request,
     name: str = Form(...),
     date1: str = Form(...),                      # used only as a fallback range_start
-    repeat_type: str = Form(...),                # 'every_day' | 'every_weekday' | 'every_specific_weekday'
+    repeat_type: str = Form(...),                # see repeat_tasks.REPEAT_TYPES
     repeat_range: str = Form(...),               # 'this_month' | 'this_week' | 'until_date'
     repeat_weekdays: list[str] = Form([]),       # multi-checkbox; empty unless type='every_specific_weekday'
+    repeat_interval: str = Form(None),           # every N days / weeks / months; blank = 1
+    repeat_month_day: str = Form(None),          # 1..31, only for type='monthly_on_day'; blank = range_start's day
     repeat_range_end_date: str = Form(None),     # required only when repeat_range='until_date'
     today_only: int = Form(0),                   # 1 = show only in the Today area
     start_time_hour: str = Form(None),           # time-of-day selectors (shared form)
@@ -1254,7 +1242,11 @@ async def add_repeat_task(
     Stored shape (one row, expanded on read in /schedule/):
       is_repeat_task = 1
       repeat_type    = 'every_day' | 'every_weekday' | 'every_specific_weekday'
+                       | 'monthly_on_day'
       repeat_weekdays = CSV, only when type='every_specific_weekday'
+      repeat_interval = every N days/weeks/months from range_start (1 = every)
+      repeat_month_day = day of month, only when type='monthly_on_day'
+                         (defaults to range_start's day)
       range_start, range_end = date window
       today_only     = 1 → occurrence emitted only when iterated date == today
     """
@@ -1283,8 +1275,33 @@ async def add_repeat_task(
     else:
         raise HTTPException(status_code=400, detail=f"unknown repeat_range: {repeat_range!r}")
 
-    if repeat_type not in {"every_day", "every_weekday", "every_specific_weekday"}:
+    from .repeat_tasks import REPEAT_TYPES  # local import keeps top-of-file tidy
+    if repeat_type not in REPEAT_TYPES:
         raise HTTPException(status_code=400, detail=f"unknown repeat_type: {repeat_type!r}")
+    # Blank means the default; anything else must be a whole number (400, not
+    # FastAPI's raw 422, so the form gets the same kind of error as the rest).
+    interval_text = (repeat_interval or "").strip()
+    if not interval_text:
+        interval = 1
+    elif interval_text.isdigit():
+        interval = int(interval_text)
+    else:
+        raise HTTPException(status_code=400, detail=f"repeat_interval must be a whole number: {repeat_interval!r}")
+    if interval < 1:
+        raise HTTPException(status_code=400, detail="repeat_interval must be at least 1")
+
+    # Day of month: only meaningful for 'monthly_on_day'. Blank = range_start's day.
+    month_day = None
+    if repeat_type == "monthly_on_day":
+        month_day_text = (repeat_month_day or "").strip()
+        if not month_day_text:
+            month_day = range_start_val.day
+        elif month_day_text.isdigit():
+            month_day = int(month_day_text)
+        else:
+            raise HTTPException(status_code=400, detail=f"repeat_month_day must be a number: {repeat_month_day!r}")
+        if not 1 <= month_day <= 31:
+            raise HTTPException(status_code=400, detail="repeat_month_day must be between 1 and 31")
 
     # Normalise weekdays: only meaningful for 'every_specific_weekday'.
     weekdays_csv = None
@@ -1317,6 +1334,8 @@ async def add_repeat_task(
         is_repeat_task=1,
         repeat_type=repeat_type,
         repeat_weekdays=weekdays_csv,
+        repeat_interval=interval if repeat_type != "every_weekday" else 1,
+        repeat_month_day=month_day,
         range_start=range_start_val,
         range_end=range_end_val,
         today_only=1 if today_only else 0,
@@ -1332,7 +1351,7 @@ async def add_repeat_task(
 
 @app.post("/schedule/update_task/{item_id}")
 
-async def create_item(request: Request, item_id: int, action: str = Form(...), name: str = Form(...), date1: str = Form(...), start_time: str = Form(None), end_time: str = Form(None), start_time_hour: str = Form(None), start_time_minute: str = Form(None), end_time_hour: str = Form(None), end_time_minute: str = Form(None), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), time_zone: str = Form(None), db: Session = Depends(get_db)):
+def create_item(request: Request, item_id: int, action: str = Form(...), name: str = Form(...), date1: str = Form(...), start_time: str = Form(None), end_time: str = Form(None), start_time_hour: str = Form(None), start_time_minute: str = Form(None), end_time_hour: str = Form(None), end_time_minute: str = Form(None), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), time_zone: str = Form(None), db: Session = Depends(get_db)):
 
     # Daily task: skip the TZ conversion entirely. Date is stored as-is.
     # start/end_datetime are NOT NULL in the legacy schema → fill with sentinel
@@ -1496,7 +1515,7 @@ async def create_item(request: Request, item_id: int, action: str = Form(...), n
 # --------------------
 
 @app.post("/schedule/delete_task/")
-async def delete_item(item_id: int = Form(...), db: Session = Depends(get_db)):
+def delete_item(item_id: int = Form(...), db: Session = Depends(get_db)):
     db_item = db.query(Schedule).filter(Schedule.id == item_id).first()
     if db_item:
         db.delete(db_item)
@@ -1553,7 +1572,7 @@ async def get_tasks_002(request: Request):
 
 
 @app.get("/link_00/")
-async def get_tasks(request: Request, time_zone: str = "UTC", db: Session = Depends(get_db)):
+def get_tasks(request: Request, time_zone: str = "UTC", db: Session = Depends(get_db)):
     login_username = request.session.get('login_username')
     guard = tab_guard(request, "link_00")
     if guard:
@@ -1584,33 +1603,15 @@ async def get_tasks(request: Request, time_zone: str = "UTC", db: Session = Depe
     'id_user': task.id_user
     } for task in tasks]
 
-    # df_tasks = pd.DataFrame(data)
-    # print(tasks.start_datetime)
-    
-    
-    df_tasks = pd.DataFrame(data)
-    print("df_tasks", df_tasks)
-    # print(df_tasks)
-    
-   
-
-    
-    df_combined = df_tasks
-    # df_combined = pd.concat([df_tasks, df_local_start_dates, df_local_start_times, df_local_end_dates, df_local_end_times], axis=1)
-    # request.session['df_combined'] = df_combined  # Save to session
-    print("df_combined", df_combined)
+    # The rows are already plain dicts; the template iterates them directly.
+    df_combined_dict = data
     
-    
-    df_combined_dict = df_combined.to_dict(orient='records')
-    
-    length_df_combined = len(df_combined)
+    length_df_combined = len(df_combined_dict)
     
     time_zone_massage = "Current time zone :"
     
     message_color = "#0f0"
     
-    print("df_combined", df_combined)
-    
     tab_page_active = "link_00"
     # request.session['link_tab_page_active'] = link_tab_page_active
     link_tab_page_active = request.session.get('link_tab_page_active')
@@ -1626,7 +1627,7 @@ async def get_tasks(request: Request, time_zone: str = "UTC", db: Session = Depe
 
 # async def create_item(name: str = Form(...), date1: str = Form(...), link: str = Form(...), tel: str = Form(...), db: Session = Depends(get_db)):
 # async def create_item(name: str = Form(...), date1: date1 = Form(...), link: str = Form(...), tel: str = Form(...), db: Session = Depends(get_db)):
-async def create_item(request: Request, name: str = Form(...), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), time_zone: str = Form(None), db: Session = Depends(get_db)):
+def create_item(request: Request, name: str = Form(...), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), time_zone: str = Form(None), db: Session = Depends(get_db)):
 # async def create_item(request: Request, name: str = Form(...), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), time_zone: str = Form(None), db: Session = Depends(get_db)):
 # async def create_item(request: Request, name: str = Form(...), date1: str = Form(...), start_time: str = Form(...), end_time: str = Form(...), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), local_time_zone = local_time_zone, db: Session = Depends(get_db)):
   
@@ -1652,7 +1653,7 @@ async def create_item(request: Request, name: str = Form(...), link: str = Form(
 
 @app.get("/link/edit_task/{item_id}")
 # @app.get("/tab_00/edit_task/{item_id}")
-async def edit_task(item_id: int, request: Request, db: Session = Depends(get_db), date_sequence = date_sequence, today_date = today_date, link: str = Query(None)):
+def edit_task(item_id: int, request: Request, db: Session = Depends(get_db), date_sequence = date_sequence, today_date = today_date, link: str = Query(None)):
 # async def edit_task(item_id: int, request: Request, db: Session = Depends(get_db), date_sequence = date_sequence, today_date = today_date, local_start_date_selected: str = Query(None)):
 # async def edit_task(item_id: int, request: Request, db: Session = Depends(get_db), date_sequence = date_sequence, today_date = today_date, login_username: Optional[str] = None, local_start_date: str = Query(None, description="The date to edit the task")):
     db_item = db.query(Link).filter(Link.id == item_id).first()
@@ -1681,15 +1682,7 @@ async def edit_task(item_id: int, request: Request, db: Session = Depends(get_db
     'id_user': task.id_user
     } for task in tasks]
 
-    # df_tasks = pd.DataFrame(data)
-    # print(tasks.start_datetime)
-    
-    
-    df_tasks = pd.DataFrame(data)
-    
-    df_combined = df_tasks
-    
-    df_combined_dict = df_combined.to_dict(orient='records')
+    df_combined_dict = data
     
     link_tab_page_active = request.session.get('link_tab_page_active')
     
@@ -1709,7 +1702,7 @@ async def edit_task(item_id: int, request: Request, db: Session = Depends(get_db
     
 @app.post("/link/update_task/{item_id}")
 
-async def create_item(request: Request, item_id: int, name: str = Form(...), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), time_zone: str = Form(None), db: Session = Depends(get_db)):
+def create_item(request: Request, item_id: int, name: str = Form(...), link: str = Form(None), category: str = Form(None), status: str = Form(None), username: str = Form(None), time_zone: str = Form(None), db: Session = Depends(get_db)):
 
 
     # date1 = datetime.strptime(date1, '%Y-%m-%d').date()
@@ -1748,7 +1741,7 @@ async def create_item(request: Request, item_id: int, name: str = Form(...), lin
     
     
 @app.post("/link/delete_task/")
-async def delete_item(item_id: int = Form(...), db: Session = Depends(get_db)):
+def delete_item(item_id: int = Form(...), db: Session = Depends(get_db)):
 
     print("delete!!")
     db_item = db.query(Link).filter(Link.id == item_id).first()
@@ -1761,91 +1754,6 @@ async def delete_item(item_id: int = Form(...), db: Session = Depends(get_db)):
 # --------------------
 # Music routes
 
-import uuid
-import threading
-
-# In-memory job status store
-download_jobs: dict = {}
-
-def get_music_dir() -> str:
-    """Return the music storage directory based on environment."""
-    is_render = bool(os.getenv("RENDER"))
-    if is_render:
-        path = "/var/data/music"
-    else:
-        path = os.path.join(base_dir, "static", "music")
-    os.makedirs(path, exist_ok=True)
-    return path
-
-def get_cookies_path() -> str:
-    """Return path for the YouTube cookies file."""
-    is_render = bool(os.getenv("RENDER"))
-    if is_render:
-        return "/var/data/youtube_cookies.txt"
-    else:
-        return os.path.join(base_dir, "data", "youtube_cookies.txt")
-
-def do_download(job_id: str, url: str) -> None:
-    """Run yt-dlp download in background thread."""
-    try:
-        import yt_dlp
-    except ImportError:
-        download_jobs[job_id] = {"status": "error", "error": "yt-dlp is not installed.", "filename": None, "progress": 0}
-        return
-
-    music_dir = get_music_dir()
-    download_jobs[job_id] = {"status": "downloading", "error": None, "filename": None, "progress": 0}
-
-    def progress_hook(d):
-        if d['status'] == 'downloading':
-            total = d.get('total_bytes') or d.get('total_bytes_estimate')
-            downloaded = d.get('downloaded_bytes', 0)
-            if total:
-                download_jobs[job_id]["progress"] = round(downloaded / total * 100)
-        elif d['status'] == 'finished':
-            download_jobs[job_id]["progress"] = 99  # converting to MP3 still in progress
-
-    cookies_path = get_cookies_path()
-    cookies_found = os.path.exists(cookies_path)
-    is_render = bool(os.getenv("RENDER"))
-    download_jobs[job_id]["cookies_used"] = cookies_found
-    download_jobs[job_id]["cookies_path"] = cookies_path
-
-    ydl_opts = {
-        'format': 'bestaudio/best',
-        'outtmpl': os.path.join(music_dir, '%(title)s.%(ext)s'),
-        'postprocessors': [{
-            'key': 'FFmpegExtractAudio',
-            'preferredcodec': 'mp3',
-            'preferredquality': '192',
-        }],
-        'progress_hooks': [progress_hook],
-        # Use iOS client first — bypasses YouTube bot detection on server IPs.
-        # Falls back to web and android if iOS fails.
-        'extractor_args': {'youtube': {'player_client': ['ios', 'android', 'web']}},
-        'quiet': True,
-        'no_warnings': True,
-    }
-    if cookies_found:
-        ydl_opts['cookiefile'] = cookies_path
-    elif not is_render:
-        # Local fallback: read cookies directly from Chrome (requires login on YouTube).
-        # Skipped on Render because the server has no browser installed.
-        ydl_opts['cookiesfrombrowser'] = ('chrome',)
-
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            raw_filename = ydl.prepare_filename(info)
-            mp3_filename = os.path.splitext(raw_filename)[0] + '.mp3'
-            download_jobs[job_id]["status"] = "done"
-            download_jobs[job_id]["progress"] = 100
-            download_jobs[job_id]["filename"] = os.path.basename(mp3_filename)
-    except Exception as e:
-        download_jobs[job_id]["status"] = "error"
-        download_jobs[job_id]["error"] = str(e)
-
-
 @app.get("/music/downloader/")
 async def music_downloader(request: Request):
     request.session['music_tab_active'] = "downloader"
@@ -1862,7 +1770,7 @@ async def music_editor(request: Request):
     return RedirectResponse("/music/", status_code=303)
 
 @app.get("/music/")
-async def music(request: Request):
+def music(request: Request):
     login_username = request.session.get('login_username')
     guard = tab_guard(request, "music")
     if guard:
@@ -1877,20 +1785,21 @@ async def music(request: Request):
         "time_zone": time_zone,
         "tab_page_active": tab_page_active,
         "music_tab_active": music_tab_active,
+        "peaks_max_zoom": _music_peaks.MAX_ZOOM,
         "today": today_in_session_tz(request),
     })
 
 @app.post("/music/upload_cookies/")
-async def music_upload_cookies(cookies_file: UploadFile = File(...)):
+def music_upload_cookies(cookies_file: UploadFile = File(...)):
     cookies_path = get_cookies_path()
     os.makedirs(os.path.dirname(cookies_path), exist_ok=True)
-    content = await cookies_file.read()
+    content = cookies_file.file.read()
     with open(cookies_path, "wb") as f:
         f.write(content)
     return JSONResponse({"status": "ok", "message": "Cookies file saved."})
 
 @app.get("/music/cookies_status/")
-async def music_cookies_status():
+def music_cookies_status():
     cookies_path = get_cookies_path()
     exists = os.path.exists(cookies_path)
     info = {"exists": exists, "path": cookies_path, "size_bytes": None, "first_line": None, "valid_format": False}
@@ -1906,44 +1815,72 @@ async def music_cookies_status():
     return JSONResponse(info)
 
 @app.post("/music/start_download/")
-async def music_start_download(url: str = Form(...)):
-    job_id = str(uuid.uuid4())[:8]
-    download_jobs[job_id] = {"status": "pending", "error": None, "filename": None}
-    thread = threading.Thread(target=do_download, args=(job_id, url), daemon=True)
-    thread.start()
-    return JSONResponse({"job_id": job_id})
+def music_start_download(url: str = Form(...)):
+    """Queue a download; a video already pending or downloading is joined
+    (joined=true) rather than fetched twice."""
+    job_id, joined = _music.submit_download(url)
+    return JSONResponse({"job_id": job_id, "joined": joined})
 
 @app.get("/music/download_status/{job_id}")
-async def music_download_status(job_id: str):
-    job = download_jobs.get(job_id)
+def music_download_status(job_id: str):
+    job = _music.get_download(job_id)
     if not job:
         return JSONResponse({"status": "not_found"}, status_code=404)
+    job["stats"] = _music.download_stats()
     return JSONResponse(job)
 
+@app.get("/music/download_events/{job_id}")
+async def music_download_events(job_id: str):
+    """Server-Sent Events: the download's status as it changes, until done or error."""
+    def snapshot() -> dict:
+        job = _music.get_download(job_id)
+        if not job:
+            return {"status": "not_found"}
+        return {k: job[k] for k in _music.DOWNLOAD_EVENT_FIELDS}
+
+    return sse_response(progress_hub.stream(_music._topic(job_id), snapshot))
+
 @app.get("/music/files/")
-async def music_files():
-    music_dir = get_music_dir()
-    files = sorted(
-        [f for f in os.listdir(music_dir) if f.lower().endswith('.mp3')],
-        key=lambda f: os.path.getmtime(os.path.join(music_dir, f)),
-        reverse=True
-    )
-    return JSONResponse({"files": files})
+def music_files():
+    return JSONResponse({"files": _music.library_filenames()})
+
+@app.get("/music/library/")
+def music_library(
+    q: str | None = Query(None, max_length=200),
+    sort: str = Query("recent", pattern="^(recent|title|artist)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(_music.LIBRARY_PAGE_SIZE, ge=1, le=_music.LIBRARY_MAX_LIMIT),
+):
+    """One page of the indexed library: tags, duration and bitrate, searchable by q."""
+    return JSONResponse(_music.get_library(q=q, sort=sort, offset=offset, limit=limit))
+
+@app.get("/music/peaks/{filename}")
+def music_peaks(filename: str, zoom: int = Query(0, ge=0, le=_music_peaks.MAX_ZOOM)):
+    """Min/max waveform peaks of a track at one zoom level (0 = whole-track overview)."""
+    file_path = os.path.join(get_music_dir(), os.path.basename(filename))
+    try:
+        peaks = _music_peaks.get_peaks(file_path, zoom)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except _music_peaks.PeaksUnavailable as e:
+        raise HTTPException(status_code=503, detail=f"Peaks unavailable: {e}")
+    return JSONResponse(peaks)
 
 @app.get("/music/serve_file/{filename}")
-async def music_serve_file(filename: str):
+def music_serve_file(filename: str):
     music_dir = get_music_dir()
     file_path = os.path.join(music_dir, filename)
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path, media_type="audio/mpeg", filename=filename)
+    return RangeFileResponse(file_path, media_type="audio/mpeg", filename=filename,
+                             cache_control=CACHE_LONG)
 
 
 # --------------------
 # Project routes
 
 @app.get("/action/")
-async def action(request: Request):
+def action(request: Request):
     guard = tab_guard(request, "action")
     if guard:
         return guard
@@ -1957,7 +1894,7 @@ async def action(request: Request):
     return RedirectResponse(url="/action/map/")
 
 @app.get("/action/periodic_table/")
-async def action_periodic_table(request: Request):
+def action_periodic_table(request: Request):
     request.session['function_sub_tab_active'] = 'periodic_table'
     login_username = request.session.get('login_username')
     time_zone = request.session.get('time_zone')
@@ -1971,12 +1908,12 @@ async def action_periodic_table(request: Request):
     })
 
 @app.get("/table/")
-async def table_index():
+def table_index():
     file_path = os.path.join(base_dir, "table", "index.html")
     return FileResponse(file_path, media_type="text/html")
 
 @app.get("/action/map/")
-async def action_map(request: Request):
+def action_map(request: Request):
     request.session['function_sub_tab_active'] = 'map'
     login_username = request.session.get('login_username')
     time_zone = request.session.get('time_zone')
@@ -1999,7 +1936,7 @@ app.include_router(_admin_router)
 
 # --- File Converter (sub-tab of Function) ---
 @app.get("/action/file_converter/")
-async def action_file_converter(request: Request):
+def action_file_converter(request: Request):
     request.session['function_sub_tab_active'] = 'file_converter'
     login_username = request.session.get('login_username')
     time_zone = request.session.get('time_zone')
@@ -2013,33 +1950,33 @@ async def action_file_converter(request: Request):
     })
 
 @app.get("/file_converter/")
-async def file_converter_index():
+def file_converter_index():
     file_path = os.path.join(base_dir, "file_converter", "index.html")
     return FileResponse(file_path, media_type="text/html")
 
 
 @app.get("/map/")
-async def map_index():
+def map_index():
     file_path = os.path.join(base_dir, "map", "index.html")
     return FileResponse(file_path, media_type="text/html")
 
 @app.get("/map/japan.html")
-async def map_japan():
+def map_japan():
     file_path = os.path.join(base_dir, "map", "japan.html")
     return FileResponse(file_path, media_type="text/html")
 
 @app.get("/map/taiwan.html")
-async def map_taiwan():
+def map_taiwan():
     file_path = os.path.join(base_dir, "map", "taiwan.html")
     return FileResponse(file_path, media_type="text/html")
 
 @app.get("/map/countries-110m.json")
-async def map_countries():
+def map_countries():
     file_path = os.path.join(base_dir, "map", "countries-110m.json")
     return FileResponse(file_path, media_type="application/json")
 
 @app.get("/no_access/")
-async def no_access(request: Request):
+def no_access(request: Request):
     login_username = request.session.get('login_username')
     return templates.TemplateResponse("no_access.html", {
         "request": request,
@@ -2050,7 +1987,7 @@ async def no_access(request: Request):
     })
 
 @app.get("/sqlite/")
-async def sqlite_page(request: Request):
+def sqlite_page(request: Request):
     login_username = request.session.get('login_username')
     guard = tab_guard(request, "sqlite")
     if guard:
@@ -2066,7 +2003,7 @@ async def sqlite_page(request: Request):
     })
 
 @app.get("/3d/")
-async def viewer_3d(request: Request):
+def viewer_3d(request: Request):
     login_username = request.session.get('login_username')
     guard = tab_guard(request, "3d")
     if guard:
@@ -2081,7 +2018,7 @@ async def viewer_3d(request: Request):
     })
 
 @app.get("/game/")
-async def game(request: Request):
+def game(request: Request):
     login_username = request.session.get('login_username')
     guard = tab_guard(request, "game")
     if guard:
@@ -2098,7 +2035,7 @@ async def game(request: Request):
     })
 
 @app.get("/game/invader/")
-async def game_invader(request: Request):
+def game_invader(request: Request):
     login_username = request.session.get('login_username')
     time_zone = request.session.get('time_zone')
     request.session['game_tab_active'] = 'invader'
@@ -2112,7 +2049,7 @@ async def game_invader(request: Request):
     })
 
 @app.get("/game/game01/")
-async def game_game01(request: Request):
+def game_game01(request: Request):
     login_username = request.session.get('login_username')
     time_zone = request.session.get('time_zone')
     request.session['game_tab_active'] = 'game01'
@@ -2126,7 +2063,7 @@ async def game_game01(request: Request):
     })
 
 @app.get("/project/")
-async def project(request: Request):
+def project(request: Request):
     login_username = request.session.get('login_username')
     guard = tab_guard(request, "project")
     if guard:
@@ -2144,7 +2081,7 @@ async def project(request: Request):
     })
 
 @app.get("/project/edit/")
-async def project_edit(request: Request):
+def project_edit(request: Request):
     login_username = request.session.get('login_username')
     time_zone = request.session.get('time_zone')
     message_color = "#0f0"
@@ -2160,7 +2097,7 @@ async def project_edit(request: Request):
     })
 
 @app.get("/project/chart/")
-async def project_chart(request: Request):
+def project_chart(request: Request):
     login_username = request.session.get('login_username')
     time_zone = request.session.get('time_zone')
     message_color = "#0f0"
@@ -2174,81 +2111,59 @@ async def project_chart(request: Request):
     })
 
 @app.post("/project/upload/")
-async def project_upload(file: UploadFile = File(...)):
-    import io
-    filename = file.filename
-    content = await file.read()
-    ext = os.path.splitext(filename)[1].lower()
-
+def project_upload(file: UploadFile = File(...)):
+    # Parsed once into the dataset store; the returned token serves every
+    # later sheet, column and row request without sending the file again.
     try:
-        if ext in (".xlsx", ".xls"):
-            xl = pd.ExcelFile(io.BytesIO(content))
-            sheets = xl.sheet_names
-            return JSONResponse({"file_type": ext.lstrip("."), "sheets": sheets, "columns": None})
-
-        elif ext == ".csv":
-            for enc in ("utf-8", "utf-8-sig", "shift_jis", "cp932", "latin-1"):
-                try:
-                    df = pd.read_csv(io.BytesIO(content), encoding=enc)
-                    break
-                except (UnicodeDecodeError, Exception):
-                    continue
-            else:
-                return JSONResponse({"error": "Could not decode CSV file. Please save as UTF-8."}, status_code=400)
-            df.columns = [str(c) for c in df.columns]
-            df = df.where(pd.notnull(df), None)
-            return JSONResponse({"file_type": "csv", "sheets": None, "columns": list(df.columns), "rows": df.astype(str).to_dict(orient="records")})
-
-        elif ext in (".db", ".sqlite", ".sqlite3"):
-            import sqlite3, tempfile
-            with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp:
-                tmp.write(content)
-                tmp_path = tmp.name
-            con = sqlite3.connect(tmp_path)
-            tables = con.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-            con.close()
-            os.unlink(tmp_path)
-            sheets = [t[0] for t in tables]
-            return JSONResponse({"file_type": "sqlite", "sheets": sheets, "columns": None})
-
-        else:
-            return JSONResponse({"error": f"Unsupported file type: {ext}"}, status_code=400)
-
+        dataset = _datasets.ingest(file.filename, file.file.read())
+        if dataset["sheets"] is not None:
+            return JSONResponse({**dataset, "columns": None})
+        data = _datasets.sheet_rows(dataset["token"])
+        return JSONResponse({**dataset, "columns": data["columns"], "rows": data["rows"]})
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
 @app.post("/project/columns/")
-async def project_columns(file: UploadFile = File(...), sheet: str = Form(...)):
-    import io
-    filename = file.filename
-    content = await file.read()
-    ext = os.path.splitext(filename)[1].lower()
-
+def project_columns(sheet: str = Form(...), token: str | None = Form(None),
+                    file: UploadFile | None = File(None)):
+    """A sheet's columns and rows from the dataset store. Clients send the
+    upload token; the file itself only when the token has been evicted (410)."""
     try:
-        if ext in (".xlsx", ".xls"):
-            df = pd.read_excel(io.BytesIO(content), sheet_name=sheet)
-            df = df.where(pd.notnull(df), None)
-            return JSONResponse({"columns": list(df.columns), "rows": df.astype(str).to_dict(orient="records")})
-
-        elif ext in (".db", ".sqlite", ".sqlite3"):
-            import sqlite3, tempfile
-            with tempfile.NamedTemporaryFile(suffix=ext, delete=False) as tmp:
-                tmp.write(content)
-                tmp_path = tmp.name
-            con = sqlite3.connect(tmp_path)
-            cursor = con.execute(f"SELECT * FROM \"{sheet}\"")
-            columns = [d[0] for d in cursor.description]
-            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
-            con.close()
-            os.unlink(tmp_path)
-            return JSONResponse({"columns": columns, "rows": rows})
-
-        else:
-            return JSONResponse({"error": "Unsupported"}, status_code=400)
-
+        if file is not None:
+            token = _datasets.ingest(file.filename, file.file.read())["token"]
+        if not token:
+            return JSONResponse({"error": "Upload the file first."}, status_code=400)
+        data = _datasets.sheet_rows(token, sheet)
+        return JSONResponse({"token": token, "columns": data["columns"], "rows": data["rows"]})
+    except _datasets.DatasetNotFound:
+        return JSONResponse({"error": "Uploaded file has expired; please upload it again."},
+                            status_code=410)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+@app.get("/project/rows/")
+def project_rows(
+    token: str,
+    sheet: str | None = Query(None),
+    columns: list[str] | None = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=10000),
+):
+    """One page of rows of an uploaded sheet, optionally only some columns."""
+    try:
+        return JSONResponse({**_datasets.sheet_rows(token, sheet, columns=columns,
+                                                   offset=offset, limit=limit),
+                             "offset": offset, "limit": limit})
+    except _datasets.DatasetNotFound:
+        return JSONResponse({"error": "Uploaded file has expired; please upload it again."},
+                            status_code=410)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
 
 # --------------------
 # To Do routes (per-user, private)
@@ -2280,7 +2195,7 @@ def _todo_effective_status(t: "Todo", today_d) -> str:
 
 
 @app.get("/todo/")
-async def todo_list(request: Request, db: Session = Depends(get_db)):
+def todo_list(request: Request, db: Session = Depends(get_db)):
     guard = tab_guard(request, "todo")
     if guard:
         return guard
@@ -2320,7 +2235,7 @@ async def todo_list(request: Request, db: Session = Depends(get_db)):
 
 
 @app.get("/todo/edit/")
-async def todo_edit(request: Request, db: Session = Depends(get_db)):
+def todo_edit(request: Request, db: Session = Depends(get_db)):
     login_username, id_user = _todo_resolve_user(request, db)
     time_zone = request.session.get('time_zone')
     today_d = datetime.today().date()
@@ -2344,7 +2259,7 @@ async def todo_edit(request: Request, db: Session = Depends(get_db)):
 
 
 @app.get("/todo/edit_task/{item_id}")
-async def todo_edit_task(item_id: int, request: Request, db: Session = Depends(get_db)):
+def todo_edit_task(item_id: int, request: Request, db: Session = Depends(get_db)):
     login_username, id_user = _todo_resolve_user(request, db)
     time_zone = request.session.get('time_zone')
     today_d = datetime.today().date()
@@ -2374,7 +2289,7 @@ async def todo_edit_task(item_id: int, request: Request, db: Session = Depends(g
 
 
 @app.post("/todo/add_task/")
-async def todo_add_task(
+def todo_add_task(
     request: Request,
     title: str = Form(...),
     description: str = Form(None),
@@ -2415,7 +2330,7 @@ async def todo_add_task(
 
 
 @app.post("/todo/update_task/{item_id}")
-async def todo_update_task(
+def todo_update_task(
     item_id: int,
     request: Request,
     title: str = Form(...),
@@ -2454,7 +2369,7 @@ async def todo_update_task(
 
 
 @app.post("/todo/delete_task/")
-async def todo_delete_task(request: Request, item_id: int = Form(...), db: Session = Depends(get_db)):
+def todo_delete_task(request: Request, item_id: int = Form(...), db: Session = Depends(get_db)):
     login_username, id_user = _todo_resolve_user(request, db)
     if not login_username:
         return RedirectResponse("/todo/edit/", status_code=303)
@@ -2467,7 +2382,7 @@ async def todo_delete_task(request: Request, item_id: int = Form(...), db: Sessi
 
 
 @app.post("/todo/mark_done/")
-async def todo_mark_done(
+def todo_mark_done(
     request: Request,
     item_id: int = Form(...),
     redirect_to: str = Form("/todo/"),
@@ -2499,7 +2414,7 @@ def _diary_query_for_user(db: Session, login_username: str, id_user):
 
 
 @app.get("/diary/")
-async def diary_list(request: Request, type: str | None = Query(None), db: Session = Depends(get_db)):
+def diary_list(request: Request, type: str | None = Query(None), db: Session = Depends(get_db)):
     guard = tab_guard(request, "diary")
     if guard:
         return guard
@@ -2560,7 +2475,7 @@ def _diary_resolve_type(request: Request, type_param: str | None) -> str:
 
 
 @app.get("/diary/edit/")
-async def diary_edit(request: Request, type: str | None = Query(None), db: Session = Depends(get_db)):
+def diary_edit(request: Request, type: str | None = Query(None), db: Session = Depends(get_db)):
     login_username, id_user = _todo_resolve_user(request, db)
     time_zone = request.session.get('time_zone')
     current_type = _diary_resolve_type(request, type)
@@ -2587,7 +2502,7 @@ async def diary_edit(request: Request, type: str | None = Query(None), db: Sessi
 
 
 @app.get("/diary/edit_task/{item_id}")
-async def diary_edit_task(item_id: int, request: Request, type: str | None = Query(None), db: Session = Depends(get_db)):
+def diary_edit_task(item_id: int, request: Request, type: str | None = Query(None), db: Session = Depends(get_db)):
     login_username, id_user = _todo_resolve_user(request, db)
     time_zone = request.session.get('time_zone')
     current_type = _diary_resolve_type(request, type)
@@ -2629,7 +2544,7 @@ async def diary_edit_task(item_id: int, request: Request, type: str | None = Que
 
 
 @app.post("/diary/add_task/")
-async def diary_add_task(
+def diary_add_task(
     request: Request,
     title: str = Form(...),
     content: str = Form(None),
@@ -2672,7 +2587,7 @@ async def diary_add_task(
 
 
 @app.post("/diary/update_task/{item_id}")
-async def diary_update_task(
+def diary_update_task(
     item_id: int,
     request: Request,
     title: str = Form(...),
@@ -2709,7 +2624,7 @@ async def diary_update_task(
 
 
 @app.post("/diary/delete_task/")
-async def diary_delete_task(request: Request, item_id: int = Form(...), db: Session = Depends(get_db)):
+def diary_delete_task(request: Request, item_id: int = Form(...), db: Session = Depends(get_db)):
     login_username, id_user = _todo_resolve_user(request, db)
     if not login_username:
         return RedirectResponse("/diary/edit/", status_code=303)
@@ -2722,7 +2637,7 @@ async def diary_delete_task(request: Request, item_id: int = Form(...), db: Sess
 
 
 @app.get("/diary/view/")
-async def diary_view(request: Request, type: str | None = Query(None), db: Session = Depends(get_db)):
+def diary_view(request: Request, type: str | None = Query(None), db: Session = Depends(get_db)):
     login_username, id_user = _todo_resolve_user(request, db)
     time_zone = request.session.get('time_zone')
     current_type = _diary_resolve_type(request, type)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Float, Date, Sequence
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Float, Date, Sequence, Index
 from .database import Base 
 
 
@@ -77,7 +77,7 @@ class Schedule(Base):
     category = Column(String, index=True)
     status = Column(String, index=True)
 
-    start_datetime = Column(DateTime)
+    start_datetime = Column(DateTime, index=True)
     end_datetime = Column(DateTime)
     # start_datetime = Column(DateTime, nullable=False)
     # end_datetime = Column(DateTime, nullable=False)
@@ -92,8 +92,12 @@ class Schedule(Base):
     # Today area reads templates and decides whether today matches the pattern;
     # no per-occurrence rows are written.
     #   repeat_type: 'every_day' | 'every_weekday' | 'every_specific_weekday'
+    #                | 'monthly_on_day'
     #   repeat_weekdays: CSV of Python weekday ints, e.g. '0,2,4' (Mon=0..Sun=6)
     #     — only used when repeat_type='every_specific_weekday'.
+    #   repeat_interval: every N days / weeks / months counted from range_start
+    #     (NULL = 1; ignored for 'every_weekday').
+    #   repeat_month_day: day of month (1..31) for 'monthly_on_day'.
     is_repeat_task = Column(Integer, default=0, index=True)
     repeat_type = Column(String, index=True)
     repeat_weekdays = Column(String)
@@ -102,8 +106,18 @@ class Schedule(Base):
     today_only = Column(Integer, default=0, index=True)
     repeat_start_time = Column(String)
     repeat_end_time = Column(String)
+    repeat_interval = Column(Integer)
+    repeat_month_day = Column(Integer)
 
     id_user = Column(Integer)
+
+    # Composite indexes behind the windowed grid query (api/schedule_query.py).
+    # Existing databases get them from scripts.migrate_schedule_indexes, since
+    # create_all() never adds an index to a table that already exists.
+    __table_args__ = (
+        Index("ix_schedules_daily_task_date", "is_daily_task", "task_date"),
+        Index("ix_schedules_repeat_range", "is_repeat_task", "range_start", "range_end"),
+    )
     
 class Project(Base):
     __tablename__ = "projects"
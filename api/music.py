@@ -0,0 +1,712 @@
+"""Music tab storage and the YouTube download queue.
+
+Downloads run on a fixed pool of worker threads that claim jobs from the
+music_downloads table in music.db (SQLite, WAL), oldest first. Job state
+lives in that table rather than in process memory, so it survives restarts
+and every uvicorn worker process sees the same jobs; progress also goes to
+the in-process progress hub (api.progress) for Server-Sent Events.
+
+Requests for a video that is already pending or downloading join that job
+instead of starting a second download. Finished jobs are pruned after
+DOWNLOAD_TTL_S.
+
+The library (music_library) indexes the files in the music directory with
+their tags, read once per file with mutagen. A scan only stats the directory
+and re-reads files whose size or mtime changed; finished downloads are
+indexed as they land.
+"""
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+from api import music_peaks
+from api.progress import progress_hub
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if os.getenv("RENDER"):
+    DB_PATH = "/var/data/music.db"
+else:
+    DB_PATH = os.path.join(BASE_DIR, "data", "music.db")
+
+DOWNLOAD_WORKERS = int(os.getenv("MUSIC_DOWNLOAD_WORKERS", "2") or 2)
+DOWNLOAD_TTL_S = int(os.getenv("MUSIC_DOWNLOAD_TTL_DAYS", "7") or 7) * 86400
+DOWNLOAD_POLL_INTERVAL_S = 5.0
+# Progress goes to the stream on every whole percent, to the DB at most this often.
+PROGRESS_DB_INTERVAL_S = 2.0
+# A worker refreshes heartbeat_at on its running jobs this often; a job whose
+# heartbeat is older than DOWNLOAD_STALE_S belonged to a process that died,
+# and goes back in the queue.
+HEARTBEAT_INTERVAL_S = 30.0
+DOWNLOAD_STALE_S = 120.0
+PRUNE_INTERVAL_S = 3600.0
+# The library is rescanned when the music directory's mtime changes (a file
+# was added, removed or renamed) or, to catch files rewritten in place, once
+# this many seconds have passed since the last scan.
+LIBRARY_RESCAN_S = 60.0
+LIBRARY_PAGE_SIZE = 50
+LIBRARY_MAX_LIMIT = 500
+AUDIO_EXTENSIONS = (".mp3",)
+
+
+def get_music_dir() -> str:
+    """Return the music storage directory based on environment."""
+    is_render = bool(os.getenv("RENDER"))
+    if is_render:
+        path = "/var/data/music"
+    else:
+        path = os.path.join(BASE_DIR, "static", "music")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def get_cookies_path() -> str:
+    """Return path for the YouTube cookies file."""
+    is_render = bool(os.getenv("RENDER"))
+    if is_render:
+        return "/var/data/youtube_cookies.txt"
+    else:
+        return os.path.join(BASE_DIR, "data", "youtube_cookies.txt")
+
+
+# --------------------------------------------------------------------------------------
+# DB
+# --------------------------------------------------------------------------------------
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS music_downloads (
+    id            TEXT PRIMARY KEY,
+    url           TEXT NOT NULL,
+    video_key     TEXT NOT NULL,   -- YouTube video id, else the normalized URL
+    status        TEXT NOT NULL DEFAULT 'pending',  -- pending | downloading | done | error
+    progress      INTEGER NOT NULL DEFAULT 0,
+    error         TEXT,
+    filename      TEXT,
+    cookies_used  INTEGER,
+    created_at    REAL NOT NULL,   -- unix times
+    started_at    REAL,
+    finished_at   REAL,
+    heartbeat_at  REAL
+);
+
+CREATE INDEX IF NOT EXISTS idx_music_downloads_status
+    ON music_downloads (status);
+
+CREATE INDEX IF NOT EXISTS idx_music_downloads_key
+    ON music_downloads (video_key, status);
+
+-- One row per audio file in the music directory. size and mtime are the
+-- file's as of indexing: a file whose stat no longer matches is re-read.
+CREATE TABLE IF NOT EXISTS music_library (
+    filename      TEXT PRIMARY KEY,
+    size          INTEGER NOT NULL,
+    mtime         REAL NOT NULL,
+    title         TEXT,
+    artist        TEXT,
+    album         TEXT,
+    duration_s    REAL,
+    bitrate_kbps  INTEGER,
+    indexed_at    REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_music_library_mtime
+    ON music_library (mtime);
+"""
+
+_INIT_LOCK = threading.Lock()
+_INITIALIZED = False
+
+
+def _connect() -> sqlite3.Connection:
+    # Autocommit + WAL, as translator.db: short writes from worker threads
+    # never hold the lock across a status read.
+    conn = sqlite3.connect(DB_PATH, timeout=30.0, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA busy_timeout = 30000")
+    return conn
+
+
+def init_db() -> None:
+    global _INITIALIZED
+    with _INIT_LOCK:
+        if _INITIALIZED:
+            return
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        with _connect() as conn:
+            conn.executescript(SCHEMA_SQL)
+        _INITIALIZED = True
+
+
+def _reset_db_initialization() -> None:
+    global _INITIALIZED
+    with _INIT_LOCK:
+        _INITIALIZED = False
+
+
+# --------------------------------------------------------------------------------------
+# Jobs
+# --------------------------------------------------------------------------------------
+_YOUTUBE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{11}$")
+# Fields pushed to progress streams; the rest are only in the status response.
+DOWNLOAD_EVENT_FIELDS = ("status", "progress", "error", "filename", "queue_position")
+
+
+def video_key(url: str) -> str:
+    """What makes two download requests the same: the YouTube video id when
+    the URL has one (watch?v=, youtu.be/, /shorts/, /embed/, /live/), else
+    the URL without its fragment."""
+    url = url.strip()
+    parts = urlsplit(url if "//" in url else "https://" + url)
+    host = (parts.hostname or "").lower().removeprefix("www.").removeprefix("m.")
+    candidate = None
+    if host == "youtu.be":
+        candidate = parts.path.strip("/").split("/")[0]
+    elif host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+        segments = parts.path.strip("/").split("/")
+        if segments[0] == "watch":
+            candidate = (parse_qs(parts.query).get("v") or [""])[0]
+        elif segments[0] in ("shorts", "embed", "live", "v") and len(segments) > 1:
+            candidate = segments[1]
+    if candidate and _YOUTUBE_ID_RE.match(candidate):
+        return f"youtube:{candidate}"
+    return urlunsplit(parts._replace(fragment=""))
+
+
+def _topic(job_id: str) -> str:
+    return f"music:{job_id}"
+
+
+def _set_download(job_id: str, **fields) -> None:
+    """Update a download's row and push the change to its progress stream."""
+    if fields.get("status") in ("done", "error"):
+        fields.setdefault("finished_at", time.time())
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    with _connect() as conn:
+        conn.execute(f"UPDATE music_downloads SET {cols} WHERE id = ?", (*fields.values(), job_id))
+    event = {k: v for k, v in fields.items() if k in DOWNLOAD_EVENT_FIELDS}
+    if event:
+        progress_hub.publish(_topic(job_id), event)
+
+
+def submit_download(url: str) -> tuple[str, bool]:
+    """Queue a download of url and wake a worker for it.
+
+    Returns (job_id, joined): joined is True when the same video was already
+    pending or downloading, in which case that job's id comes back and
+    nothing new is queued. The check and the insert share one IMMEDIATE
+    transaction, so two processes cannot both queue the same video.
+    """
+    init_db()
+    key = video_key(url)
+    with _connect() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM music_downloads WHERE video_key = ? "
+                "AND status IN ('pending', 'downloading') ORDER BY rowid LIMIT 1",
+                (key,),
+            ).fetchone()
+            if row is None:
+                job_id = str(uuid.uuid4())[:8]
+                conn.execute(
+                    "INSERT INTO music_downloads (id, url, video_key, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, url, key, time.time()),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    if row is not None:
+        return row["id"], True
+    progress_hub.publish(_topic(job_id), {"status": "pending", "progress": 0, "error": None,
+                                          "filename": None})
+    start_download_workers()
+    _QUEUE_WAKE.release()
+    return job_id, False
+
+
+def _queue_position(conn: sqlite3.Connection, job_id: str) -> int:
+    return conn.execute(
+        "SELECT COUNT(*) FROM music_downloads WHERE status = 'pending' AND rowid <= "
+        "(SELECT rowid FROM music_downloads WHERE id = ?)",
+        (job_id,),
+    ).fetchone()[0]
+
+
+def get_download(job_id: str) -> Optional[dict]:
+    """The job's row plus queue_position (1 = next to start; None unless pending)."""
+    init_db()
+    with _connect() as conn:
+        row = conn.execute("SELECT * FROM music_downloads WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        d = dict(row)
+        d["queue_position"] = _queue_position(conn, job_id) if d["status"] == "pending" else None
+    d["cookies_used"] = None if d["cookies_used"] is None else bool(d["cookies_used"])
+    return d
+
+
+def download_stats() -> dict:
+    """Queue depth and throughput across all processes' workers."""
+    init_db()
+    now = time.time()
+    with _connect() as conn:
+        row = conn.execute(
+            "SELECT "
+            "COALESCE(SUM(status = 'pending'), 0) AS queued, "
+            "COALESCE(SUM(status = 'downloading'), 0) AS downloading, "
+            "COALESCE(SUM(status = 'done' AND finished_at >= ?), 0) AS done_last_hour, "
+            "COALESCE(SUM(status = 'error' AND finished_at >= ?), 0) AS failed_last_hour, "
+            "AVG(CASE WHEN status = 'done' AND finished_at >= ? THEN finished_at - started_at END) "
+            "AS avg_download_s, "
+            "AVG(CASE WHEN started_at >= ? THEN started_at - created_at END) AS avg_wait_s "
+            "FROM music_downloads",
+            (now - 3600, now - 3600, now - 86400, now - 86400),
+        ).fetchone()
+    stats = dict(row)
+    for key in ("avg_download_s", "avg_wait_s"):  # over the last 24 h
+        if stats[key] is not None:
+            stats[key] = round(stats[key], 1)
+    stats["workers"] = max(1, DOWNLOAD_WORKERS)
+    return stats
+
+
+def _prune_downloads(ttl_s: float = DOWNLOAD_TTL_S) -> int:
+    """Delete finished jobs older than ttl_s. The downloaded files stay."""
+    with _connect() as conn:
+        cur = conn.execute(
+            "DELETE FROM music_downloads WHERE status IN ('done', 'error') AND finished_at < ?",
+            (time.time() - ttl_s,),
+        )
+    return cur.rowcount
+
+
+# --------------------------------------------------------------------------------------
+# Library
+# --------------------------------------------------------------------------------------
+_SCAN_LOCK = threading.Lock()
+_LAST_SCAN = {"dir_mtime": None, "at": 0.0}
+LIBRARY_SORTS = {
+    "recent": "mtime DESC",
+    "title": "COALESCE(title, filename) COLLATE NOCASE, filename",
+    "artist": "artist IS NULL, artist COLLATE NOCASE, COALESCE(title, filename) COLLATE NOCASE",
+}
+
+
+def _first_tag(tags, key: str) -> Optional[str]:
+    values = tags.get(key) if tags else None
+    value = str(values[0]).strip() if values else ""
+    return value or None
+
+
+def _read_tags(path: str) -> dict:
+    """Title, artist, album, duration and bitrate from the file's headers.
+    Anything mutagen cannot read comes back as None."""
+    try:
+        import mutagen
+        audio = mutagen.File(path, easy=True)
+    except Exception as e:  # unreadable or truncated file: index it without tags
+        print(f"[music] could not read tags from {os.path.basename(path)}: {e}", flush=True)
+        audio = None
+    if audio is None:
+        return {"title": None, "artist": None, "album": None, "duration_s": None, "bitrate_kbps": None}
+    info = getattr(audio, "info", None)
+    length = getattr(info, "length", None)
+    bitrate = getattr(info, "bitrate", None)
+    return {
+        "title": _first_tag(audio.tags, "title"),
+        "artist": _first_tag(audio.tags, "artist"),
+        "album": _first_tag(audio.tags, "album"),
+        "duration_s": round(length, 2) if length else None,
+        "bitrate_kbps": round(bitrate / 1000) if bitrate else None,
+    }
+
+
+def _library_row(music_dir: str, filename: str, size: int, mtime: float) -> tuple:
+    tags = _read_tags(os.path.join(music_dir, filename))
+    return (filename, size, mtime, tags["title"], tags["artist"], tags["album"],
+            tags["duration_s"], tags["bitrate_kbps"], time.time())
+
+
+def _upsert_library_rows(conn: sqlite3.Connection, rows: list[tuple]) -> None:
+    conn.executemany(
+        "INSERT OR REPLACE INTO music_library (filename, size, mtime, title, artist, album, "
+        "duration_s, bitrate_kbps, indexed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+
+
+def _is_audio(filename: str) -> bool:
+    return filename.lower().endswith(AUDIO_EXTENSIONS)
+
+
+def scan_library(force: bool = False, wait: bool = True) -> Optional[dict]:
+    """Bring music_library in line with the music directory.
+
+    Skipped (returns None) while the directory's mtime is unchanged and the
+    last scan is under LIBRARY_RESCAN_S old, unless force. Otherwise one
+    scandir pass; only new files and files whose size or mtime changed are
+    opened, and rows for deleted files are dropped. Returns the counts.
+
+    With wait=False, also skipped while another scan is running (the startup
+    scan of a large directory can take minutes): requests serve the index as
+    it is rather than queue behind it.
+    """
+    init_db()
+    if not _SCAN_LOCK.acquire(blocking=wait):
+        return None
+    try:
+        return _scan_locked(force)
+    finally:
+        _SCAN_LOCK.release()
+
+
+def _scan_locked(force: bool) -> Optional[dict]:
+    """scan_library's pass; call with _SCAN_LOCK held."""
+    music_dir = get_music_dir()
+    dir_mtime = os.stat(music_dir).st_mtime_ns
+    if (not force and dir_mtime == _LAST_SCAN["dir_mtime"]
+            and time.monotonic() - _LAST_SCAN["at"] < LIBRARY_RESCAN_S):
+        return None
+    on_disk = {}
+    with os.scandir(music_dir) as entries:
+        for entry in entries:
+            if _is_audio(entry.name) and entry.is_file():
+                st = entry.stat()
+                on_disk[entry.name] = (st.st_size, st.st_mtime)
+    with _connect() as conn:
+        indexed = {row["filename"]: (row["size"], row["mtime"])
+                   for row in conn.execute("SELECT filename, size, mtime FROM music_library")}
+    changed = [name for name, sig in on_disk.items() if indexed.get(name) != sig]
+    removed = [name for name in indexed if name not in on_disk]
+    # Tags are read before the write transaction, so readers are never
+    # held up by file I/O.
+    rows = [_library_row(music_dir, name, *on_disk[name]) for name in changed]
+    if rows or removed:
+        with _connect() as conn:
+            conn.execute("BEGIN")
+            try:
+                _upsert_library_rows(conn, rows)
+                conn.executemany("DELETE FROM music_library WHERE filename = ?",
+                                 [(name,) for name in removed])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        for name in removed:
+            music_peaks.remove_peaks(os.path.join(music_dir, name))
+    _LAST_SCAN.update(dir_mtime=dir_mtime, at=time.monotonic())
+    return {"files": len(on_disk), "indexed": len(rows), "removed": len(removed)}
+
+
+def index_file(filename: str) -> bool:
+    """Index one file in the music directory now (after a download), without
+    waiting for the next scan. False if it is not there."""
+    init_db()
+    music_dir = get_music_dir()
+    try:
+        st = os.stat(os.path.join(music_dir, filename))
+    except OSError:
+        return False
+    row = _library_row(music_dir, filename, st.st_size, st.st_mtime)
+    with _connect() as conn:
+        _upsert_library_rows(conn, [row])
+    return True
+
+
+def _like_pattern(word: str) -> str:
+    return "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def get_library(q: Optional[str] = None, sort: str = "recent", offset: int = 0,
+                limit: int = LIBRARY_PAGE_SIZE) -> dict:
+    """One page of the library, newest first by default.
+
+    q matches title, artist, album and filename; with several words, every
+    word has to match one of them. Returns {"total", "offset", "limit", "items"}.
+    """
+    scan_library(wait=False)
+    where, params = [], []
+    for word in (q or "").split():
+        where.append("(title LIKE ? ESCAPE '\\' OR artist LIKE ? ESCAPE '\\' "
+                     "OR album LIKE ? ESCAPE '\\' OR filename LIKE ? ESCAPE '\\')")
+        params.extend([_like_pattern(word)] * 4)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    order_sql = LIBRARY_SORTS.get(sort, LIBRARY_SORTS["recent"])
+    with _connect() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM music_library {where_sql}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT filename, size, mtime, title, artist, album, duration_s, bitrate_kbps "
+            f"FROM music_library {where_sql} ORDER BY {order_sql} LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        ).fetchall()
+    return {"total": total, "offset": offset, "limit": limit, "items": [dict(r) for r in rows]}
+
+
+def library_filenames() -> list[str]:
+    """Every indexed filename, newest first."""
+    scan_library(wait=False)
+    with _connect() as conn:
+        return [row["filename"] for row in conn.execute(
+            "SELECT filename FROM music_library ORDER BY mtime DESC")]
+
+
+# --------------------------------------------------------------------------------------
+# Download
+# --------------------------------------------------------------------------------------
+def do_download(job_id: str, url: str) -> None:
+    """Run the yt-dlp download for a claimed job on a worker thread."""
+    try:
+        import yt_dlp
+    except ImportError:
+        _set_download(job_id, status="error", error="yt-dlp is not installed.", filename=None, progress=0)
+        return
+
+    music_dir = get_music_dir()
+    last = {"pct": 0, "db_write": time.monotonic()}
+
+    def progress_hook(d):
+        # yt-dlp calls this per received block; publish only whole-percent
+        # changes, and write them to the DB at most every PROGRESS_DB_INTERVAL_S.
+        if d['status'] == 'downloading':
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            downloaded = d.get('downloaded_bytes', 0)
+            if total:
+                pct = round(downloaded / total * 100)
+                if pct != last["pct"]:
+                    last["pct"] = pct
+                    if time.monotonic() - last["db_write"] >= PROGRESS_DB_INTERVAL_S:
+                        _set_download(job_id, progress=pct)
+                        last["db_write"] = time.monotonic()
+                    else:
+                        progress_hub.publish(_topic(job_id), {"progress": pct})
+        elif d['status'] == 'finished':
+            _set_download(job_id, progress=99)  # converting to MP3 still in progress
+
+    cookies_path = get_cookies_path()
+    cookies_found = os.path.exists(cookies_path)
+    is_render = bool(os.getenv("RENDER"))
+    _set_download(job_id, cookies_used=cookies_found)
+
+    ydl_opts = {
+        'format': 'bestaudio/best',
+        'outtmpl': os.path.join(music_dir, '%(title)s.%(ext)s'),
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '192',
+        }],
+        'progress_hooks': [progress_hook],
+        # Use iOS client first — bypasses YouTube bot detection on server IPs.
+        # Falls back to web and android if iOS fails.
+        'extractor_args': {'youtube': {'player_client': ['ios', 'android', 'web']}},
+        'quiet': True,
+        'no_warnings': True,
+    }
+    if cookies_found:
+        ydl_opts['cookiefile'] = cookies_path
+    elif not is_render:
+        # Local fallback: read cookies directly from Chrome (requires login on YouTube).
+        # Skipped on Render because the server has no browser installed.
+        ydl_opts['cookiesfrombrowser'] = ('chrome',)
+
+    try:
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+            raw_filename = ydl.prepare_filename(info)
+            mp3_filename = os.path.splitext(raw_filename)[0] + '.mp3'
+    except Exception as e:
+        _set_download(job_id, status="error", error=str(e))
+        return
+    try:
+        index_file(os.path.basename(mp3_filename))
+    except (OSError, sqlite3.Error) as e:  # the next scan picks the file up
+        print(f"[music] could not index {os.path.basename(mp3_filename)}: {e}", flush=True)
+    try:
+        # Waveform peaks for the editor are built in the background, ready
+        # before anyone opens the track.
+        music_peaks.build_peaks(os.path.join(music_dir, os.path.basename(mp3_filename)))
+    except OSError as e:
+        print(f"[music] could not start peaks for {os.path.basename(mp3_filename)}: {e}", flush=True)
+    _set_download(job_id, status="done", progress=100, filename=os.path.basename(mp3_filename))
+
+
+# --------------------------------------------------------------------------------------
+# Worker pool
+# --------------------------------------------------------------------------------------
+_QUEUE_WAKE = threading.Semaphore(0)
+_POOL_LOCK = threading.Lock()
+_WORKER_THREADS: list[threading.Thread] = []
+_WORKERS_STOP = threading.Event()
+_RUNNING: set[str] = set()  # jobs this process's workers are downloading
+_RUNNING_LOCK = threading.Lock()
+_LAST_PRUNE = 0.0
+
+
+def _requeue_stale_downloads(stale_s: float = DOWNLOAD_STALE_S) -> int:
+    """Put 'downloading' jobs whose worker stopped sending heartbeats back in
+    the queue: the process running them exited or was killed."""
+    with _connect() as conn:
+        cur = conn.execute(
+            "UPDATE music_downloads SET status = 'pending', progress = 0, started_at = NULL "
+            "WHERE status = 'downloading' AND COALESCE(heartbeat_at, 0) < ?",
+            (time.time() - stale_s,),
+        )
+    if cur.rowcount:
+        print(f"[music] requeued {cur.rowcount} interrupted download(s)", flush=True)
+    return cur.rowcount
+
+
+def _claim_next_download() -> Optional[tuple[str, str]]:
+    """Move the oldest pending job to 'downloading' and return (id, url).
+
+    The UPDATE only succeeds while the row is still pending, so of two
+    workers — in this process or another — exactly one gets each job.
+    """
+    with _connect() as conn:
+        while True:
+            row = conn.execute(
+                "SELECT id, url FROM music_downloads WHERE status = 'pending' ORDER BY rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            cur = conn.execute(
+                "UPDATE music_downloads SET status = 'downloading', progress = 0, error = NULL, "
+                "started_at = ?, heartbeat_at = ? WHERE id = ? AND status = 'pending'",
+                (now, now, row["id"]),
+            )
+            if cur.rowcount == 1:
+                progress_hub.publish(_topic(row["id"]), {"status": "downloading", "progress": 0,
+                                                         "queue_position": None})
+                return row["id"], row["url"]
+
+
+def _publish_queue_positions() -> None:
+    """Tell watched pending jobs that they moved up."""
+    with _connect() as conn:
+        pending = [row["id"] for row in conn.execute(
+            "SELECT id FROM music_downloads WHERE status = 'pending' ORDER BY rowid")]
+    for position, job_id in enumerate(pending, start=1):
+        if progress_hub.has_subscribers(_topic(job_id)):
+            progress_hub.publish(_topic(job_id), {"queue_position": position})
+
+
+def _heartbeat(stop: threading.Event) -> None:
+    while not stop.wait(HEARTBEAT_INTERVAL_S):
+        with _RUNNING_LOCK:
+            running = list(_RUNNING)
+        if not running:
+            continue
+        try:
+            with _connect() as conn:
+                conn.execute(
+                    f"UPDATE music_downloads SET heartbeat_at = ? "
+                    f"WHERE id IN ({', '.join('?' * len(running))})",
+                    (time.time(), *running),
+                )
+        except sqlite3.Error as e:
+            print(f"[music] heartbeat failed: {e}", flush=True)
+
+
+def _maybe_prune() -> None:
+    global _LAST_PRUNE
+    if time.monotonic() - _LAST_PRUNE < PRUNE_INTERVAL_S:
+        return
+    _LAST_PRUNE = time.monotonic()
+    removed = _prune_downloads()
+    if removed:
+        print(f"[music] pruned {removed} finished download(s)", flush=True)
+
+
+def _download_worker(stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            _maybe_prune()
+            _requeue_stale_downloads()
+            claimed = _claim_next_download()
+            if claimed is not None:
+                _publish_queue_positions()
+        except sqlite3.Error as e:
+            print(f"[music] could not claim a download: {e}", flush=True)
+            claimed = None
+        if claimed is None:
+            _QUEUE_WAKE.acquire(timeout=DOWNLOAD_POLL_INTERVAL_S)
+            continue
+        job_id, url = claimed
+        with _RUNNING_LOCK:
+            _RUNNING.add(job_id)
+        try:
+            do_download(job_id, url)
+        except Exception as e:  # do_download records its own errors; this is a last resort
+            _set_download(job_id, status="error", error=str(e))
+        finally:
+            with _RUNNING_LOCK:
+                _RUNNING.discard(job_id)
+
+
+def start_download_workers() -> None:
+    """Start the pool's worker threads unless they are running. Runs at app
+    startup and from submit_download()."""
+    global _WORKERS_STOP
+    with _POOL_LOCK:
+        if _WORKER_THREADS:
+            return
+        init_db()
+        _WORKERS_STOP = stop = threading.Event()
+        for n in range(max(1, DOWNLOAD_WORKERS)):
+            t = threading.Thread(target=_download_worker, args=(stop,), name=f"music-download-{n}",
+                                 daemon=True)
+            t.start()
+            _WORKER_THREADS.append(t)
+        t = threading.Thread(target=_heartbeat, args=(stop,), name="music-download-heartbeat", daemon=True)
+        t.start()
+        _WORKER_THREADS.append(t)
+
+
+def stop_download_workers(wait: float = 0) -> None:
+    """Stop claiming jobs and give running downloads up to `wait` seconds.
+
+    A download cut off by the exit stays 'downloading' until its heartbeat
+    goes stale, then any process's workers requeue it.
+    """
+    with _POOL_LOCK:
+        threads, stop = list(_WORKER_THREADS), _WORKERS_STOP
+        _WORKER_THREADS.clear()
+        stop.set()
+    for _ in threads:
+        _QUEUE_WAKE.release()
+    deadline = time.monotonic() + wait
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+
+
+def _initial_scan() -> None:
+    try:
+        counts = scan_library(force=True)
+    except (OSError, sqlite3.Error) as e:
+        print(f"[music] library scan failed: {e}", flush=True)
+        return
+    if counts and (counts["indexed"] or counts["removed"]):
+        print(f"[music] library: {counts['files']} file(s), indexed {counts['indexed']}, "
+              f"removed {counts['removed']}", flush=True)
+
+
+@asynccontextmanager
+async def download_workers(app):
+    # Workers start with the app, so downloads queued before a restart resume
+    # without waiting for the next request. The first library scan (which
+    # reads tags of every file not yet indexed) runs beside them rather than
+    # in the first /music/library request.
+    start_download_workers()
+    threading.Thread(target=_initial_scan, name="music-library-scan", daemon=True).start()
+    yield
+    stop_download_workers()
+    music_peaks.shutdown()
@@ -0,0 +1,275 @@
+"""Waveform peaks for the MP3 editor, computed once per track on the server.
+
+A track is decoded by ffmpeg (already required for yt-dlp's MP3 conversion)
+to mono 16-bit PCM at PEAKS_SAMPLE_RATE and reduced to min/max pairs, one
+pair per 2**k samples, in ZOOM_LEVELS resolutions: zoom 0 is the coarsest
+(a 10-minute track is a few hundred pairs), each step up doubles the
+resolution. Values are int8, as the waveform only needs to be drawn.
+
+The levels are stored in <music dir>/.peaks/<filename>.npz with the source's
+size and mtime; a cache that no longer matches its source is rebuilt.
+Builds run in a small process pool, so decoding and reducing a long track
+never competes with request handling for the GIL; they are started when a
+download finishes, or by the first request for a track without peaks.
+"""
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import BrokenExecutor, Future
+from typing import Optional
+
+import numpy as np
+
+PEAKS_SAMPLE_RATE = 22050
+ZOOM_LEVELS = 8
+MAX_ZOOM = ZOOM_LEVELS - 1
+FINEST_SAMPLES_PER_PEAK = 256  # zoom MAX_ZOOM: ~86 pairs per second
+PEAKS_WORKERS = int(os.getenv("MUSIC_PEAKS_WORKERS", "1") or 1)
+# A build's ffmpeg is killed after BUILD_TIMEOUT_S; requests wait a little
+# longer than that, so they see the build's own error rather than a timeout.
+BUILD_TIMEOUT_S = 240.0
+PEAKS_TIMEOUT_S = BUILD_TIMEOUT_S + 30.0
+PEAKS_DIRNAME = ".peaks"
+_READ_PEAKS = 4096  # finest-level pairs decoded per read from ffmpeg
+
+
+class PeaksUnavailable(Exception):
+    """The track could not be decoded (no ffmpeg, or not audio ffmpeg reads)."""
+
+
+def samples_per_peak(zoom: int) -> int:
+    return FINEST_SAMPLES_PER_PEAK << (MAX_ZOOM - zoom)
+
+
+def peaks_path(path: str) -> str:
+    directory, filename = os.path.split(path)
+    return os.path.join(directory, PEAKS_DIRNAME, filename + ".npz")
+
+
+def remove_peaks(path: str) -> None:
+    try:
+        os.remove(peaks_path(path))
+    except FileNotFoundError:
+        pass
+
+
+# --------------------------------------------------------------------------------------
+# Build (runs in the pool's worker processes)
+# --------------------------------------------------------------------------------------
+def _decode_pcm(path: str, chunk_samples: int, timeout: float = BUILD_TIMEOUT_S):
+    """Yield int16 mono samples from ffmpeg, chunk_samples at a time.
+
+    ffmpeg's stderr goes to a temp file rather than a pipe: a damaged file
+    can log more than a pipe buffer holds, and a pipe nobody reads until
+    stdout ends would stall ffmpeg. ffmpeg is killed after timeout seconds.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise PeaksUnavailable("ffmpeg is not installed.")
+    with tempfile.TemporaryFile() as stderr:
+        proc = subprocess.Popen(
+            [ffmpeg, "-v", "error", "-nostdin", "-i", path, "-vn", "-ac", "1",
+             "-ar", str(PEAKS_SAMPLE_RATE), "-f", "s16le", "-acodec", "pcm_s16le", "-"],
+            stdout=subprocess.PIPE, stderr=stderr,
+        )
+        deadline = threading.Timer(timeout, proc.kill)
+        deadline.start()
+        try:
+            while chunk := proc.stdout.read(chunk_samples * 2):
+                yield np.frombuffer(chunk[:len(chunk) // 2 * 2], dtype="<i2")
+            returncode = proc.wait()
+            if not deadline.is_alive() and returncode != 0:
+                raise PeaksUnavailable(f"decoding took longer than {timeout:.0f} s.")
+            if returncode != 0:
+                stderr.seek(0)
+                lines = stderr.read().decode("utf-8", "replace").strip().splitlines()
+                raise PeaksUnavailable(lines[-1] if lines else "ffmpeg failed.")
+        finally:
+            deadline.cancel()
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+
+def _reduce(samples: np.ndarray, per_peak: int) -> tuple[np.ndarray, np.ndarray]:
+    """Min and max of each run of per_peak samples (the last run may be short)."""
+    pad = -len(samples) % per_peak
+    if pad:
+        samples = np.concatenate([samples, np.repeat(samples[-1:], pad)])
+    runs = samples.reshape(-1, per_peak)
+    return runs.min(axis=1), runs.max(axis=1)
+
+
+def peak_levels(chunks) -> list[np.ndarray]:
+    """[zoom 0, ..., MAX_ZOOM] for a stream of int16 sample chunks; each
+    level is an int8 array of interleaved min, max pairs. Every chunk but
+    the last must be a multiple of FINEST_SAMPLES_PER_PEAK long."""
+    mins, maxs = [], []
+    for chunk in chunks:
+        if len(chunk):
+            lo, hi = _reduce(chunk, FINEST_SAMPLES_PER_PEAK)
+            mins.append(lo)
+            maxs.append(hi)
+    lo = np.concatenate(mins) if mins else np.zeros(0, dtype="<i2")
+    hi = np.concatenate(maxs) if maxs else np.zeros(0, dtype="<i2")
+    levels = []
+    for _ in range(ZOOM_LEVELS):
+        pairs = np.empty(2 * len(lo), dtype=np.int8)
+        pairs[0::2] = lo >> 8
+        pairs[1::2] = hi >> 8
+        levels.append(pairs)
+        if len(lo):
+            lo, hi = _reduce(lo, 2)[0], _reduce(hi, 2)[1]
+    return levels[::-1]
+
+
+def _build(path: str) -> str:
+    st = os.stat(path)
+    chunks = _decode_pcm(path, FINEST_SAMPLES_PER_PEAK * _READ_PEAKS)
+    total = [0]
+
+    def counted():
+        for chunk in chunks:
+            total[0] += len(chunk)
+            yield chunk
+
+    levels = peak_levels(counted())
+    dest = peaks_path(path)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, meta=np.array([st.st_size, st.st_mtime_ns, total[0]], dtype=np.int64),
+             **{f"zoom{z}": level for z, level in enumerate(levels)})
+    os.replace(tmp, dest)
+    return dest
+
+
+# --------------------------------------------------------------------------------------
+# Pool and cache
+# --------------------------------------------------------------------------------------
+_POOL_LOCK = threading.Lock()
+_POOL = None
+_PENDING: dict[str, Future] = {}
+
+
+def _start_pool():
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    # forkserver, as the translator's extract pool: builds are started from
+    # threads of the web server.
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=max(1, PEAKS_WORKERS),
+                               mp_context=multiprocessing.get_context(method))
+
+
+def _get_pool():
+    global _POOL
+    if _POOL is None:
+        try:
+            _POOL = _start_pool()
+        except Exception as e:
+            from concurrent.futures import ThreadPoolExecutor
+            print(f"[music] peaks process pool failed ({type(e).__name__}: {e}); "
+                  f"building in threads", flush=True)
+            _POOL = ThreadPoolExecutor(max_workers=max(1, PEAKS_WORKERS))
+    return _POOL
+
+
+def shutdown() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+        _PENDING.clear()
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _read_meta(dest: str) -> Optional[np.ndarray]:
+    try:
+        with np.load(dest) as data:
+            return data["meta"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _is_current(path: str) -> bool:
+    meta = _read_meta(peaks_path(path))
+    if meta is None:
+        return False
+    st = os.stat(path)
+    return int(meta[0]) == st.st_size and int(meta[1]) == st.st_mtime_ns
+
+
+def build_peaks(path: str) -> Future:
+    """Start building the track's peaks unless they are current or already
+    being built; returns the build's future (already done when current)."""
+    with _POOL_LOCK:
+        future = _PENDING.get(path)
+        if future is not None:
+            return future
+        if _is_current(path):
+            future = Future()
+            future.set_result(peaks_path(path))
+            return future
+        pool = _get_pool()
+        try:
+            future = pool.submit(_build, path)
+        except BrokenExecutor as e:
+            _discard_pool(pool)
+            raise PeaksUnavailable("the peaks worker stopped; try again.") from e
+        _PENDING[path] = future
+    future.add_done_callback(lambda f: _finished(path, f, pool))
+    return future
+
+
+def _discard_pool(pool) -> None:
+    """Drop a pool whose worker died, so the next build starts a new one.
+    Call with _POOL_LOCK held."""
+    global _POOL
+    if _POOL is pool:
+        _POOL = None
+        print("[music] peaks pool broke; starting a new one on the next build", flush=True)
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _finished(path: str, future: Future, pool) -> None:
+    error = None if future.cancelled() else future.exception()
+    with _POOL_LOCK:
+        if _PENDING.get(path) is future:
+            del _PENDING[path]
+        if isinstance(error, BrokenExecutor):
+            _discard_pool(pool)
+    if error is not None:
+        print(f"[music] peaks for {os.path.basename(path)} failed: {error}", flush=True)
+
+
+def get_peaks(path: str, zoom: int, timeout: float = PEAKS_TIMEOUT_S) -> dict:
+    """The track's peaks at one zoom level, building them first if needed.
+
+    Raises FileNotFoundError for a missing track and PeaksUnavailable when it
+    cannot be decoded, the build outlasts timeout, or the worker died.
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(path)
+    try:
+        dest = build_peaks(path).result(timeout)
+    except TimeoutError as e:
+        raise PeaksUnavailable("the waveform is still being built; try again.") from e
+    except BrokenExecutor as e:
+        raise PeaksUnavailable("the peaks worker stopped; try again.") from e
+    with np.load(dest) as data:
+        meta, pairs = data["meta"], data[f"zoom{zoom}"]
+    return {
+        "zoom": zoom,
+        "max_zoom": MAX_ZOOM,
+        "sample_rate": PEAKS_SAMPLE_RATE,
+        "samples_per_peak": samples_per_peak(zoom),
+        "duration_s": round(int(meta[2]) / PEAKS_SAMPLE_RATE, 3),
+        "length": len(pairs) // 2,
+        "peaks": pairs.tolist(),
+    }
@@ -5,9 +5,21 @@ Resolution chain:
 
 Default deny: missing username, missing/empty tab_group, missing group row,
 or empty tab_keys all resolve to an empty set (the user sees no tabs).
+
+Caching: a page view asks for the set several times (tab_guard /
+require_admin in the route, then base.html for the top bar). The resolved set
+is kept per username in a small in-process LRU with a TTL, and memoized on
+request.state so one request resolves it at most once. The admin routes that
+change users.tab_group or tab_group.tab_keys call invalidate_tab_cache(); the
+TTL bounds staleness for writes made outside this process (migrations, sqlite
+shell, other workers).
 """
 from __future__ import annotations
 
+import threading
+import time
+from collections import OrderedDict
+
 from fastapi import Request
 from fastapi.responses import RedirectResponse
 
@@ -22,26 +34,78 @@ def parse_tab_keys(csv: str | None) -> set[str]:
     return {part.strip() for part in csv.split(",") if part.strip()}
 
 
-def allowed_tabs_for(request: Request) -> set[str]:
-    """Return the set of tab keys the current session user may access."""
-    login_username = request.session.get("login_username")
-    if not login_username:
-        return set()
+# username -> (expires_at, frozenset of tab keys), least recently used first.
+TAB_CACHE_TTL = 60.0
+TAB_CACHE_MAX = 512
+_tab_cache: OrderedDict[str, tuple[float, frozenset[str]]] = OrderedDict()
+_tab_cache_lock = threading.Lock()
+
+
+def invalidate_tab_cache(username: str | None = None) -> None:
+    """Drop the cached tab set of one user, or of everyone when username is None.
+
+    Call after committing a change to users.tab_group (one user) or to
+    tab_group.tab_keys / the tab_group rows themselves (every member may be
+    affected, so clear all).
+    """
+    with _tab_cache_lock:
+        if username is None:
+            _tab_cache.clear()
+        else:
+            _tab_cache.pop(username, None)
+
+
+def _load_tabs(login_username: str) -> frozenset[str]:
+    """Resolve a username's tab set from the DB (two queries)."""
     db = SessionLocal()
     try:
         user = db.query(User).filter(User.username == login_username).first()
         if not user or not user.tab_group:
-            return set()
+            return frozenset()
         group = db.query(TabGroup).filter(
             TabGroup.group_key == user.tab_group
         ).first()
         if not group:
-            return set()
-        return parse_tab_keys(group.tab_keys)
+            return frozenset()
+        return frozenset(parse_tab_keys(group.tab_keys))
     finally:
         db.close()
 
 
+def cached_tabs_for(login_username: str) -> frozenset[str]:
+    """Return a username's tab set, from the LRU cache when still fresh."""
+    now = time.monotonic()
+    with _tab_cache_lock:
+        hit = _tab_cache.get(login_username)
+        if hit and hit[0] > now:
+            _tab_cache.move_to_end(login_username)
+            return hit[1]
+    tabs = _load_tabs(login_username)
+    with _tab_cache_lock:
+        _tab_cache[login_username] = (now + TAB_CACHE_TTL, tabs)
+        _tab_cache.move_to_end(login_username)
+        while len(_tab_cache) > TAB_CACHE_MAX:
+            _tab_cache.popitem(last=False)
+    return tabs
+
+
+def allowed_tabs_for(request: Request) -> frozenset[str]:
+    """Return the set of tab keys the current session user may access.
+
+    Memoized on request.state, keyed by username so a login inside the same
+    request (which changes the session user) still resolves afresh.
+    """
+    login_username = request.session.get("login_username")
+    if not login_username:
+        return frozenset()
+    memo = getattr(request.state, "allowed_tabs", None)
+    if memo and memo[0] == login_username:
+        return memo[1]
+    tabs = cached_tabs_for(login_username)
+    request.state.allowed_tabs = (login_username, tabs)
+    return tabs
+
+
 def tab_guard(request: Request, tab_key: str):
     """Return a redirect to /no_access/ if tab_key is not allowed, else None."""
     if tab_key in allowed_tabs_for(request):
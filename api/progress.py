@@ -0,0 +1,115 @@
+"""In-process pub/sub for background-job progress, streamed to the browser as
+Server-Sent Events.
+
+Background work runs in plain threads (translator queue workers, music
+downloads) while SSE responses are coroutines on the event loop. A thread
+publishes a patch for a topic ("translator:<job_id>", "music:<job_id>"); the
+hub merges it into the topic's latest state and wakes each subscriber through
+its loop's call_soon_threadsafe. A subscriber that falls behind only ever sees
+the newest state, so a fast publisher cannot queue up work for a slow client.
+
+The hub lives in one process; it complements the job stores (translator.db,
+music's download_jobs), which every stream reads once for its first event.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Callable
+
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+TERMINAL_STATUSES = frozenset({"done", "error", "not_found"})
+HEARTBEAT_S = 15.0  # idle streams send a comment line so proxies keep them open
+# Latest state is kept for this many topics, most recently published first;
+# older ones fall back to the job store's snapshot.
+LATEST_MAX = 512
+
+
+class _Subscriber:
+    __slots__ = ("loop", "event")
+
+    def __init__(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def wake(self) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:  # loop already closed: the client is gone
+            pass
+
+
+class ProgressHub:
+    def __init__(self, max_topics: int = LATEST_MAX) -> None:
+        self._lock = threading.Lock()
+        self._latest: OrderedDict[str, dict] = OrderedDict()
+        self._subscribers: dict[str, set[_Subscriber]] = {}
+        self._max_topics = max_topics
+
+    def publish(self, topic: str, patch: dict) -> None:
+        """Merge patch into the topic's state and wake its subscribers. Thread-safe."""
+        with self._lock:
+            self._latest[topic] = {**self._latest.pop(topic, {}), **patch}
+            while len(self._latest) > self._max_topics:
+                self._latest.popitem(last=False)
+            subscribers = list(self._subscribers.get(topic, ()))
+        for sub in subscribers:
+            sub.wake()
+
+    def latest(self, topic: str) -> dict:
+        with self._lock:
+            return dict(self._latest.get(topic, {}))
+
+    def has_subscribers(self, topic: str) -> bool:
+        with self._lock:
+            return bool(self._subscribers.get(topic))
+
+    async def stream(self, topic: str, snapshot: Callable[[], dict],
+                     heartbeat: float = HEARTBEAT_S) -> AsyncIterator[str]:
+        """SSE chunks: the current state, then each change, until a terminal status.
+
+        snapshot() reads the job store (in the threadpool) for state published
+        before this stream subscribed; the hub's newer patches are laid over it.
+        """
+        sub = _Subscriber()
+        with self._lock:
+            self._subscribers.setdefault(topic, set()).add(sub)
+        try:
+            state = {**await run_in_threadpool(snapshot), **self.latest(topic)}
+            sent = None
+            while True:
+                if state != sent:
+                    yield f"data: {json.dumps(state, ensure_ascii=False)}\n\n"
+                    sent = state
+                if state.get("status") in TERMINAL_STATUSES:
+                    return
+                try:
+                    await asyncio.wait_for(sub.event.wait(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                sub.event.clear()
+                state = {**state, **self.latest(topic)}
+        finally:
+            with self._lock:
+                subs = self._subscribers.get(topic)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subscribers[topic]
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        # no-transform/X-Accel-Buffering: keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+    )
+
+
+progress_hub = ProgressHub()
@@ -0,0 +1,338 @@
+"""Uploaded datasets for the Project tab, parsed once and kept on disk.
+
+An upload is keyed by the SHA-256 of its bytes; the hex digest is the token
+the client sends back for later sheet, column and row requests, so choosing
+another sheet no longer means uploading and parsing the file again, and
+uploading the same file twice reuses the first parse.
+
+Each sheet is stored column by column under <DATASETS_DIR>/<token>/sheets/<n>/:
+
+- "i8" / "f8": <col>.npy (SQLite columns whose values are all ints / floats)
+- "str" / "json": the cells' UTF-8 bytes in <col>.bin, with <col>.off.npy
+  holding n + 1 offsets; "json" cells are JSON-encoded (SQLite columns of
+  mixed type or with NULLs)
+
+Arrays are memory-mapped, so a request reads only the columns and rows it
+asks for. Workbooks and CSVs are converted entirely at upload (one parse of
+the workbook); a SQLite upload is kept as its file and each table is
+converted when first asked for. Cells keep the values the routes returned
+before the cache: strings for workbooks and CSVs, raw values for SQLite.
+
+Datasets are evicted least recently used first once the store is over
+DATASETS_QUOTA_BYTES.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from typing import Optional
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if os.getenv("RENDER"):
+    DATASETS_DIR = "/var/data/project_datasets"
+else:
+    DATASETS_DIR = os.path.join(BASE_DIR, "data", "project_datasets")
+DATASETS_QUOTA_BYTES = int(os.getenv("PROJECT_DATASETS_QUOTA_MB", "256") or 256) * 1024 * 1024
+
+STALE_TMP_S = 3600.0
+
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+CSV_ENCODINGS = ("utf-8", "utf-8-sig", "shift_jis", "cp932", "latin-1")
+
+_LOCK = threading.Lock()
+
+
+class DatasetNotFound(Exception):
+    """The token is unknown or its dataset was evicted; upload the file again."""
+
+
+def _dataset_dir(token: str) -> str:
+    if len(token) != 64 or any(c not in "0123456789abcdef" for c in token):
+        raise DatasetNotFound(token)
+    return os.path.join(DATASETS_DIR, token)
+
+
+def _write_json(path: str, data: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def _read_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --------------------------------------------------------------------------------------
+# Columnar sheets
+# --------------------------------------------------------------------------------------
+def _column_kind(values: list) -> str:
+    if values and all(type(v) is int for v in values):
+        return "i8" if all(-2**63 <= v < 2**63 for v in values) else "json"
+    if values and all(type(v) is float for v in values):
+        return "f8"
+    if all(type(v) is str for v in values):
+        return "str"
+    return "json"
+
+
+def _json_cell(value) -> str:
+    if isinstance(value, bytes):
+        value = value.hex()
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _write_sheet(sheet_dir: str, names: list[str], columns: list[list]) -> None:
+    """Write a sheet's columns (lists of cell values) into sheet_dir."""
+    os.makedirs(sheet_dir)
+    meta = {"columns": [], "rows": len(columns[0]) if columns else 0}
+    for n, (name, values) in enumerate(zip(names, columns)):
+        kind = _column_kind(values)
+        base = os.path.join(sheet_dir, str(n))
+        if kind in ("i8", "f8"):
+            np.save(base + ".npy", np.asarray(values, dtype=kind))
+        else:
+            cells = [(v if kind == "str" else _json_cell(v)).encode("utf-8") for v in values]
+            offsets = np.zeros(len(cells) + 1, dtype=np.int64)
+            np.cumsum([len(c) for c in cells], out=offsets[1:])
+            with open(base + ".bin", "wb") as f:
+                f.write(b"".join(cells))
+            np.save(base + ".off.npy", offsets)
+        meta["columns"].append({"name": name, "kind": kind})
+    _write_json(os.path.join(sheet_dir, "meta.json"), meta)
+
+
+def _read_column(sheet_dir: str, n: int, kind: str, start: int, stop: int) -> list:
+    base = os.path.join(sheet_dir, str(n))
+    if kind in ("i8", "f8"):
+        return np.load(base + ".npy", mmap_mode="r")[start:stop].tolist()
+    offsets = np.load(base + ".off.npy", mmap_mode="r")[start:stop + 1]
+    if len(offsets) < 2:
+        return []
+    with open(base + ".bin", "rb") as f:
+        f.seek(int(offsets[0]))
+        data = f.read(int(offsets[-1] - offsets[0]))
+    edges = (offsets - offsets[0]).tolist()
+    cells = [data[a:b].decode("utf-8") for a, b in zip(edges, edges[1:])]
+    return cells if kind == "str" else [json.loads(c) for c in cells]
+
+
+def _frame_columns(df) -> tuple[list[str], list[list]]:
+    """A DataFrame's cells as the Project routes have always sent them: str()
+    of every value, with missing ones as pandas prints them."""
+    import pandas as pd
+
+    df.columns = [str(c) for c in df.columns]
+    df = df.where(pd.notnull(df), None).astype(str)
+    return list(df.columns), [df.iloc[:, i].tolist() for i in range(df.shape[1])]
+
+
+# --------------------------------------------------------------------------------------
+# Parsing (once per upload)
+# --------------------------------------------------------------------------------------
+def _parse_csv(content: bytes):
+    import pandas as pd
+
+    for enc in CSV_ENCODINGS:
+        try:
+            return pd.read_csv(io.BytesIO(content), encoding=enc)
+        except Exception:
+            continue
+    raise ValueError("Could not decode CSV file. Please save as UTF-8.")
+
+
+def _build_dataset(root: str, ext: str, content: bytes) -> dict:
+    """Parse content into root; returns the manifest."""
+    os.makedirs(os.path.join(root, "sheets"))
+    if ext in EXCEL_EXTENSIONS:
+        import pandas as pd  # heavy; only the Project routes need it
+
+        frames = pd.read_excel(io.BytesIO(content), sheet_name=None)
+        sheets = list(frames)
+        for n, df in enumerate(frames.values()):
+            _write_sheet(os.path.join(root, "sheets", str(n)), *_frame_columns(df))
+        manifest = {"file_type": ext.lstrip("."), "sheets": sheets}
+    elif ext == ".csv":
+        _write_sheet(os.path.join(root, "sheets", "0"), *_frame_columns(_parse_csv(content)))
+        manifest = {"file_type": "csv", "sheets": None}
+    elif ext in SQLITE_EXTENSIONS:
+        source = os.path.join(root, "source.sqlite")
+        with open(source, "wb") as f:
+            f.write(content)
+        with _open_sqlite(source) as con:
+            tables = [t[0] for t in con.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+        manifest = {"file_type": "sqlite", "sheets": tables}
+    else:
+        raise ValueError(f"Unsupported file type: {ext}")
+    manifest["created_at"] = time.time()
+    _write_json(os.path.join(root, "manifest.json"), manifest)
+    return manifest
+
+
+def _open_sqlite(path: str):
+    # The store's own copy of the upload, so it may be opened read-write
+    # (a WAL-mode file needs to create its -shm to be read at all).
+    return closing(sqlite3.connect(path))
+
+
+def ingest(filename: str, content: bytes) -> dict:
+    """Store an upload unless the same bytes are already stored.
+
+    Returns {"token", "file_type", "sheets"} (sheets is None for a CSV).
+    Raises ValueError for unsupported or undecodable files.
+    """
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in EXCEL_EXTENSIONS + SQLITE_EXTENSIONS + (".csv",):
+        raise ValueError(f"Unsupported file type: {ext}")
+    token = hashlib.sha256(content).hexdigest()
+    root = _dataset_dir(token)
+    try:
+        manifest = _touch(root)
+    except DatasetNotFound:
+        os.makedirs(DATASETS_DIR, exist_ok=True)
+        tmp = os.path.join(DATASETS_DIR, f".tmp-{uuid.uuid4().hex}")
+        try:
+            manifest = _build_dataset(tmp, ext, content)
+            os.rename(tmp, root)
+        except OSError:
+            if not os.path.isdir(root):  # not lost to a concurrent upload of the same file
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        _evict(keep=token)
+    return {"token": token, "file_type": manifest["file_type"], "sheets": manifest["sheets"]}
+
+
+def _touch(root: str) -> dict:
+    """The dataset's manifest, marking it as just used for LRU eviction."""
+    path = os.path.join(root, "manifest.json")
+    try:
+        os.utime(path)
+        return _read_json(path)
+    except FileNotFoundError:
+        raise DatasetNotFound(os.path.basename(root)) from None
+
+
+# --------------------------------------------------------------------------------------
+# Reading
+# --------------------------------------------------------------------------------------
+def _sheet_dir(root: str, manifest: dict, sheet: Optional[str]) -> str:
+    sheets = manifest["sheets"]
+    if sheets is None:
+        return os.path.join(root, "sheets", "0")
+    if sheet not in sheets:
+        raise ValueError(f"No sheet named {sheet!r}.")
+    n = sheets.index(sheet)
+    sheet_dir = os.path.join(root, "sheets", str(n))
+    if manifest["file_type"] == "sqlite" and not os.path.isdir(sheet_dir):
+        _materialize_table(root, sheet, sheet_dir)
+    return sheet_dir
+
+
+def _materialize_table(root: str, table: str, sheet_dir: str) -> None:
+    with _open_sqlite(os.path.join(root, "source.sqlite")) as con:
+        cursor = con.execute(f'SELECT * FROM "{table.replace(chr(34), chr(34) * 2)}"')
+        names = [d[0] for d in cursor.description]
+        rows = cursor.fetchall()
+    columns = [list(col) for col in zip(*rows)] if rows else [[] for _ in names]
+    tmp = f"{sheet_dir}.tmp-{uuid.uuid4().hex}"
+    try:
+        _write_sheet(tmp, names, columns)
+        os.rename(tmp, sheet_dir)
+    except OSError:
+        if not os.path.isdir(sheet_dir):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    _evict(keep=os.path.basename(root))
+
+
+def sheet_rows(token: str, sheet: Optional[str] = None, columns: Optional[list[str]] = None,
+               offset: int = 0, limit: Optional[int] = None) -> dict:
+    """Rows of one sheet (the CSV's only one when sheet is None) from the store.
+
+    columns picks and orders the columns returned (default: all); offset and
+    limit page the rows. Returns {"columns", "rows", "total"}; raises
+    DatasetNotFound for an unknown or evicted token and ValueError for an
+    unknown sheet or column.
+    """
+    root = _dataset_dir(token)
+    manifest = _touch(root)
+    sheet_dir = _sheet_dir(root, manifest, sheet)
+    try:
+        meta = _read_json(os.path.join(sheet_dir, "meta.json"))
+    except FileNotFoundError:
+        raise DatasetNotFound(token) from None
+    names = [c["name"] for c in meta["columns"]]
+    if columns is None:
+        picked = list(range(len(names)))
+    else:
+        missing = [c for c in columns if c not in names]
+        if missing:
+            raise ValueError(f"No column named {missing[0]!r}.")
+        picked = [names.index(c) for c in columns]
+    total = meta["rows"]
+    start = min(offset, total)
+    stop = total if limit is None else min(total, start + limit)
+    values = [_read_column(sheet_dir, n, meta["columns"][n]["kind"], start, stop) for n in picked]
+    picked_names = [names[n] for n in picked]
+    rows = [dict(zip(picked_names, row)) for row in zip(*values)] if values else \
+        [{} for _ in range(stop - start)]
+    return {"columns": picked_names, "rows": rows, "total": total}
+
+
+# --------------------------------------------------------------------------------------
+# Eviction
+# --------------------------------------------------------------------------------------
+def _tree_size(path: str) -> int:
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def _evict(keep: Optional[str] = None, quota: Optional[int] = None) -> list[str]:
+    """Delete least recently used datasets until the store fits the quota.
+    The dataset `keep` (just written) stays even if it alone is over."""
+    quota = DATASETS_QUOTA_BYTES if quota is None else quota
+    with _LOCK:
+        entries = []
+        for entry in os.scandir(DATASETS_DIR):
+            if entry.name.startswith(".tmp-"):
+                # left by a process that died mid-upload
+                if time.time() - entry.stat().st_mtime > STALE_TMP_S:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                continue
+            if entry.is_dir():
+                try:
+                    used = os.path.getmtime(os.path.join(entry.path, "manifest.json"))
+                except OSError:
+                    used = 0.0
+                entries.append((used, entry.name, _tree_size(entry.path)))
+        total = sum(size for _, _, size in entries)
+        evicted = []
+        for _, name, size in sorted(entries):
+            if total <= quota:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(DATASETS_DIR, name), ignore_errors=True)
+            total -= size
+            evicted.append(name)
+    if evicted:
+        print(f"[project] evicted {len(evicted)} cached dataset(s)", flush=True)
+    return evicted
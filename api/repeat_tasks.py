@@ -1,13 +1,34 @@
 """Expand a Schedule template row (is_repeat_task=1) into virtual per-date dicts
 that match the daily-task render shape consumed by schedule_indicate_00.html.
 
+Expansion is arithmetic: the visible window is parsed once (RepeatWindow) into
+proleptic ordinals, and each template's occurrences are generated by stepping
+from its first match inside [range_start, range_end] ∩ window — by 1 day, by
+7 * interval days per weekday, or month by month — instead of testing every
+visible date against the pattern.
+
+Patterns (RRULE equivalents in brackets):
+  every_day              every `repeat_interval` days from range_start  [FREQ=DAILY;INTERVAL=n]
+  every_weekday          Mon–Fri                                        [FREQ=WEEKLY;BYDAY=MO..FR]
+  every_specific_weekday repeat_weekdays, every `repeat_interval` weeks
+                         counted from range_start's week                [FREQ=WEEKLY;INTERVAL=n;BYDAY=..]
+  monthly_on_day         day `repeat_month_day` of every `repeat_interval`
+                         months from range_start's month; months without
+                         that day are skipped, as RRULE does            [FREQ=MONTHLY;INTERVAL=n;BYMONTHDAY=d]
+
+A NULL / < 1 repeat_interval means 1. Without a range_start there is no anchor
+to count from, so the interval is treated as 1.
+
 Pure functions only — no DB or HTTP — so this can be smoke-checked in a REPL.
 """
 from __future__ import annotations
 
-from datetime import date, datetime
+from datetime import date
+from functools import lru_cache
 from typing import Iterable
 
+REPEAT_TYPES = ("every_day", "every_weekday", "every_specific_weekday", "monthly_on_day")
+
 
 def parse_weekdays_csv(csv: str | None) -> set[int]:
     """'0,2,4' -> {0, 2, 4}.  Empty / None -> empty set."""
@@ -23,65 +44,174 @@ def parse_weekdays_csv(csv: str | None) -> set[int]:
     return out
 
 
+@lru_cache(maxsize=128)
+def _weekdays(csv: str | None) -> tuple[int, ...]:
+    # Templates share a handful of distinct CSVs; parse each once per process.
+    return tuple(sorted(parse_weekdays_csv(csv)))
+
+
+def _interval(row) -> int:
+    n = getattr(row, "repeat_interval", None) or 1
+    return n if n > 1 and row.range_start else 1
+
+
+def _weekday_of(ordinal: int) -> int:
+    # date(1, 1, 1) has ordinal 1 and is a Monday.
+    return (ordinal - 1) % 7
+
+
 def date_matches_template(
     d: date,
     repeat_type: str,
     weekdays: set[int],
     range_start: date | None,
     range_end: date | None,
+    interval: int = 1,
+    month_day: int | None = None,
 ) -> bool:
+    """Reference predicate: does template pattern produce an occurrence on `d`?
+
+    RepeatWindow.occurrences() is the fast path; this is kept for single-date
+    checks and as the oracle the tests compare it against.
+    """
     if range_start and d < range_start:
         return False
     if range_end and d > range_end:
         return False
+    if not range_start:
+        interval = 1
     if repeat_type == "every_day":
-        return True
+        return interval <= 1 or (d - range_start).days % interval == 0
     if repeat_type == "every_weekday":
         return d.weekday() < 5  # Mon=0 … Fri=4
     if repeat_type == "every_specific_weekday":
-        return d.weekday() in weekdays
+        if d.weekday() not in weekdays:
+            return False
+        if interval <= 1:
+            return True
+        anchor_monday = range_start.toordinal() - range_start.weekday()
+        return ((d.toordinal() - anchor_monday) // 7) % interval == 0
+    if repeat_type == "monthly_on_day":
+        if d.day != month_day:
+            return False
+        months = (d.year - range_start.year) * 12 + d.month - range_start.month if range_start else 0
+        return months % max(interval, 1) == 0
     return False
 
 
-def expand_template(row, visible_dates: Iterable[str], today: str | None = None) -> list[dict]:
+class RepeatWindow:
+    """The visible dates, parsed once per request and shared by every template."""
+
+    def __init__(self, visible_dates: Iterable[str]):
+        self.iso_by_ordinal: dict[int, str] = {}
+        for iso in visible_dates:
+            self.iso_by_ordinal[date.fromisoformat(iso).toordinal()] = iso
+        self.first = min(self.iso_by_ordinal, default=0)
+        self.last = max(self.iso_by_ordinal, default=-1)
+
+    def occurrences(self, row, today: str | None = None) -> list[str]:
+        """ISO dates in the window on which `row`'s pattern occurs, ascending."""
+        lo, hi = self.first, self.last
+        if row.range_start:
+            lo = max(lo, row.range_start.toordinal())
+        if row.range_end:
+            hi = min(hi, row.range_end.toordinal())
+        if getattr(row, "today_only", 0):
+            if today is None:
+                return []
+            t = date.fromisoformat(today).toordinal()
+            if not lo <= t <= hi:
+                return []
+            lo = hi = t
+        if lo > hi:
+            return []
+        ordinals = self._ordinals(row, lo, hi)
+        lookup = self.iso_by_ordinal.get
+        return [iso for iso in map(lookup, ordinals) if iso is not None]
+
+    def _ordinals(self, row, lo: int, hi: int) -> Iterable[int]:
+        repeat_type = row.repeat_type or ""
+        interval = _interval(row)
+        if repeat_type == "every_day":
+            if interval > 1:
+                # First ordinal >= lo that is a whole number of intervals from range_start.
+                lo += (row.range_start.toordinal() - lo) % interval
+            return range(lo, hi + 1, interval)
+        if repeat_type == "every_weekday":
+            return [o for o in range(lo, hi + 1) if _weekday_of(o) < 5]
+        if repeat_type == "every_specific_weekday":
+            step = 7 * interval
+            anchor_monday = 0
+            if interval > 1:
+                anchor = row.range_start.toordinal()
+                anchor_monday = anchor - _weekday_of(anchor)
+            runs = []
+            for wd in _weekdays(row.repeat_weekdays):
+                start = lo + (wd - _weekday_of(lo)) % 7
+                if interval > 1:
+                    # Skip ahead to the next week that is on the interval grid.
+                    start += 7 * (-((start - anchor_monday) // 7) % interval)
+                runs.append(range(start, hi + 1, step))
+            if len(runs) == 1:
+                return runs[0]
+            return sorted(o for run in runs for o in run)
+        if repeat_type == "monthly_on_day":
+            return self._monthly(row, lo, hi, interval)
+        return ()
+
+    @staticmethod
+    def _monthly(row, lo: int, hi: int, interval: int) -> list[int]:
+        day = getattr(row, "repeat_month_day", None)
+        if not day or not 1 <= day <= 31:
+            return []
+        first, last = date.fromordinal(lo), date.fromordinal(hi)
+        month = first.year * 12 + first.month - 1
+        end = last.year * 12 + last.month - 1
+        if interval > 1:
+            anchor = row.range_start.year * 12 + row.range_start.month - 1
+            month += (anchor - month) % interval
+        out = []
+        while month <= end:
+            try:
+                o = date(month // 12, month % 12 + 1, day).toordinal()
+            except ValueError:  # e.g. the 31st in a 30-day month
+                o = 0
+            if lo <= o <= hi:
+                out.append(o)
+            month += interval
+        return out
+
+
+def expand_template(row, visible_dates: Iterable[str] | RepeatWindow, today: str | None = None) -> list[dict]:
     """Return one virtual dict per visible date the template matches.
 
     `row` is a SQLAlchemy Schedule row (or any object with the same attribute
     names). `visible_dates` is the date_sequence already built by the caller —
+    or, when expanding many templates, a RepeatWindow built from it once — so
     we only emit occurrences within the window the UI actually renders.
 
     `today` is the caller's local-TZ today as ISO 'YYYY-MM-DD'. When the row's
     `today_only` flag is set, only that date is emitted (and only if the
     repeat pattern matches it).
     """
-    weekdays = parse_weekdays_csv(row.repeat_weekdays)
+    window = visible_dates if isinstance(visible_dates, RepeatWindow) else RepeatWindow(visible_dates)
     today_only = bool(getattr(row, "today_only", 0))
     # Time-of-day (TZ-independent). Treat blank / 00:00 sentinel as "no time".
     start_t = getattr(row, "repeat_start_time", None) or ""
     end_t = getattr(row, "repeat_end_time", None) or ""
     if start_t in ("", "00:00") and end_t in ("", "00:00"):
         start_t = end_t = ""
-    out: list[dict] = []
-    for iso in visible_dates:
-        if today_only and iso != today:
-            continue
-        d = datetime.strptime(iso, "%Y-%m-%d").date()
-        if not date_matches_template(
-            d, row.repeat_type or "", weekdays, row.range_start, row.range_end
-        ):
-            continue
-        out.append({
-            "id": row.id,
-            "name": row.name,
-            "link": row.link,
-            "start_datetime": None,
-            "end_datetime": None,
-            "local_start_date": iso,
-            "local_start_time": start_t,
-            "local_end_date": iso,
-            "local_end_time": end_t,
-            "is_daily_task": 1,        # render with the 🟩 prefix
-            "is_repeat_task": 1,       # for future code that needs to distinguish
-            "today_only": 1 if today_only else 0,
-        })
-    return out
+    return [{
+        "id": row.id,
+        "name": row.name,
+        "link": row.link,
+        "start_datetime": None,
+        "end_datetime": None,
+        "local_start_date": iso,
+        "local_start_time": start_t,
+        "local_end_date": iso,
+        "local_end_time": end_t,
+        "is_daily_task": 1,        # render with the 🟩 prefix
+        "is_repeat_task": 1,       # for future code that needs to distinguish
+        "today_only": 1 if today_only else 0,
+    } for iso in window.occurrences(row, today)]
@@ -0,0 +1,49 @@
+"""Group the schedule render dicts into a per-date index for the grid templates.
+
+`schedule_indicate_00.html` used to loop over every item for each of the 350
+cells in `date_sequence` (350 x N string compares per render). The route now
+hands the template a `{ 'YYYY-MM-DD': [items...] }` dict, each list already in
+display order, so every cell is a single dict lookup.
+
+Pure functions only — no DB or HTTP — so this can be smoke-checked in a REPL.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+
+def schedule_sort_key(item):
+    """Display order within a day cell:
+      0) daily tasks (no time), 1) repeat tasks with no time,
+      2) ordinary + timed repeat tasks sorted by start time
+         (ordinary before repeat when start times are equal).
+    The sort is stable, so insertion order is preserved within groups 0 and 1.
+    """
+    is_repeat = bool(item.get('is_repeat_task'))
+    is_daily = bool(item.get('is_daily_task')) and not is_repeat
+    start_time = item.get('local_start_time') or ''
+    if is_daily:
+        return (0, '', 0)
+    if is_repeat and not start_time:
+        return (1, '', 0)
+    type_rank = 1 if is_repeat else 0
+    return (2, start_time, type_rank)
+
+
+def index_by_date(items: Iterable[dict]) -> dict[str, list[dict]]:
+    """Return {local_start_date: [items...]} with each list in display order.
+
+    Items without a local_start_date are dropped (they never matched a grid
+    cell in the old template scan either). Insertion order within a date is
+    preserved before sorting, so the result is identical to sorting the flat
+    list with schedule_sort_key and filtering it per cell.
+    """
+    index: dict[str, list[dict]] = {}
+    for item in items:
+        key = item.get('local_start_date')
+        if not key:
+            continue
+        index.setdefault(key, []).append(item)
+    for day_items in index.values():
+        day_items.sort(key=schedule_sort_key)
+    return index
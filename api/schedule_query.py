@@ -0,0 +1,102 @@
+"""Load only the Schedule rows the grid can actually show.
+
+The schedule grid renders a fixed window of local dates (`date_sequence`). Rows
+outside it are never displayed, so the read paths ask SQLite for just the rows
+that can land in that window instead of every schedule row ever written:
+
+  - regular tasks : UTC start_datetime within the window, padded by the widest
+                    UTC offset so any viewer time zone is covered;
+  - daily tasks   : task_date within the window (TZ-independent);
+  - repeat tasks  : range_start/range_end overlapping the window (NULL = open).
+
+Each branch is served by its own index (see the Schedule model and
+scripts/migrate_schedule_indexes.py), so page cost follows what is visible,
+not the size of the table's history.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta
+from typing import Sequence
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from api.models import Schedule
+
+# UTC offsets run from -12:00 to +14:00, so a local calendar day can start up to
+# 14h before and end up to 12h after the same UTC day. Pad both ends by the
+# larger of the two.
+TZ_PADDING = timedelta(hours=14)
+
+# Columns the grid builders read from each row.
+SCHEDULE_COLUMNS = (
+    Schedule.id,
+    Schedule.name,
+    Schedule.start_datetime,
+    Schedule.end_datetime,
+    Schedule.link,
+    Schedule.is_daily_task,
+    Schedule.task_date,
+    Schedule.is_repeat_task,
+    Schedule.repeat_type,
+    Schedule.repeat_weekdays,
+    Schedule.range_start,
+    Schedule.range_end,
+    Schedule.today_only,
+    Schedule.repeat_start_time,
+    Schedule.repeat_end_time,
+    Schedule.repeat_interval,
+    Schedule.repeat_month_day,
+)
+
+
+def window_bounds(date_sequence: Sequence[str]) -> tuple[date, date, datetime, datetime]:
+    """Return (first_day, last_day, utc_lo, utc_hi) for a list of ISO dates.
+
+    utc_lo/utc_hi bound the naive-UTC start_datetime of any regular task whose
+    local start date can fall inside [first_day, last_day] in some time zone.
+    """
+    first_day = date.fromisoformat(date_sequence[0])
+    last_day = date.fromisoformat(date_sequence[-1])
+    utc_lo = datetime.combine(first_day, datetime.min.time()) - TZ_PADDING
+    utc_hi = datetime.combine(last_day + timedelta(days=1), datetime.min.time()) + TZ_PADDING
+    return first_day, last_day, utc_lo, utc_hi
+
+
+def window_filter(date_sequence: Sequence[str]):
+    """SQL filter matching every Schedule row that can appear in the window."""
+    first_day, last_day, utc_lo, utc_hi = window_bounds(date_sequence)
+    return or_(
+        and_(
+            Schedule.is_daily_task == 1,
+            Schedule.task_date >= first_day,
+            Schedule.task_date <= last_day,
+        ),
+        and_(
+            Schedule.is_repeat_task == 1,
+            or_(Schedule.range_start.is_(None), Schedule.range_start <= last_day),
+            or_(Schedule.range_end.is_(None), Schedule.range_end >= first_day),
+        ),
+        and_(
+            Schedule.start_datetime >= utc_lo,
+            Schedule.start_datetime < utc_hi,
+        ),
+    )
+
+
+def visible_schedule_rows(db: Session, date_sequence: Sequence[str]) -> list:
+    """Return the grid's rows for `date_sequence`, ordered by start_datetime.
+
+    The ordering is done in Python on the (small) result: an SQL ORDER BY makes
+    SQLite walk the whole start_datetime index instead of using the per-branch
+    MULTI-INDEX OR plan.
+    """
+    rows = (
+        db.query(Schedule)
+        .with_entities(*SCHEDULE_COLUMNS)
+        .filter(window_filter(date_sequence))
+        .all()
+    )
+    # NULLs first, matching SQLite's ORDER BY.
+    rows.sort(key=lambda r: (r.start_datetime is not None, r.start_datetime or datetime.min))
+    return rows
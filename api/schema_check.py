@@ -23,6 +23,9 @@ import sqlite3
 REQUIRED_COLUMNS = [
     ("users", "tab_group", "scripts.migrate_tab_restriction"),
     ("allowed_users", "tab_group", "scripts.migrate_allowed_user_group"),
+    # Read by every /schedule/ page (RRULE-style repeat patterns).
+    ("schedules", "repeat_interval", "scripts.migrate_repeat_tasks"),
+    ("schedules", "repeat_month_day", "scripts.migrate_repeat_tasks"),
 ]
 
 # Tables required by the same work. (create_all() usually recreates these, so
@@ -37,7 +40,8 @@ MIGRATION_COMMAND = (
     "python -m scripts.migrate_repeat_tasks && "
     "python -m scripts.migrate_tab_restriction && "
     "python -m scripts.migrate_admin_tab && "
-    "python -m scripts.migrate_allowed_user_group"
+    "python -m scripts.migrate_allowed_user_group && "
+    "python -m scripts.migrate_schedule_indexes"
 )
 
 
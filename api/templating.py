@@ -0,0 +1,75 @@
+"""The app's single Jinja2 environment, shared by api.main, api.admin and the
+translator router.
+
+One environment means one compiled-template cache: base.html (which every page
+extends) is parsed and compiled once per process instead of once per module.
+Compiled bytecode is also written to a FileSystemBytecodeCache (the per-user
+temp dir), so a restarted worker skips the parse step. In production templates
+never change under a running process, so auto_reload is off and get_template
+is a dict lookup instead of a stat() per render.
+
+The top-bar tab buttons (templates/_nav_tabs.html) depend only on the user's
+allowed-tab set and the active tab, so nav_tabs() renders them once per such
+pair and base.html pastes the cached markup.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import Markup
+
+from api.database import ENVIRONMENT
+from api.permissions import allowed_tabs_for
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TEMPLATE_DIRS = [
+    os.path.join(BASE_DIR, "templates"),
+    os.path.join(BASE_DIR, "translator_on_drawings", "templates"),
+]
+NAV_TEMPLATE = "_nav_tabs.html"
+# (allowed tabs, active tab) -> rendered markup. Distinct tab groups times the
+# dozen tab_page_active values stays far below this; the cap is a backstop.
+NAV_CACHE_MAX = 256
+
+templates = Jinja2Templates(env=Environment(
+    loader=FileSystemLoader(TEMPLATE_DIRS),
+    autoescape=True,  # what Jinja2Templates(directory=...) set up before
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=ENVIRONMENT != "production",
+))
+
+_nav_cache: OrderedDict[tuple[frozenset[str], str], Markup] = OrderedDict()
+_nav_template = None
+_nav_lock = threading.Lock()
+
+
+def nav_tabs(request: Request, tab_page_active: str = "") -> Markup:
+    """Return the top-bar tab buttons for this request's user, from cache."""
+    global _nav_template
+    template = templates.env.get_template(NAV_TEMPLATE)
+    key = (allowed_tabs_for(request), tab_page_active)
+    with _nav_lock:
+        if template is not _nav_template:
+            # First call, or auto_reload picked up an edited template.
+            _nav_cache.clear()
+            _nav_template = template
+        html = _nav_cache.get(key)
+        if html is not None:
+            _nav_cache.move_to_end(key)
+            return html
+    html = Markup(template.render(allowed_tabs=key[0], tab_page_active=tab_page_active))
+    with _nav_lock:
+        _nav_cache[key] = html
+        while len(_nav_cache) > NAV_CACHE_MAX:
+            _nav_cache.popitem(last=False)
+    return html
+
+
+templates.env.globals["ENVIRONMENT"] = ENVIRONMENT
+templates.env.globals["nav_tabs"] = nav_tabs
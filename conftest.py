@@ -0,0 +1,23 @@
+"""Run the suite against a copy of the checked-in test.db.
+
+Importing api.main opens the app engine, whose pragmas switch the file to WAL
+(a change written into the database header) and tests write rows through it;
+both would dirty the tracked test.db. DATABASE_PATH must be set before the
+first import of api.database, hence module level.
+"""
+import os
+import shutil
+import tempfile
+
+_TRACKED_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test.db")
+
+if not os.getenv("DATABASE_PATH"):
+    _copy_dir = tempfile.mkdtemp(prefix="test_db_")
+    os.environ["DATABASE_PATH"] = os.path.join(_copy_dir, "test.db")
+    if os.path.exists(_TRACKED_DB):
+        shutil.copy2(_TRACKED_DB, os.environ["DATABASE_PATH"])
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if "_copy_dir" in globals():
+        shutil.rmtree(_copy_dir, ignore_errors=True)
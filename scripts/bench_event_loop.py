@@ -0,0 +1,154 @@
+"""Benchmark: does /schedule/ traffic stall the event loop?
+
+Serves api.main.app with uvicorn on a local port, keeps /schedule/ busy from
+several client threads, and meanwhile polls /music/download_status/{id} — an
+in-memory handler that should answer in well under a millisecond. Its latency
+percentiles show how long requests wait for the event loop.
+
+--io-ms adds a sleep before every SQL statement to stand in for what a local,
+fully cached test.db does not have: disk latency on the persistent volume and
+waits on a writer's lock (busy_timeout). With --io-ms 0 the page work is pure
+CPU and the GIL serialises it either way, so both rounds look alike.
+
+Two rounds: "threadpool" is the app as it is (DB-bound handlers are plain
+`def`, so FastAPI runs them in its worker threads); "legacy" first re-wraps
+every such handler in an `async def` that calls it directly, which is how they
+ran before — DB queries and template renders on the event loop itself.
+
+Reads the real test.db (the app is bound to it at import); only the login and
+the page reads are issued, nothing is written to the tables.
+
+Run:  python -m scripts.bench_event_loop --username U --email E --password P
+                                        [--seconds 5] [--clients 8] [--io-ms 5]
+"""
+import argparse
+import asyncio
+import logging
+import socket
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi.dependencies.utils import get_dependant  # noqa: E402
+from fastapi.routing import APIRoute, request_response  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from api.database import engine  # noqa: E402
+from api.main import app, download_jobs  # noqa: E402
+
+PROBE_JOB = "bench"
+PROBE_INTERVAL = 0.01
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _run_on_event_loop() -> int:
+    """Turn every sync route handler back into an async one that blocks the loop."""
+    n = 0
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or asyncio.iscoroutinefunction(route.endpoint):
+            continue
+
+        async def blocking(*args, __endpoint=route.endpoint, **kwargs):
+            return __endpoint(*args, **kwargs)
+
+        # Parameters are still resolved from the real handler; only the call changes.
+        route.dependant = get_dependant(path=route.path_format, call=route.endpoint)
+        route.dependant.call = blocking
+        route.app = request_response(route.get_route_handler())
+        n += 1
+    return n
+
+
+def _login(base_url, args) -> httpx.Client:
+    client = httpx.Client(base_url=base_url, timeout=60)
+    client.post("/login_signup/check_user/",
+                data={"username": args.username, "email": args.email, "password": args.password})
+    r = client.get("/schedule/", follow_redirects=False)
+    if r.status_code != 200:
+        sys.exit(f"/schedule/ returned {r.status_code} after login — check the credentials")
+    return client
+
+
+def _load(client, stop, pages):
+    while not stop.is_set():
+        client.get("/schedule/")
+        pages.append(1)
+
+
+def _probe(base_url, stop, latencies):
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        while not stop.wait(PROBE_INTERVAL):
+            t0 = time.perf_counter()
+            client.get(f"/music/download_status/{PROBE_JOB}")
+            latencies.append(time.perf_counter() - t0)
+
+
+def run(label, args) -> None:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    clients = [_login(base_url, args) for _ in range(args.clients)]
+    stop = threading.Event()
+    pages, latencies = [], []
+    threads = [threading.Thread(target=_load, args=(c, stop, pages)) for c in clients]
+    threads.append(threading.Thread(target=_probe, args=(base_url, stop, latencies)))
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    for c in clients:
+        c.close()
+    server.should_exit = True
+    thread.join()
+
+    ms = sorted(x * 1000 for x in latencies) or [0.0]
+    pct = lambda p: ms[min(len(ms) - 1, int(len(ms) * p))]
+    print(f"{label:>10} {len(pages) / args.seconds:>9.1f} {statistics.median(ms):>8.1f} "
+          f"{pct(0.99):>8.1f} {ms[-1]:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--clients", type=int, default=8, help="threads requesting /schedule/")
+    parser.add_argument("--io-ms", type=float, default=5.0, help="simulated I/O wait per SQL statement")
+    args = parser.parse_args()
+
+    if args.io_ms > 0:
+        @event.listens_for(engine, "before_cursor_execute")
+        def _io_wait(*_):
+            time.sleep(args.io_ms / 1000)
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    download_jobs[PROBE_JOB] = {"status": "done", "error": None, "filename": "bench.mp3"}
+    print(f"{args.clients} clients on /schedule/, status probe every {PROBE_INTERVAL * 1000:g} ms, "
+          f"{args.io_ms:g} ms I/O per query, {args.seconds:g}s each")
+    print(f"{'handlers':>10} {'pages/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    run("threadpool", args)
+    _run_on_event_loop()
+    run("legacy", args)
+
+
+if __name__ == "__main__":
+    main()
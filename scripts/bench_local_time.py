@@ -0,0 +1,75 @@
+"""Micro-benchmark: UTC->local conversion for the schedule grid.
+
+Compares the old per-row loop (DataFrame.iloc + astimezone twice per row, four
+one-column DataFrames, concat, then a cell-wise Timestamp->str map) with
+api.local_time.utc_to_local_fields. pandas is only needed here to replay the
+old loop; the helper itself does not use it.
+
+No DB or server needed. Run:  python -m scripts.bench_local_time
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+from api.local_time import utc_to_local_fields  # noqa: E402
+
+ROW_COUNTS = [100, 1000, 5000, 20000]
+TIME_ZONE = "Asia/Singapore"
+
+
+def _legacy(data, time_zone):
+    df_tasks = pd.DataFrame(data)
+    df_tasks['start_datetime'] = pd.to_datetime(df_tasks['start_datetime']).dt.tz_localize('UTC')
+    df_tasks['end_datetime'] = pd.to_datetime(df_tasks['end_datetime']).dt.tz_localize('UTC')
+    local_start_dates, local_start_times, local_end_dates, local_end_times = [], [], [], []
+    for i in range(len(df_tasks)):
+        df_task = df_tasks.iloc[i]
+        local_start_datetime = df_task["start_datetime"].astimezone(ZoneInfo(time_zone))
+        local_start_dates.append(str(local_start_datetime.date()))
+        local_start_times.append(local_start_datetime.time().strftime("%H:%M"))
+        local_end_datetime = df_task["end_datetime"].astimezone(ZoneInfo(time_zone))
+        local_end_dates.append(str(local_end_datetime.date()))
+        local_end_times.append(local_end_datetime.time().strftime("%H:%M"))
+    df_combined = pd.concat([
+        df_tasks,
+        pd.DataFrame(local_start_dates, columns=['local_start_date']),
+        pd.DataFrame(local_start_times, columns=['local_start_time']),
+        pd.DataFrame(local_end_dates, columns=['local_end_date']),
+        pd.DataFrame(local_end_times, columns=['local_end_time']),
+    ], axis=1)
+    df_combined = df_combined.apply(lambda col: col.map(lambda x: x.isoformat() if isinstance(x, pd.Timestamp) else x))
+    return df_combined.to_dict(orient='records')
+
+
+def _helper(data, time_zone):
+    local = utc_to_local_fields([d['start_datetime'] for d in data],
+                                [d['end_datetime'] for d in data], time_zone)
+    return [{**d, **{k: v[i] for k, v in local.items()}} for i, d in enumerate(data)]
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main() -> None:
+    print(f"{'rows':>7} {'legacy ms':>10} {'helper ms':>10} {'speed-up':>9}")
+    base = datetime(2025, 1, 1)
+    for n in ROW_COUNTS:
+        data = [{'id': k, 'name': f'task {k}', 'link': '',
+                 'start_datetime': base + timedelta(hours=7 * k),
+                 'end_datetime': base + timedelta(hours=7 * k + 1)} for k in range(n)]
+        legacy_ms = min(_timed(_legacy, data, TIME_ZONE) for _ in range(3))
+        fast_ms = min(_timed(_helper, data, TIME_ZONE) for _ in range(3))
+        print(f"{n:>7} {legacy_ms:>10.1f} {fast_ms:>10.1f} {legacy_ms / fast_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Micro-benchmark: repeat-template expansion for one /schedule/ render.
+
+Compares the old per-date scan (strptime + pattern test for each of the 350
+visible dates, per template) with api.repeat_tasks.RepeatWindow, which parses
+the window once and steps through each template's occurrences.
+
+No DB or server needed. Run:  python -m scripts.bench_repeat_expand
+"""
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.repeat_tasks import RepeatWindow, date_matches_template, expand_template, parse_weekdays_csv  # noqa: E402
+
+TEMPLATE_COUNTS = [10, 100, 1000]
+WINDOW_DAYS = 7 * 50
+
+
+def _legacy(rows, visible_dates, today):
+    # The pre-RepeatWindow expand_template loop, dict building omitted.
+    out = 0
+    for row in rows:
+        weekdays = parse_weekdays_csv(row.repeat_weekdays)
+        for iso in visible_dates:
+            if row.today_only and iso != today:
+                continue
+            d = datetime.strptime(iso, "%Y-%m-%d").date()
+            if date_matches_template(d, row.repeat_type or "", weekdays, row.range_start, row.range_end):
+                out += 1
+    return out
+
+
+def _engine(rows, visible_dates, today):
+    window = RepeatWindow(visible_dates)
+    return sum(len(window.occurrences(row, today)) for row in rows)
+
+
+def _with_dicts(rows, visible_dates, today):
+    window = RepeatWindow(visible_dates)
+    return sum(len(expand_template(row, window, today)) for row in rows)
+
+
+def _templates(n, first_day):
+    rng = random.Random(n)
+    rows = []
+    for k in range(n):
+        start = first_day + timedelta(days=rng.randrange(-60, 300))
+        rows.append(SimpleNamespace(
+            id=k, name=f"repeat {k}", link=None,
+            repeat_type=rng.choice(["every_day", "every_weekday", "every_specific_weekday"]),
+            repeat_weekdays="0,2,4", range_start=start,
+            range_end=start + timedelta(days=rng.randrange(7, 180)),
+            today_only=0, repeat_start_time=None, repeat_end_time=None,
+            repeat_interval=None, repeat_month_day=None,
+        ))
+    return rows
+
+
+def _timed(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - t0) * 1000
+
+
+def main() -> None:
+    first_day = date(2026, 1, 5)
+    visible_dates = [(first_day + timedelta(days=i)).isoformat() for i in range(WINDOW_DAYS)]
+    today = visible_dates[20]
+    print(f"{'templates':>9} {'legacy ms':>10} {'engine ms':>10} {'speed-up':>9} {'+dicts ms':>10}")
+    for n in TEMPLATE_COUNTS:
+        rows = _templates(n, first_day)
+        assert _legacy(rows, visible_dates, today) == _engine(rows, visible_dates, today)
+        legacy_ms = min(_timed(_legacy, rows, visible_dates, today) for _ in range(3))
+        engine_ms = min(_timed(_engine, rows, visible_dates, today) for _ in range(3))
+        dicts_ms = min(_timed(_with_dicts, rows, visible_dates, today) for _ in range(3))
+        print(f"{n:>9} {legacy_ms:>10.1f} {engine_ms:>10.2f} {legacy_ms / engine_ms:>8.1f}x {dicts_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark: schedule grid render time against schedule row count.
+
+Renders templates/schedule_indicate_00.html (View A and View B) from synthetic
+items spread over the 350-day window, and compares it with the old template
+shape that scanned the whole item list for every cell.
+
+No DB or server needed. Run:  python -m scripts.bench_schedule_render
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jinja2 import Environment, FileSystemLoader  # noqa: E402
+
+from api.schedule_index import index_by_date, schedule_sort_key  # noqa: E402
+
+ROW_COUNTS = [100, 1000, 3000, 10000]
+REPEATS = 3
+
+# The per-cell loop the grid used before the date index (View A only).
+LEGACY_VIEW_A = """
+{%- for ii in range(50) %}{% for i in range(7) %}
+  {%- for item in df_combined %}{% if dates[i+ii*7] == item["local_start_date"] %}
+    <li>{{ item.local_start_time }}-{{ item.local_end_time }} {{ item.name }}</li>
+  {%- endif %}{% endfor %}
+{%- endfor %}{% endfor %}
+"""
+
+
+def _synthetic_items(n, dates):
+    items = []
+    for k in range(n):
+        day = dates[k % len(dates)]
+        items.append({
+            "id": k, "name": f"task {k}", "link": "",
+            "local_start_date": day, "local_start_time": f"{k % 24:02d}:00",
+            "local_end_date": day, "local_end_time": f"{k % 24:02d}:30",
+            "is_daily_task": 1 if k % 10 == 0 else 0,
+        })
+    return items
+
+
+def _best_of(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main() -> None:
+    base = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = Environment(loader=FileSystemLoader(os.path.join(base, "templates")))
+    env.globals["nav_tabs"] = lambda request, tab_page_active: ""
+    env.globals["ENVIRONMENT"] = "local"
+    page = env.get_template("schedule_indicate_00.html")
+    legacy = env.from_string(LEGACY_VIEW_A)
+
+    start = date.today() - timedelta(days=date.today().weekday())
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(7 * 50)]
+    ctx = {"request": None, "dates": dates, "week_dates": dates, "weeks": 50,
+           "weeks_next": "", "weeks_left": 0, "today": dates[0], "today_items": [],
+           "skip": 0, "limit": 200, "has_more": False}
+
+    print(f"{'rows':>7} {'legacy A ms':>12} {'view A ms':>10} {'view B ms':>10}")
+    for n in ROW_COUNTS:
+        items = sorted(_synthetic_items(n, dates), key=schedule_sort_key)
+        index = index_by_date(items)
+        legacy_ms = _best_of(lambda: legacy.render(dates=dates, df_combined=items))
+        a_ms = _best_of(lambda: page.render(items_by_date=index, schedule_view_mode="A", grid_view="A", **ctx))
+        b_ms = _best_of(lambda: page.render(items_by_date=index, schedule_view_mode="B", grid_view="B", **ctx))
+        print(f"{n:>7} {legacy_ms:>12.1f} {a_ms:>10.1f} {b_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
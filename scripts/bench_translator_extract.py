@@ -0,0 +1,75 @@
+"""Benchmark: translator Phase 1 (Thai span extraction) wall-clock vs worker count.
+
+Joins the four sample tender parts (translator_on_drawings/01_AR-FOR TENDER
+R0_Part*.pdf, 10 sheets each) into one 40-page drawing set, or uses --pdf, and
+runs pipeline.extract_pages with each worker count. Every run must return the
+same spans as the serial one. Extraction is CPU-bound, so expect wall-clock to
+fall with workers up to the number of cores and no further.
+
+Run:  python -m scripts.bench_translator_extract [--pdf FILE] [--pages 40]
+                                                 [--workers 1,2,4]
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pypdf import PdfReader, PdfWriter  # noqa: E402
+
+from translator_on_drawings import pipeline  # noqa: E402
+
+SAMPLES = os.path.join(pipeline.BASE_DIR, "translator_on_drawings", "01_AR-FOR TENDER R0_Part*.pdf")
+
+
+def _drawing_set(paths, pages, out_path) -> int:
+    writer = PdfWriter()
+    for path in paths:
+        for page in PdfReader(path).pages:
+            if len(writer.pages) < pages:
+                writer.add_page(page)
+    with open(out_path, "wb") as f:
+        writer.write(f)
+    return len(writer.pages)
+
+
+def _summary(spans_by_page):
+    return [[(s.text, s.matrix_sig, round(s.x0, 3), round(s.y0, 3), round(s.x1, 3), round(s.y1, 3))
+             for s in spans] for spans in spans_by_page]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdf", help="drawing set to extract (default: the joined samples)")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--workers", default=f"1,2,4,{os.cpu_count() or 1}",
+                        help="comma-separated worker counts to time")
+    args = parser.parse_args()
+    counts = sorted({int(n) for n in args.workers.split(",")})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "drawing_set.pdf")
+        sources = [args.pdf] if args.pdf else sorted(glob.glob(SAMPLES))
+        page_count = _drawing_set(sources, args.pages, path)
+        print(f"{page_count} pages, {os.cpu_count()} CPU(s)")
+        print(f"{'workers':>8} {'seconds':>9} {'spans':>7} {'speed-up':>9}")
+        baseline = serial_s = None
+        for n in counts:
+            pipeline.EXTRACT_WORKERS = n
+            t0 = time.perf_counter()
+            _, spans_by_page = pipeline.extract_pages(path)
+            seconds = time.perf_counter() - t0
+            summary = _summary(spans_by_page)
+            if baseline is None:
+                baseline, serial_s = summary, seconds
+            elif summary != baseline:
+                sys.exit(f"workers={n}: spans differ from the workers={counts[0]} run")
+            spans = sum(len(p) for p in spans_by_page)
+            print(f"{n:>8} {seconds:>9.1f} {spans:>7} {serial_s / seconds:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
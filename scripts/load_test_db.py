@@ -0,0 +1,147 @@
+"""Load test: concurrent page reads vs. add/update writes on the main app DB.
+
+Runs reader threads (the /schedule/ window query plus the todo and diary list
+queries) against writer threads (insert + update + commit, like the add/update
+routes) for a fixed time, once with the old engine settings (rollback journal,
+no pragmas, default pool) and once with api.database.create_app_engine (WAL,
+synchronous=NORMAL, cache/mmap, sized pool). Reports read/write throughput,
+read latency percentiles and "database is locked" errors.
+
+Works on throwaway copies of test.db, made next to it so they sit on the same
+disk (fsync cost matters here); the real file is never written.
+
+Run:  python -m scripts.load_test_db [--seconds 5] [--readers 8] [--writers 2]
+                                     [--write-interval-ms 20]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from api.database import create_app_engine, get_database_path  # noqa: E402
+from api.models import Diary, Schedule, Todo  # noqa: E402
+from api.schedule_query import visible_schedule_rows  # noqa: E402
+from scripts.migrate_repeat_tasks import add_columns  # noqa: E402
+
+
+def _copy_db(dst_path: str, journal_mode: str) -> None:
+    # The backup API copies a consistent snapshot even if the source is in WAL.
+    src = sqlite3.connect(get_database_path())
+    dst = sqlite3.connect(dst_path)
+    try:
+        src.backup(dst)
+        with contextlib.redirect_stdout(io.StringIO()):
+            add_columns(dst)  # the copy must match the current models
+        dst.commit()
+        dst.execute(f"PRAGMA journal_mode = {journal_mode}")
+    finally:
+        src.close()
+        dst.close()
+
+
+def _legacy_engine(url: str):
+    # api/database.py before the tuning.
+    return create_engine(url, connect_args={"check_same_thread": False, "timeout": 30})
+
+
+def _reader(Session, stop, latencies, errors):
+    monday = datetime.today().date() - timedelta(days=datetime.today().weekday())
+    week = 0
+    while not stop.is_set():
+        first = monday + timedelta(days=7 * (week % 20))
+        dates = [(first + timedelta(days=i)).isoformat() for i in range(28)]
+        week += 1
+        t0 = time.perf_counter()
+        db = Session()
+        try:
+            visible_schedule_rows(db, dates)
+            db.query(Todo).all()
+            db.query(Diary).all()
+            latencies.append(time.perf_counter() - t0)
+        except OperationalError:
+            errors.append(1)
+        finally:
+            db.close()
+
+
+def _writer(Session, stop, writes, errors, interval):
+    n = 0
+    while not stop.wait(interval):
+        db = Session()
+        try:
+            start = datetime(2030, 1, 1) + timedelta(hours=n)
+            row = Schedule(name=f"load {n}", start_datetime=start,
+                           end_datetime=start + timedelta(hours=1), is_daily_task=0, is_repeat_task=0)
+            db.add(row)
+            db.flush()
+            row.status = "updated"  # an update in the same transaction, like update_task
+            db.commit()
+            writes.append(1)
+        except OperationalError:
+            db.rollback()
+            errors.append(1)
+        finally:
+            db.close()
+        n += 1
+
+
+def run(label, engine, seconds, readers, writers, interval):
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    stop = threading.Event()
+    latencies, writes, errors = [], [], []
+    threads = [threading.Thread(target=_reader, args=(Session, stop, latencies, errors)) for _ in range(readers)]
+    threads += [threading.Thread(target=_writer, args=(Session, stop, writes, errors, interval))
+                for _ in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    ms = sorted(x * 1000 for x in latencies) or [0.0]
+    pct = lambda p: ms[min(len(ms) - 1, int(len(ms) * p))]
+    print(f"{label:>7} {len(latencies) / seconds:>9.0f} {statistics.median(ms):>8.1f} "
+          f"{pct(0.95):>8.1f} {pct(0.99):>8.1f} {len(writes) / seconds:>9.0f} {len(errors):>7}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--write-interval-ms", type=float, default=20.0,
+                        help="pause between a writer's commits (0 = write flat out)")
+    args = parser.parse_args()
+    interval = args.write_interval_ms / 1000
+
+    print(f"{args.readers} readers, {args.writers} writers "
+          f"({args.write_interval_ms:g} ms between commits), {args.seconds:g}s each")
+    print(f"{'engine':>7} {'reads/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'writes/s':>9} {'locked':>7}")
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(get_database_path()))) as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        _copy_db(legacy_path, "DELETE")
+        run("legacy", _legacy_engine(f"sqlite:///{legacy_path}"),
+            args.seconds, args.readers, args.writers, interval)
+
+        tuned_path = os.path.join(tmp, "tuned.db")
+        _copy_db(tuned_path, "WAL")
+        run("tuned", create_app_engine(f"sqlite:///{tuned_path}"),
+            args.seconds, args.readers, args.writers, interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,16 @@
 """One-off migration: add repeat-task columns to the schedules table.
 
-Adds eight columns used by the Repeat Task feature:
+Adds ten columns used by the Repeat Task feature:
   is_repeat_task    INTEGER DEFAULT 0
-  repeat_type       TEXT       -- 'every_day' | 'every_weekday' | 'every_specific_weekday'
+  repeat_type       TEXT       -- 'every_day' | 'every_weekday' | 'every_specific_weekday' | 'monthly_on_day'
   repeat_weekdays   TEXT       -- CSV of Python weekday ints, e.g. '0,2,4' (Mon=0..Sun=6)
   range_start       DATE
   range_end         DATE
   today_only        INTEGER DEFAULT 0  -- 1 = show occurrence only in Today area
   repeat_start_time TEXT       -- 'HH:MM' local time-of-day (TZ-independent); blank/00:00 = no time
   repeat_end_time   TEXT       -- 'HH:MM' local time-of-day (TZ-independent); blank/00:00 = no time
+  repeat_interval   INTEGER    -- every N days/weeks/months from range_start; NULL = 1
+  repeat_month_day  INTEGER    -- 1..31, only for repeat_type='monthly_on_day'
 
 Run once, locally and on Render.
 
@@ -43,6 +45,8 @@ def add_columns(conn: sqlite3.Connection) -> None:
         ("today_only", "INTEGER DEFAULT 0"),
         ("repeat_start_time", "TEXT"),
         ("repeat_end_time", "TEXT"),
+        ("repeat_interval", "INTEGER"),
+        ("repeat_month_day", "INTEGER"),
     ]
     for name, sql_type in specs:
         if not column_exists(conn, "schedules", name):
@@ -0,0 +1,69 @@
+"""One-off migration: add the indexes behind the windowed schedule query.
+
+/schedule/ now loads only the rows that can land in the visible date window
+(see api/schedule_query.py). Each branch of that filter needs its own index:
+  ix_schedules_start_datetime   (start_datetime)                      -- regular tasks
+  ix_schedules_daily_task_date  (is_daily_task, task_date)            -- daily tasks
+  ix_schedules_repeat_range     (is_repeat_task, range_start, range_end) -- repeat templates
+
+Base.metadata.create_all() only creates indexes together with a NEW table, so
+an existing schedules table needs this script.
+
+Run once, locally and on Render.
+
+  Local:   python -m scripts.migrate_schedule_indexes
+  Render:  Shell tab -> python -m scripts.migrate_schedule_indexes
+
+Idempotent: re-running is safe (CREATE INDEX IF NOT EXISTS).
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.database import get_database_path  # noqa: E402
+
+INDEXES = [
+    ("ix_schedules_start_datetime", "start_datetime"),
+    ("ix_schedules_daily_task_date", "is_daily_task, task_date"),
+    ("ix_schedules_repeat_range", "is_repeat_task, range_start, range_end"),
+]
+
+
+def index_exists(conn: sqlite3.Connection, name: str) -> bool:
+    row = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type='index' AND name=?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def add_indexes(conn: sqlite3.Connection) -> None:
+    for name, columns in INDEXES:
+        if index_exists(conn, name):
+            print(f"  = index {name} already exists")
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON schedules ({columns})")
+        print(f"  + created index {name} ON schedules ({columns})")
+    conn.execute("ANALYZE schedules")
+
+
+def main() -> None:
+    db_path = get_database_path()
+    print(f"Migrating database at: {db_path}")
+    if not os.path.exists(db_path):
+        print("Database file does not exist - nothing to migrate.")
+        return
+    conn = sqlite3.connect(db_path)
+    try:
+        add_indexes(conn)
+        conn.commit()
+        print("Schedule index migration complete.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+// Load further schedule weeks on scroll.
+//
+// The grid container carries data-weeks-next (first date not yet rendered),
+// data-weeks-left (weeks still available in the window) and data-grid-view
+// ('A' | 'B'). When its last cell scrolls into view, the next batch is fetched
+// from /schedule/weeks/ and its server-rendered HTML appended, so cell markup
+// stays in templates/schedule_weeks_00.html. Fails quietly: if a fetch errors
+// the grid simply stops growing until the next page load.
+(function () {
+  var BATCH_WEEKS = 4;
+
+  function setup(grid) {
+    var loading = false;
+    var observer = new IntersectionObserver(function (entries) {
+      if (!loading && entries.some(function (e) { return e.isIntersecting; })) {
+        loadMore();
+      }
+    }, { root: grid, rootMargin: '0px 0px 400px 0px' });
+
+    function watchLast() {
+      observer.disconnect();
+      if (parseInt(grid.dataset.weeksLeft, 10) > 0 && grid.lastElementChild) {
+        observer.observe(grid.lastElementChild);
+      }
+    }
+
+    function loadMore() {
+      var left = parseInt(grid.dataset.weeksLeft, 10);
+      if (!(left > 0)) return;
+      loading = true;
+      var n = Math.min(BATCH_WEEKS, left);
+      var url = '/schedule/weeks/?from=' + encodeURIComponent(grid.dataset.weeksNext) +
+                '&n=' + n + '&view=' + encodeURIComponent(grid.dataset.gridView);
+      fetch(url, { credentials: 'same-origin' })
+        .then(function (r) { return r.ok ? r.json() : Promise.reject(r.status); })
+        .then(function (data) {
+          grid.insertAdjacentHTML('beforeend', data.html);
+          grid.dataset.weeksNext = data.next;
+          grid.dataset.weeksLeft = String(left - data.n);
+          var today = grid.querySelector('.day_today_vfull');
+          if (today) {
+            var rows = parseInt(today.style.gridRowEnd.replace('span', ''), 10) || 0;
+            today.style.gridRow = '1 / span ' + (rows + data.n);
+          }
+          loading = false;
+          watchLast();
+        })
+        .catch(function () { observer.disconnect(); });
+    }
+
+    watchLast();
+  }
+
+  document.addEventListener('DOMContentLoaded', function () {
+    var grids = document.querySelectorAll('[data-weeks-next]');
+    for (var i = 0; i < grids.length; i++) setup(grids[i]);
+  });
+})();
@@ -0,0 +1,72 @@
+"""Tests for the /schedule/add_repeat_task/ form's interval and day-of-month fields.
+
+Runs against an in-memory database through get_db, with the schedule tab allowed.
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from api import main, permissions
+from api.database import Base
+from api.models import Schedule
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    def get_test_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    monkeypatch.setattr(permissions, "allowed_tabs_for", lambda request: frozenset({"schedule"}))
+    main.app.dependency_overrides[main.get_db] = get_test_db
+    yield TestClient(main.app), Session
+    main.app.dependency_overrides.pop(main.get_db, None)
+
+
+def _post(client, **fields):
+    form = {"name": "rent", "date1": "2026-06-10", "repeat_type": "monthly_on_day",
+            "repeat_range": "until_date", "repeat_range_end_date": "2026-12-31"}
+    form.update(fields)
+    return client.post("/schedule/add_repeat_task/", data=form, follow_redirects=False)
+
+
+def _saved(Session):
+    with Session() as session:
+        row = session.query(Schedule).one()
+        return row.repeat_interval, row.repeat_month_day
+
+
+def test_blank_fields_fall_back_to_every_one_on_range_starts_day(client):
+    client, Session = client
+    assert _post(client, repeat_interval="", repeat_month_day="").status_code == 303
+    assert _saved(Session) == (1, 10)
+
+
+def test_numbers_are_stored(client):
+    client, Session = client
+    assert _post(client, repeat_interval="3", repeat_month_day="25").status_code == 303
+    assert _saved(Session) == (3, 25)
+
+
+@pytest.mark.parametrize("fields, field", [
+    ({"repeat_month_day": "15th"}, "repeat_month_day"),
+    ({"repeat_month_day": "32"}, "repeat_month_day"),
+    ({"repeat_interval": "two"}, "repeat_interval"),
+    ({"repeat_interval": "0"}, "repeat_interval"),
+])
+def test_anything_else_is_a_400(client, fields, field):
+    client, Session = client
+    resp = _post(client, **fields)
+    assert resp.status_code == 400 and field in resp.json()["detail"]
+    with Session() as session:
+        assert session.query(Schedule).count() == 0
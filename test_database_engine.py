@@ -0,0 +1,85 @@
+"""Tests for api.database.create_app_engine — the main app engine's SQLite setup.
+
+Checks that every pooled connection gets the WAL / cache / mmap pragmas, that
+a reader is not blocked by an open write transaction (the point of WAL), and
+that checkpoint_wal folds the WAL back into the main file.
+"""
+import os
+
+from sqlalchemy import text
+
+from api.database import (MAX_OVERFLOW, POOL_SIZE, checkpoint_wal, create_app_engine,
+                          get_database_path)
+
+
+def _engine(tmp_path):
+    engine = create_app_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)"))
+        conn.execute(text("INSERT INTO t (v) VALUES ('a')"))
+    return engine
+
+
+def test_pragmas_applied_to_each_connection(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.connect() as conn:
+        pragma = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("cache_size") == -32000
+        assert pragma("temp_store") == 2  # MEMORY
+        assert pragma("busy_timeout") == 30000
+    assert engine.pool.size() == POOL_SIZE
+    assert engine.pool._max_overflow == MAX_OVERFLOW
+    engine.dispose()
+
+
+def test_reader_not_blocked_by_open_write_transaction(tmp_path):
+    engine = _engine(tmp_path)
+    writer = engine.connect()
+    tx = writer.begin()
+    writer.execute(text("UPDATE t SET v = 'b'"))
+    try:
+        with engine.connect() as reader:
+            # Sees the last committed value immediately, no busy wait.
+            assert reader.execute(text("SELECT v FROM t")).scalar() == "a"
+    finally:
+        tx.commit()
+        writer.close()
+    engine.dispose()
+
+
+def test_checkpoint_truncates_the_wal(tmp_path):
+    engine = _engine(tmp_path)
+    wal = tmp_path / "app.db-wal"
+    keep_open = engine.connect()  # an open connection keeps the WAL file around
+    assert os.path.getsize(wal) > 0
+    checkpoint_wal(engine)
+    assert os.path.getsize(wal) == 0
+    keep_open.close()
+    engine.dispose()
+
+
+def test_database_path_override(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATABASE_PATH", str(tmp_path / "copy.db"))
+    assert get_database_path() == str(tmp_path / "copy.db")
+    monkeypatch.delenv("DATABASE_PATH")
+    assert os.path.basename(get_database_path()) == "test.db"
+
+
+def test_the_tracked_db_keeps_its_rollback_journal(monkeypatch, tmp_path):
+    from api import database
+
+    tracked = tmp_path / "test.db"
+    monkeypatch.setattr(database, "TRACKED_DB_PATH", str(tracked))
+    assert not database.uses_wal(f"sqlite:///{tracked}")
+    assert database.uses_wal(f"sqlite:///{tmp_path / 'app.db'}")
+
+    engine = create_app_engine(f"sqlite:///{tracked}")
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "delete"
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 30000
+        conn.execute(text("CREATE TABLE t (id INTEGER)"))
+        conn.commit()
+    engine.dispose()
+    assert tracked.read_bytes()[18:20] == b"\x01\x01"  # header: not WAL
@@ -0,0 +1,109 @@
+"""Tests for RangeFileResponse: byte ranges, conditional requests and zero-copy sends."""
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.file_streaming import CACHE_LONG, RangeFileResponse, parse_range
+
+_BODY = bytes(range(256)) * 4096  # 1 MiB, longer than one read chunk
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(_BODY)
+    app = FastAPI()
+
+    @app.get("/file")
+    def serve():
+        return RangeFileResponse(str(path), media_type="audio/mpeg", filename="song.mp3",
+                                 cache_control=CACHE_LONG)
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=1000-", (1000, 1999)),
+    ("bytes=-300", (1700, 1999)),
+    ("bytes=1500-9999", (1500, 1999)),
+    ("bytes=2000-", (2000, 1999)),
+    ("bytes=0-1,5-9", None),
+    ("items=0-9", None),
+    ("bytes=9-2", None),
+    ("bytes=abc", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 2000) == expected
+
+
+def test_full_and_partial_responses_carry_cache_validators(client):
+    full = client.get("/file")
+    assert full.status_code == 200 and full.content == _BODY
+    assert full.headers["accept-ranges"] == "bytes" and full.headers["cache-control"] == CACHE_LONG
+    assert full.headers["content-disposition"] == 'attachment; filename="song.mp3"'
+
+    part = client.get("/file", headers={"Range": "bytes=300000-600000"})
+    assert part.status_code == 206 and part.content == _BODY[300000:600001]
+    assert part.headers["content-range"] == f"bytes 300000-600000/{len(_BODY)}"
+    assert part.headers["content-length"] == "300001"
+
+    tail = client.get("/file", headers={"Range": "bytes=-10"})
+    assert tail.status_code == 206 and tail.content == _BODY[-10:]
+
+    past_end = client.get("/file", headers={"Range": f"bytes={len(_BODY)}-"})
+    assert past_end.status_code == 416 and past_end.headers["content-range"] == f"bytes */{len(_BODY)}"
+
+
+def test_conditional_requests_get_304_until_the_file_changes(client, tmp_path):
+    first = client.get("/file")
+    etag, last_modified = first.headers["etag"], first.headers["last-modified"]
+
+    for headers in ({"If-None-Match": etag}, {"If-None-Match": f'"other", W/{etag}'},
+                    {"If-Modified-Since": last_modified}):
+        resp = client.get("/file", headers=headers)
+        assert resp.status_code == 304 and resp.content == b""
+        assert resp.headers["etag"] == etag and "content-length" not in resp.headers
+
+    # If-None-Match wins over a matching If-Modified-Since.
+    assert client.get("/file", headers={"If-None-Match": '"other"',
+                                        "If-Modified-Since": last_modified}).status_code == 200
+
+    path = tmp_path / "song.mp3"
+    path.write_bytes(_BODY[:1000])
+    os.utime(path, (2_000_000_000, 2_000_000_000))
+    # A resume against the old copy gets the whole new file, not a splice.
+    resp = client.get("/file", headers={"Range": "bytes=500-", "If-Range": etag})
+    assert resp.status_code == 200 and resp.content == _BODY[:1000]
+    assert client.get("/file", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_zero_copy_send_is_used_when_the_server_offers_it(tmp_path):
+    path = tmp_path / "song.mp3"
+    path.write_bytes(_BODY)
+    messages = []
+
+    async def send(message):
+        if message["type"] == "http.response.zerocopysend":
+            message = {**message, "data": os.pread(message["file"], message["count"], message["offset"])}
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"range", b"bytes=10-19")],
+             "extensions": {"http.response.zerocopysend": {}}}
+    asyncio.run(RangeFileResponse(str(path))(scope, None, send))
+    assert messages[0]["status"] == 206
+    assert [m["type"] for m in messages[1:]] == ["http.response.zerocopysend"]
+    assert messages[1]["data"] == _BODY[10:20]
+
+
+def test_music_files_stream_with_ranges(tmp_path, monkeypatch):
+    from api import main
+
+    (tmp_path / "song.mp3").write_bytes(_BODY)
+    monkeypatch.setattr(main, "get_music_dir", lambda: str(tmp_path))
+    resp = TestClient(main.app).get("/music/serve_file/song.mp3", headers={"Range": "bytes=0-1"})
+    assert resp.status_code == 206 and resp.content == _BODY[:2]
+    assert resp.headers["content-type"] == "audio/mpeg" and "max-age" in resp.headers["cache-control"]
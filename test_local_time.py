@@ -0,0 +1,26 @@
+"""Tests for api.local_time.utc_to_local_fields — the shared UTC->local step."""
+from datetime import datetime
+
+from api.local_time import utc_to_local_fields
+
+
+def test_converts_each_row_to_local_date_and_time():
+    local = utc_to_local_fields(
+        [datetime(2026, 6, 10, 1, 30), datetime(2026, 6, 10, 20, 0)],
+        [datetime(2026, 6, 10, 2, 45), datetime(2026, 6, 10, 21, 0)],
+        "Asia/Tokyo",
+    )
+    assert local["local_start_date"] == ["2026-06-10", "2026-06-11"]
+    assert local["local_start_time"] == ["10:30", "05:00"]
+    assert local["local_end_date"] == ["2026-06-10", "2026-06-11"]
+    assert local["local_end_time"] == ["11:45", "06:00"]
+
+
+def test_daylight_saving_offset_follows_the_date():
+    # London is UTC+0 in January and UTC+1 in July.
+    local = utc_to_local_fields(
+        [datetime(2026, 1, 15, 9, 0), datetime(2026, 7, 15, 9, 0)],
+        [datetime(2026, 1, 15, 10, 0), datetime(2026, 7, 15, 10, 0)],
+        "Europe/London",
+    )
+    assert local["local_start_time"] == ["09:00", "10:00"]
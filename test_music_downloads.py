@@ -0,0 +1,104 @@
+"""Tests for the music download queue (api.music).
+
+Each test runs against its own music.db in tmp_path; do_download is replaced
+by a stub that records how many downloads run at once.
+"""
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import music
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(music, "DB_PATH", str(tmp_path / "music.db"))
+    state = {"lock": threading.Lock(), "running": 0, "max_running": 0, "urls": [],
+             "release": threading.Event()}
+
+    def fake_download(job_id, url):
+        with state["lock"]:
+            state["running"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+            state["urls"].append(url)
+        state["release"].wait(10)
+        time.sleep(0.02)
+        with state["lock"]:
+            state["running"] -= 1
+        music._set_download(job_id, status="done", progress=100, filename=f"{job_id}.mp3")
+
+    monkeypatch.setattr(music, "do_download", fake_download)
+    music._reset_db_initialization()
+    yield state
+    state["release"].set()
+    music.stop_download_workers(wait=5)
+    music._reset_db_initialization()
+
+
+def _wait_for(job_ids, status="done"):
+    deadline = time.time() + 10
+    while any(music.get_download(j)["status"] != status for j in job_ids):
+        assert time.time() < deadline, [music.get_download(j)["status"] for j in job_ids]
+        time.sleep(0.01)
+
+
+def test_video_keys_ignore_how_the_url_is_written():
+    forms = ["https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=42s", "youtu.be/dQw4w9WgXcQ?si=abc",
+             "https://m.youtube.com/shorts/dQw4w9WgXcQ", " https://youtube.com/embed/dQw4w9WgXcQ "]
+    assert {music.video_key(url) for url in forms} == {"youtube:dQw4w9WgXcQ"}
+    assert music.video_key("https://example.com/a.mp3#x") == "https://example.com/a.mp3"
+
+
+def test_the_pool_bounds_concurrent_downloads_and_reports_queue_positions(downloads, monkeypatch):
+    monkeypatch.setattr(music, "DOWNLOAD_WORKERS", 2)
+    job_ids = [music.submit_download(f"https://youtu.be/video{i:06d}")[0] for i in range(5)]
+    _wait_for(job_ids[:2], "downloading")
+    assert [music.get_download(j)["queue_position"] for j in job_ids] == [None, None, 1, 2, 3]
+    stats = music.download_stats()
+    assert (stats["queued"], stats["downloading"], stats["workers"]) == (3, 2, 2)
+
+    downloads["release"].set()
+    _wait_for(job_ids)
+    assert downloads["max_running"] == 2
+    assert music.download_stats()["done_last_hour"] == 5
+
+
+def test_requests_for_a_video_in_flight_join_its_job(downloads):
+    first, joined = music.submit_download("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    again, joined_again = music.submit_download("https://youtu.be/dQw4w9WgXcQ")
+    assert (again, joined, joined_again) == (first, False, True)
+
+    downloads["release"].set()
+    _wait_for([first])
+    later, joined_later = music.submit_download("https://youtu.be/dQw4w9WgXcQ")
+    assert later != first and not joined_later  # a finished job is not joined
+    _wait_for([later])
+    assert len(downloads["urls"]) == 2
+
+
+def test_downloads_of_a_dead_process_are_requeued_and_old_jobs_pruned(downloads, monkeypatch):
+    monkeypatch.setattr(music, "start_download_workers", lambda: None)
+    job_id, _ = music.submit_download("https://youtu.be/dQw4w9WgXcQ")
+    assert music._claim_next_download()[0] == job_id
+    assert music._requeue_stale_downloads() == 0  # its heartbeat is fresh
+
+    assert music._requeue_stale_downloads(stale_s=-1) == 1
+    assert music.get_download(job_id)["queue_position"] == 1
+
+    music._set_download(job_id, status="done", finished_at=time.time() - 3600)
+    assert music._prune_downloads(ttl_s=7200) == 0
+    assert music._prune_downloads(ttl_s=60) == 1 and music.get_download(job_id) is None
+
+
+def test_the_status_endpoint(downloads, monkeypatch):
+    from api import main
+
+    monkeypatch.setattr(music, "start_download_workers", lambda: None)
+    client = TestClient(main.app)
+    job_id = client.post("/music/start_download/", data={"url": "https://youtu.be/dQw4w9WgXcQ"}).json()["job_id"]
+    body = client.get(f"/music/download_status/{job_id}").json()
+    assert body["status"] == "pending" and body["queue_position"] == 1
+    assert body["stats"]["queued"] == 1
+    assert client.get("/music/download_status/missing").status_code == 404
@@ -0,0 +1,116 @@
+"""Tests for the music library index (music_library in music.db).
+
+Each test gets its own music.db and music directory in tmp_path. The MP3s
+are a run of silent MPEG-1 Layer III frames (128 kbps, 44.1 kHz) with ID3
+tags written by mutagen.
+"""
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from mutagen.easyid3 import EasyID3
+
+from api import music
+
+_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413  # 417 bytes = 26 ms
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    music_dir = tmp_path / "music"
+    music_dir.mkdir()
+    monkeypatch.setattr(music, "DB_PATH", str(tmp_path / "music.db"))
+    monkeypatch.setattr(music, "get_music_dir", lambda: str(music_dir))
+    monkeypatch.setattr(music, "_LAST_SCAN", {"dir_mtime": None, "at": 0.0})
+    music._reset_db_initialization()
+    yield music_dir
+    music._reset_db_initialization()
+
+
+def _write_mp3(music_dir, filename, frames=100, mtime=None, **tags):
+    path = os.path.join(music_dir, filename)
+    with open(path, "wb") as f:
+        f.write(_FRAME * frames)
+    if tags:
+        id3 = EasyID3()
+        for key, value in tags.items():
+            id3[key] = value
+        id3.save(path)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_scan_reads_tags_once_and_only_rereads_changed_files(library, monkeypatch):
+    _write_mp3(library, "a.mp3", title="Alpha", artist="Band", mtime=1000)
+    _write_mp3(library, "b.mp3", frames=200, mtime=2000)
+    (library / "notes.txt").write_text("not audio")
+    reads = []
+    real_read = music._read_tags
+    monkeypatch.setattr(music, "_read_tags", lambda path: reads.append(os.path.basename(path))
+                        or real_read(path))
+
+    assert music.scan_library() == {"files": 2, "indexed": 2, "removed": 0}
+    items = music.get_library()["items"]
+    assert [i["filename"] for i in items] == ["b.mp3", "a.mp3"]
+    assert items[1]["title"] == "Alpha" and items[1]["artist"] == "Band"
+    assert items[1]["bitrate_kbps"] == 128 and items[1]["duration_s"] == pytest.approx(2.6, abs=0.05)
+    assert items[0]["title"] is None and items[0]["duration_s"] == pytest.approx(5.2, abs=0.05)
+
+    assert music.scan_library() is None  # directory unchanged: nothing to do
+    assert music.scan_library(force=True) == {"files": 2, "indexed": 0, "removed": 0}
+
+    _write_mp3(library, "b.mp3", frames=300, title="Beta", mtime=2500)
+    os.remove(library / "a.mp3")
+    assert music.scan_library(force=True) == {"files": 1, "indexed": 1, "removed": 1}
+    assert reads == ["a.mp3", "b.mp3", "b.mp3"]
+    assert [i["title"] for i in music.get_library()["items"]] == ["Beta"]
+
+
+def test_search_pages_and_sorts_from_the_index(library):
+    from api import main
+
+    for n in range(7):
+        _write_mp3(library, f"track{n}.mp3", frames=10, title=f"Song {n}",
+                   artist="Echo" if n % 2 else "Delta", mtime=1000 + n)
+    _write_mp3(library, "100%_pure.mp3", frames=10, mtime=900)
+
+    page = music.get_library(q="echo", offset=1, limit=2)
+    assert page["total"] == 3 and [i["title"] for i in page["items"]] == ["Song 3", "Song 1"]
+    assert music.get_library(q="delta song 4")["total"] == 1
+    assert [i["filename"] for i in music.get_library(q="%_")["items"]] == ["100%_pure.mp3"]
+    assert [i["artist"] for i in music.get_library(sort="artist", limit=8)["items"]][-1] is None
+
+    client = TestClient(main.app)
+    resp = client.get("/music/library/", params={"q": "song", "sort": "title", "limit": 3})
+    assert resp.status_code == 200
+    assert [i["title"] for i in resp.json()["items"]] == ["Song 0", "Song 1", "Song 2"]
+    assert client.get("/music/library/", params={"limit": 0}).status_code == 422
+    assert client.get("/music/files/").json()["files"][0] == "track6.mp3"
+
+
+def test_a_finished_download_is_indexed_without_a_scan(library):
+    music.scan_library()
+    _write_mp3(library, "new.mp3", title="Fresh")
+    assert music.index_file("new.mp3") and not music.index_file("missing.mp3")
+    with music._connect() as conn:
+        row = conn.execute("SELECT title FROM music_library WHERE filename = 'new.mp3'").fetchone()
+    assert row["title"] == "Fresh"
+
+
+def test_an_unreadable_file_is_indexed_without_tags(library):
+    (library / "broken.mp3").write_bytes(b"\x00" * 64)
+    assert music.scan_library()["indexed"] == 1
+    item = music.get_library()["items"][0]
+    assert item["filename"] == "broken.mp3" and item["duration_s"] is None
+
+
+def test_requests_serve_the_index_while_a_scan_is_running(library):
+    _write_mp3(library, "old.mp3", mtime=1000)
+    music.scan_library()
+    _write_mp3(library, "new.mp3", mtime=2000)
+
+    with music._SCAN_LOCK:  # as if the startup scan were still reading tags
+        assert [i["filename"] for i in music.get_library()["items"]] == ["old.mp3"]
+        assert music.library_filenames() == ["old.mp3"]
+    assert music.library_filenames() == ["new.mp3", "old.mp3"]
@@ -0,0 +1,143 @@
+"""Tests for the editor's waveform peaks (api.music_peaks)."""
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from api import music_peaks
+
+SPP = music_peaks.FINEST_SAMPLES_PER_PEAK
+
+
+@pytest.fixture
+def peaks(tmp_path, monkeypatch):
+    """Builds in threads, decoding a ramp instead of running ffmpeg."""
+    decoded = []
+
+    def fake_decode(path, chunk_samples):
+        decoded.append(os.path.basename(path))
+        samples = np.arange(-32768, 32768, 16, dtype="<i2")  # 4096 samples
+        for i in range(0, len(samples), chunk_samples):
+            yield samples[i:i + chunk_samples]
+
+    monkeypatch.setattr(music_peaks, "_decode_pcm", fake_decode)
+    monkeypatch.setattr(music_peaks, "_start_pool", lambda: ThreadPoolExecutor(1))
+    music_peaks.shutdown()
+    (tmp_path / "song.mp3").write_bytes(b"ID3 not really audio")
+    yield tmp_path, decoded
+    music_peaks.shutdown()
+
+
+def test_levels_are_min_max_pairs_that_halve_in_length():
+    samples = np.zeros(SPP * 5 + 10, dtype="<i2")
+    samples[SPP * 2 + 3] = 32767
+    samples[SPP * 4] = -32768
+    levels = music_peaks.peak_levels([samples[:SPP * 4], samples[SPP * 4:]])
+    assert len(levels) == music_peaks.ZOOM_LEVELS and all(l.dtype == np.int8 for l in levels)
+
+    finest = levels[music_peaks.MAX_ZOOM]
+    assert finest.tolist() == [0, 0, 0, 0, 0, 127, 0, 0, -128, 0, 0, 0]
+    assert levels[music_peaks.MAX_ZOOM - 1].tolist() == [0, 0, 0, 127, -128, 0]
+    assert levels[0].tolist() == [-128, 127]
+    assert [len(l) // 2 for l in levels[::-1]] == [6, 3, 2, 1, 1, 1, 1, 1]
+    assert music_peaks.peak_levels([])[0].tolist() == []
+
+
+def test_peaks_are_built_once_and_rebuilt_when_the_track_changes(peaks):
+    tmp_path, decoded = peaks
+    song = str(tmp_path / "song.mp3")
+
+    overview = music_peaks.get_peaks(song, 0)
+    assert overview["length"] == 1 and overview["peaks"] == [-128, 127]
+    detail = music_peaks.get_peaks(song, music_peaks.MAX_ZOOM)
+    assert detail["length"] == 4096 // SPP and detail["samples_per_peak"] == SPP
+    assert detail["duration_s"] == round(4096 / music_peaks.PEAKS_SAMPLE_RATE, 3)
+    assert os.path.exists(tmp_path / ".peaks" / "song.mp3.npz") and decoded == ["song.mp3"]
+
+    with open(song, "ab") as f:
+        f.write(b"re-downloaded")
+    music_peaks.get_peaks(song, 0)
+    assert decoded == ["song.mp3", "song.mp3"]
+
+    music_peaks.remove_peaks(song)
+    assert not os.path.exists(music_peaks.peaks_path(song))
+
+
+def test_peaks_endpoint(peaks, monkeypatch):
+    from api import main
+
+    tmp_path, _ = peaks
+    monkeypatch.setattr(main, "get_music_dir", lambda: str(tmp_path))
+    client = TestClient(main.app)
+    resp = client.get("/music/peaks/song.mp3", params={"zoom": 1})
+    assert resp.status_code == 200 and resp.json()["zoom"] == 1
+    assert client.get("/music/peaks/missing.mp3").status_code == 404
+    assert client.get("/music/peaks/song.mp3", params={"zoom": 99}).status_code == 422
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is not None, reason="ffmpeg is installed")
+def test_without_ffmpeg_the_endpoint_says_why(tmp_path, monkeypatch):
+    from api import main
+
+    monkeypatch.setattr(music_peaks, "_start_pool", lambda: ThreadPoolExecutor(1))
+    music_peaks.shutdown()
+    (tmp_path / "song.mp3").write_bytes(b"ID3")
+    monkeypatch.setattr(main, "get_music_dir", lambda: str(tmp_path))
+    resp = TestClient(main.app).get("/music/peaks/song.mp3")
+    assert resp.status_code == 503 and "ffmpeg" in resp.json()["detail"]
+    music_peaks.shutdown()
+
+
+def _fake_ffmpeg(tmp_path, monkeypatch, body):
+    script = tmp_path / "bin" / "ffmpeg"
+    script.parent.mkdir()
+    script.write_text(f"#!{sys.executable}\nimport sys, time\n{body}\n")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", str(script.parent))
+
+
+def test_a_chatty_ffmpeg_cannot_stall_on_its_own_stderr(tmp_path, monkeypatch):
+    _fake_ffmpeg(tmp_path, monkeypatch,
+                 "sys.stderr.write('Invalid frame header\\n' * 20000)\n"
+                 "sys.stderr.write('Truncated file\\n')\nsys.exit(1)")
+    with pytest.raises(music_peaks.PeaksUnavailable, match="^Truncated file$"):
+        list(music_peaks._decode_pcm(str(tmp_path / "song.mp3"), SPP))
+
+
+def test_a_hung_ffmpeg_is_killed_at_the_build_deadline(tmp_path, monkeypatch):
+    _fake_ffmpeg(tmp_path, monkeypatch, "time.sleep(60)")
+    with pytest.raises(music_peaks.PeaksUnavailable, match="longer than"):
+        list(music_peaks._decode_pcm(str(tmp_path / "song.mp3"), SPP, timeout=0.5))
+
+
+def test_a_broken_pool_or_a_slow_build_is_a_503_and_the_pool_is_replaced(peaks, monkeypatch):
+    from concurrent.futures.process import BrokenProcessPool
+    from api import main
+
+    tmp_path, _ = peaks
+    monkeypatch.setattr(main, "get_music_dir", lambda: str(tmp_path))
+
+    class BrokenPool(ThreadPoolExecutor):
+        def submit(self, *args, **kwargs):
+            raise BrokenProcessPool("a worker died")
+
+    monkeypatch.setattr(music_peaks, "_start_pool", lambda: BrokenPool(1))
+    client = TestClient(main.app)
+    resp = client.get("/music/peaks/song.mp3")
+    assert resp.status_code == 503 and "worker stopped" in resp.json()["detail"]
+    assert music_peaks._POOL is None
+
+    release = threading.Event()
+    real_decode = music_peaks._decode_pcm
+    monkeypatch.setattr(music_peaks, "_decode_pcm",
+                        lambda path, chunk: release.wait(5) and real_decode(path, chunk))
+    monkeypatch.setattr(music_peaks, "_start_pool", lambda: ThreadPoolExecutor(1))
+    monkeypatch.setattr(music_peaks.get_peaks, "__defaults__", (0.1,))
+    resp = client.get("/music/peaks/song.mp3")
+    assert resp.status_code == 503 and "still being built" in resp.json()["detail"]
+    release.set()
@@ -0,0 +1,72 @@
+"""Tests for the tab-permission cache in api.permissions.
+
+The DB lookup (_load_tabs) is replaced with a counting stub so these check the
+caching rules only: one resolution per request, reuse across requests until
+the TTL expires or the entry is invalidated, and LRU eviction at the cap.
+"""
+import pytest
+from starlette.requests import Request
+
+from api import permissions
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    calls = []
+
+    def fake_load(username):
+        calls.append(username)
+        return frozenset({"schedule", username})
+
+    monkeypatch.setattr(permissions, "_load_tabs", fake_load)
+    permissions.invalidate_tab_cache()
+    yield calls
+    permissions.invalidate_tab_cache()
+
+
+def _request(username):
+    return Request({"type": "http", "session": {"login_username": username}})
+
+
+def test_resolved_once_per_request_and_reused_across_requests(loads):
+    req = _request("a")
+    assert permissions.allowed_tabs_for(req) == {"schedule", "a"}
+    assert permissions.tab_guard(req, "schedule") is None
+    assert permissions.require_admin(req) is not None
+    assert permissions.allowed_tabs_for(_request("a")) == {"schedule", "a"}
+    assert loads == ["a"]
+
+
+def test_login_inside_a_request_resolves_the_new_user(loads):
+    req = _request("a")
+    permissions.allowed_tabs_for(req)
+    req.session["login_username"] = "b"
+    assert "b" in permissions.allowed_tabs_for(req)
+    assert loads == ["a", "b"]
+
+
+def test_invalidate_and_ttl_force_a_reload(loads, monkeypatch):
+    permissions.allowed_tabs_for(_request("a"))
+    permissions.invalidate_tab_cache("a")
+    permissions.allowed_tabs_for(_request("a"))
+    assert loads == ["a", "a"]
+
+    monkeypatch.setattr(permissions, "TAB_CACHE_TTL", -1.0)
+    permissions.invalidate_tab_cache()
+    permissions.allowed_tabs_for(_request("a"))
+    permissions.allowed_tabs_for(_request("a"))
+    assert loads == ["a", "a", "a", "a"]
+
+
+def test_lru_evicts_the_least_recently_used_user(loads, monkeypatch):
+    monkeypatch.setattr(permissions, "TAB_CACHE_MAX", 2)
+    for name in ["a", "b", "a", "c"]:  # 'b' is least recent when 'c' arrives
+        permissions.allowed_tabs_for(_request(name))
+    permissions.allowed_tabs_for(_request("a"))
+    permissions.allowed_tabs_for(_request("b"))
+    assert loads == ["a", "b", "c", "b"]
+
+
+def test_no_session_user_is_denied_without_a_lookup(loads):
+    assert permissions.allowed_tabs_for(_request(None)) == frozenset()
+    assert loads == []
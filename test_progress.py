@@ -0,0 +1,94 @@
+"""Tests for the in-process progress hub and its Server-Sent Events streams."""
+import asyncio
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from api.progress import ProgressHub
+
+
+def _collect(hub, topic, snapshot, heartbeat=5.0, publish=None, client_delay=0.0):
+    async def run():
+        chunks = []
+        async for chunk in hub.stream(topic, snapshot, heartbeat=heartbeat):
+            chunks.append(chunk)
+            if publish and len(chunks) == 1:
+                threading.Thread(target=publish).start()
+            await asyncio.sleep(client_delay)
+        return chunks
+    return asyncio.run(asyncio.wait_for(run(), 5))
+
+
+def _events(chunks):
+    return [json.loads(c[len("data: "):]) for c in chunks if c.startswith("data: ")]
+
+
+def test_patches_from_a_thread_reach_the_stream_until_a_terminal_status():
+    hub = ProgressHub()
+
+    def publish():
+        hub.publish("job:1", {"progress": 50})
+        time.sleep(0.05)
+        hub.publish("job:1", {"status": "done", "progress": 100})
+
+    chunks = _collect(hub, "job:1", lambda: {"status": "running", "progress": 0, "name": "a"},
+                      publish=publish)
+    events = _events(chunks)
+    assert events[0] == {"status": "running", "progress": 0, "name": "a"}
+    assert events[-1] == {"status": "done", "progress": 100, "name": "a"}
+    assert len(events) <= 3 and not hub.has_subscribers("job:1")
+
+
+def test_a_slow_subscriber_only_sees_the_newest_state():
+    hub = ProgressHub()
+
+    def publish():
+        for pct in range(1, 1001):
+            hub.publish("job:1", {"progress": pct})
+        hub.publish("job:1", {"status": "done"})
+
+    events = _events(_collect(hub, "job:1", lambda: {"status": "running"}, publish=publish,
+                              client_delay=0.05))
+    assert events[-1] == {"status": "done", "progress": 1000}
+    assert len(events) < 10
+
+
+def test_a_finished_job_streams_one_event_and_idle_streams_send_heartbeats():
+    hub = ProgressHub()
+    hub.publish("job:1", {"status": "error", "error": "boom"})
+    assert _events(_collect(hub, "job:1", lambda: {"status": "running"})) == [
+        {"status": "error", "error": "boom"}]
+
+    chunks = _collect(hub, "job:2", lambda: {"status": "running"}, heartbeat=0.01,
+                      publish=lambda: (time.sleep(0.1), hub.publish("job:2", {"status": "done"})))
+    assert ": keep-alive\n\n" in chunks and _events(chunks)[-1]["status"] == "done"
+
+
+def test_music_download_events_follow_the_download(tmp_path, monkeypatch):
+    from api import main, music
+
+    monkeypatch.setattr(music, "DB_PATH", str(tmp_path / "music.db"))
+    monkeypatch.setattr(music, "start_download_workers", lambda: None)
+    music._reset_db_initialization()
+    job_id, _ = music.submit_download("https://youtu.be/dQw4w9WgXcQ")
+    assert music._claim_next_download() == (job_id, "https://youtu.be/dQw4w9WgXcQ")
+    music._set_download(job_id, progress=5)
+
+    def finish():
+        time.sleep(0.2)
+        music._set_download(job_id, progress=60)
+        time.sleep(0.05)
+        music._set_download(job_id, status="done", progress=100, filename="song.mp3")
+
+    threading.Thread(target=finish).start()
+    with TestClient(main.app).stream("GET", f"/music/download_events/{job_id}") as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        body = "".join(resp.iter_text())
+    events = _events(body.split("\n\n"))
+    assert events[0]["progress"] == 5 and events[-1]["filename"] == "song.mp3"
+
+    resp = TestClient(main.app).get("/music/download_events/missing")
+    assert _events(resp.text.split("\n\n")) == [{"status": "not_found"}]
+    music._reset_db_initialization()
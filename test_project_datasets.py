@@ -0,0 +1,117 @@
+"""Tests for the Project tab's uploaded-dataset store and its routes."""
+import io
+import os
+import sqlite3
+import time
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from api import project_datasets as datasets
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(datasets, "DATASETS_DIR", str(tmp_path / "datasets"))
+    builds = []
+    real_build = datasets._build_dataset
+    monkeypatch.setattr(datasets, "_build_dataset",
+                        lambda root, ext, content: builds.append(ext) or real_build(root, ext, content))
+    return builds
+
+
+def _workbook() -> bytes:
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+        pd.DataFrame({"name": ["a", "b", None], "qty": [1.5, None, 3]}).to_excel(
+            writer, sheet_name="Items", index=False)
+        pd.DataFrame({2024: [1, 2]}).to_excel(writer, sheet_name="Years", index=False)
+    return buf.getvalue()
+
+
+def _sqlite_file(tmp_path) -> bytes:
+    path = tmp_path / "src.db"
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE t (id INTEGER, price REAL, label TEXT, mixed)")
+    con.executemany("INSERT INTO t VALUES (?, ?, ?, ?)",
+                    [(i, i / 2, f"row {i}", i if i % 2 else f"s{i}") for i in range(10)])
+    con.execute('CREATE TABLE "we""ird" (x)')
+    con.execute('INSERT INTO "we""ird" VALUES (NULL)')
+    con.commit()
+    con.close()
+    return path.read_bytes()
+
+
+def test_a_workbook_is_parsed_once_for_every_sheet(store):
+    content = _workbook()
+    first = datasets.ingest("book.xlsx", content)
+    assert first["file_type"] == "xlsx" and first["sheets"] == ["Items", "Years"]
+    assert datasets.ingest("copy.xlsx", content) == first and store == [".xlsx"]
+
+    items = datasets.sheet_rows(first["token"], "Items")
+    # The cells are what the routes sent before the store: str() of each value.
+    assert items["columns"] == ["name", "qty"] and items["rows"] == [
+        {"name": "a", "qty": "1.5"}, {"name": "b", "qty": "nan"}, {"name": "None", "qty": "3.0"}]
+    assert datasets.sheet_rows(first["token"], "Years")["rows"] == [{"2024": "1"}, {"2024": "2"}]
+    with pytest.raises(ValueError):
+        datasets.sheet_rows(first["token"], "Missing")
+
+
+def test_sqlite_tables_are_converted_on_first_use_and_keep_their_types(store, tmp_path):
+    token = datasets.ingest("data.sqlite", _sqlite_file(tmp_path))["token"]
+    sheets_dir = os.path.join(datasets.DATASETS_DIR, token, "sheets")
+    assert os.listdir(sheets_dir) == []
+
+    page = datasets.sheet_rows(token, "t", columns=["mixed", "id", "price"], offset=3, limit=2)
+    assert page["total"] == 10 and page["columns"] == ["mixed", "id", "price"]
+    assert page["rows"] == [{"mixed": 3, "id": 3, "price": 1.5}, {"mixed": "s4", "id": 4, "price": 2.0}]
+    kinds = [c["kind"] for c in datasets._read_json(os.path.join(sheets_dir, "0", "meta.json"))["columns"]]
+    assert kinds == ["i8", "f8", "str", "json"]
+    assert datasets.sheet_rows(token, 'we"ird')["rows"] == [{"x": None}]
+    assert datasets.sheet_rows(token, "t", offset=50)["rows"] == []
+
+
+def test_least_recently_used_datasets_go_first_over_the_quota(store):
+    tokens = []
+    for n in range(3):
+        tokens.append(datasets.ingest(f"f{n}.csv", f"a,b\n{n},x\n".encode())["token"])
+        manifest = os.path.join(datasets.DATASETS_DIR, tokens[-1], "manifest.json")
+        os.utime(manifest, (time.time() - 100 + n, time.time() - 100 + n))
+    datasets.sheet_rows(tokens[0])  # now the most recently used
+
+    keep = sum(datasets._tree_size(os.path.join(datasets.DATASETS_DIR, t)) for t in tokens[::2])
+    assert datasets._evict(quota=keep) == [tokens[1]]
+    with pytest.raises(datasets.DatasetNotFound):
+        datasets.sheet_rows(tokens[1])
+    with pytest.raises(datasets.DatasetNotFound):
+        datasets.sheet_rows("../../etc")
+
+
+def test_routes_take_the_token_and_ask_for_the_file_once_it_is_evicted(store):
+    from api import main
+
+    client = TestClient(main.app)
+    content = _workbook()
+    resp = client.post("/project/upload/", files={"file": ("book.xlsx", content)})
+    body = resp.json()
+    assert resp.status_code == 200 and body["sheets"] == ["Items", "Years"] and body["columns"] is None
+
+    resp = client.post("/project/columns/", data={"token": body["token"], "sheet": "Years"})
+    assert resp.json()["rows"] == [{"2024": "1"}, {"2024": "2"}] and store == [".xlsx"]
+
+    resp = client.get("/project/rows/", params={"token": body["token"], "sheet": "Items",
+                                                "columns": "name", "offset": 1, "limit": 1})
+    assert resp.json()["rows"] == [{"name": "b"}] and resp.json()["total"] == 3
+
+    datasets._evict(quota=0)
+    resp = client.post("/project/columns/", data={"token": body["token"], "sheet": "Years"})
+    assert resp.status_code == 410
+    resp = client.post("/project/columns/", data={"sheet": "Years"},
+                       files={"file": ("book.xlsx", content)})
+    assert resp.status_code == 200 and resp.json()["token"] == body["token"]
+
+    csv = client.post("/project/upload/", files={"file": ("t.csv", b"a,b\n1,\n")}).json()
+    assert csv["file_type"] == "csv" and csv["rows"] == [{"a": "1", "b": "nan"}]
+    resp = client.post("/project/upload/", files={"file": ("notes.txt", b"hi")})
+    assert resp.status_code == 400 and resp.json()["error"] == "Unsupported file type: .txt"
@@ -0,0 +1,79 @@
+"""Tests for api.repeat_tasks expansion.
+
+The arithmetic expansion (RepeatWindow) is checked against the per-date
+reference predicate date_matches_template over randomized templates, plus a
+few hand-written cases for the RRULE-style patterns.
+"""
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from api.repeat_tasks import RepeatWindow, date_matches_template, expand_template, parse_weekdays_csv
+
+
+def _window(start, days):
+    return [(start + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+def _row(**kw):
+    base = dict(id=1, name="t", link=None, repeat_type="every_day", repeat_weekdays=None,
+                range_start=None, range_end=None, today_only=0,
+                repeat_start_time=None, repeat_end_time=None,
+                repeat_interval=None, repeat_month_day=None)
+    base.update(kw)
+    return SimpleNamespace(**base)
+
+
+def _brute_force(row, dates, today=None):
+    out = []
+    for iso in dates:
+        if row.today_only and iso != today:
+            continue
+        if date_matches_template(date.fromisoformat(iso), row.repeat_type,
+                                 parse_weekdays_csv(row.repeat_weekdays),
+                                 row.range_start, row.range_end,
+                                 row.repeat_interval or 1, row.repeat_month_day):
+            out.append(iso)
+    return out
+
+
+def test_matches_reference_predicate_on_random_templates():
+    rng = random.Random(7)
+    dates = _window(date(2026, 1, 5), 350)
+    window = RepeatWindow(dates)
+    origin = date(2025, 11, 1)
+    for _ in range(2000):
+        start = origin + timedelta(days=rng.randrange(500)) if rng.random() < 0.9 else None
+        end = (start or origin) + timedelta(days=rng.randrange(400)) if rng.random() < 0.8 else None
+        row = _row(
+            repeat_type=rng.choice(["every_day", "every_weekday", "every_specific_weekday",
+                                    "monthly_on_day", "bogus"]),
+            repeat_weekdays=",".join(str(d) for d in rng.sample(range(7), rng.randrange(1, 4))),
+            range_start=start, range_end=end,
+            repeat_interval=rng.choice([None, 1, 2, 3, 5]),
+            repeat_month_day=rng.choice([1, 15, 29, 30, 31]),
+            today_only=int(rng.random() < 0.1),
+        )
+        today = rng.choice(dates)
+        assert window.occurrences(row, today) == _brute_force(row, dates, today), row
+
+
+def test_every_two_weeks_counts_from_range_start_week():
+    # 2026-06-03 is a Wednesday; Mon/Fri every 2nd week from that week.
+    row = _row(repeat_type="every_specific_weekday", repeat_weekdays="0,4",
+               range_start=date(2026, 6, 3), repeat_interval=2)
+    got = [d["local_start_date"] for d in expand_template(row, _window(date(2026, 6, 1), 28))]
+    assert got == ["2026-06-05", "2026-06-15", "2026-06-19"]
+
+
+def test_monthly_on_day_skips_short_months():
+    row = _row(repeat_type="monthly_on_day", repeat_month_day=31, range_start=date(2026, 1, 1))
+    got = [d["local_start_date"] for d in expand_template(row, _window(date(2026, 1, 1), 200))]
+    assert got == ["2026-01-31", "2026-03-31", "2026-05-31"]
+
+
+def test_render_shape_and_no_time_sentinel():
+    row = _row(repeat_start_time="00:00", repeat_end_time="00:00")
+    (item,) = expand_template(row, ["2026-06-01"])
+    assert item["local_start_time"] == item["local_end_time"] == ""
+    assert item["is_daily_task"] == item["is_repeat_task"] == 1
@@ -0,0 +1,45 @@
+"""Tests for api.schedule_index.index_by_date.
+
+The grid templates now look up each cell's items by date instead of scanning the
+flat list, so the index must hold exactly the items the old scan would have
+matched for that date, in the same display order.
+"""
+from api.schedule_index import index_by_date, schedule_sort_key
+
+
+def _regular(item_id, day, start):
+    return {"id": item_id, "local_start_date": day, "local_start_time": start,
+            "is_daily_task": 0}
+
+
+def _daily(item_id, day):
+    return {"id": item_id, "local_start_date": day, "local_start_time": "",
+            "is_daily_task": 1}
+
+
+def _repeat(item_id, day, start=""):
+    return {"id": item_id, "local_start_date": day, "local_start_time": start,
+            "is_daily_task": 1, "is_repeat_task": 1}
+
+
+def test_items_are_grouped_by_local_start_date():
+    items = [_regular(1, "2026-06-01", "09:00"), _regular(2, "2026-06-02", "10:00"),
+             _regular(3, "2026-06-01", "08:00")]
+    index = index_by_date(items)
+    assert sorted(index) == ["2026-06-01", "2026-06-02"]
+    assert [i["id"] for i in index["2026-06-01"]] == [3, 1]
+
+
+def test_day_order_matches_flat_sort_then_filter():
+    # Old behaviour: sort the flat list once, then filter per cell.
+    items = [_regular(1, "2026-06-01", "09:00"), _repeat(2, "2026-06-01", "09:00"),
+             _repeat(3, "2026-06-01"), _daily(4, "2026-06-01"),
+             _regular(5, "2026-06-01", "07:30"), _daily(6, "2026-06-01")]
+    expected = [i["id"] for i in sorted(items, key=schedule_sort_key)]
+    assert [i["id"] for i in index_by_date(items)["2026-06-01"]] == expected
+    assert expected == [4, 6, 3, 5, 1, 2]
+
+
+def test_items_without_a_date_are_dropped():
+    index = index_by_date([{"id": 1, "local_start_date": None}, _daily(2, "2026-06-01")])
+    assert list(index) == ["2026-06-01"]
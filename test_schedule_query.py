@@ -0,0 +1,85 @@
+"""Tests for api.schedule_query.visible_schedule_rows.
+
+The grid only renders a window of local dates, so the query must keep every row
+that can land in it (for any viewer time zone) and drop the rest of history.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api.database import Base
+from api.models import Schedule
+from api.schedule_query import visible_schedule_rows
+
+WINDOW = [(date(2026, 6, 1) + timedelta(days=i)).isoformat() for i in range(14)]
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def _regular(name, start):
+    return Schedule(name=name, start_datetime=start, end_datetime=start + timedelta(hours=1),
+                    is_daily_task=0, is_repeat_task=0)
+
+
+def _daily(name, d):
+    midnight = datetime.combine(d, datetime.min.time())
+    return Schedule(name=name, start_datetime=midnight, end_datetime=midnight,
+                    is_daily_task=1, task_date=d, is_repeat_task=0)
+
+
+def _repeat(name, range_start, range_end):
+    midnight = datetime.combine(range_start, datetime.min.time())
+    return Schedule(name=name, start_datetime=midnight, end_datetime=midnight,
+                    is_daily_task=0, is_repeat_task=1, repeat_type="every_day",
+                    range_start=range_start, range_end=range_end)
+
+
+def _names(db):
+    return {row.name for row in visible_schedule_rows(db, WINDOW)}
+
+
+def test_regular_tasks_outside_the_window_are_skipped():
+    db = _session()
+    db.add_all([
+        _regular("inside", datetime(2026, 6, 5, 3, 0)),
+        _regular("old", datetime(2025, 1, 1, 3, 0)),
+        _regular("future", datetime(2026, 9, 1, 3, 0)),
+    ])
+    db.commit()
+    assert _names(db) == {"inside"}
+
+
+def test_time_zone_padding_keeps_edge_rows():
+    # 2026-05-31 14:00 UTC is 2026-06-01 in UTC+10; 2026-06-14 23:00 UTC is
+    # still 2026-06-14 in UTC. Both can show on the grid's first/last day.
+    db = _session()
+    db.add_all([
+        _regular("early", datetime(2026, 5, 31, 14, 0)),
+        _regular("late", datetime(2026, 6, 14, 23, 0)),
+    ])
+    db.commit()
+    assert _names(db) == {"early", "late"}
+
+
+def test_daily_tasks_filtered_by_task_date():
+    db = _session()
+    db.add_all([_daily("in", date(2026, 6, 3)), _daily("out", date(2026, 8, 3))])
+    db.commit()
+    assert _names(db) == {"in"}
+
+
+def test_repeat_templates_overlapping_the_window_are_kept():
+    db = _session()
+    db.add_all([
+        _repeat("spans", date(2026, 1, 1), date(2026, 12, 31)),
+        _repeat("open_end", date(2026, 1, 1), None),
+        _repeat("ended", date(2026, 1, 1), date(2026, 5, 1)),
+        _repeat("later", date(2026, 7, 1), date(2026, 7, 31)),
+    ])
+    db.commit()
+    assert _names(db) == {"spans", "open_end"}
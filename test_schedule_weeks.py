@@ -0,0 +1,107 @@
+"""Tests for the /schedule/weeks/ endpoint that extends the grid on scroll.
+
+Runs against an in-memory database through get_db; the tab permission check
+is replaced so a test can allow or deny the schedule tab.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from api import main, permissions
+from api.database import Base
+from api.models import Schedule
+
+MONDAY = date.today() - timedelta(days=date.today().weekday())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False},
+                           poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add_all([
+        _regular("this week", datetime.combine(MONDAY + timedelta(days=2), datetime.min.time())
+                 + timedelta(hours=9)),
+        _regular("week three", datetime.combine(MONDAY + timedelta(days=15), datetime.min.time())
+                 + timedelta(hours=14)),
+        _regular("far out", datetime.combine(MONDAY + timedelta(days=7 * 30), datetime.min.time())),
+        Schedule(name="daily", start_datetime=datetime.combine(MONDAY, datetime.min.time()),
+                 end_datetime=datetime.combine(MONDAY, datetime.min.time()),
+                 is_daily_task=1, task_date=MONDAY + timedelta(days=1), is_repeat_task=0),
+    ])
+    db.commit()
+    db.close()
+
+    def get_test_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    allowed = {"schedule"}
+    monkeypatch.setattr(permissions, "allowed_tabs_for", lambda request: frozenset(allowed))
+    main.app.dependency_overrides[main.get_db] = get_test_db
+    yield TestClient(main.app), allowed
+    main.app.dependency_overrides.pop(main.get_db, None)
+
+
+def _regular(name, start):
+    return Schedule(name=name, start_datetime=start, end_datetime=start + timedelta(hours=1),
+                    is_daily_task=0, is_repeat_task=0)
+
+
+def _names(items_by_date):
+    return {d: [item["name"] for item in items] for d, items in items_by_date.items()}
+
+
+def test_from_is_aligned_to_its_monday_and_next_follows_the_batch(client):
+    client, _ = client
+    thursday = MONDAY + timedelta(days=3)
+    body = client.get("/schedule/weeks/", params={"from": thursday.isoformat(), "n": 2}).json()
+    assert body["from"] == MONDAY.isoformat() and body["n"] == 2
+    assert body["next"] == (MONDAY + timedelta(days=14)).isoformat()
+    assert _names(body["items_by_date"]) == {
+        (MONDAY + timedelta(days=1)).isoformat(): ["daily"],
+        (MONDAY + timedelta(days=2)).isoformat(): ["this week"],
+    }
+    assert "this week" in body["html"]
+
+    following = client.get("/schedule/weeks/", params={"from": body["next"], "n": 2}).json()
+    assert _names(following["items_by_date"]) == {
+        (MONDAY + timedelta(days=15)).isoformat(): ["week three"]}
+
+
+def test_n_is_clamped_to_the_fetch_limit(client):
+    client, _ = client
+    big = client.get("/schedule/weeks/", params={"from": MONDAY.isoformat(), "n": 500}).json()
+    assert big["n"] == main.SCHEDULE_MAX_FETCH_WEEKS
+    assert big["next"] == (MONDAY + timedelta(days=7 * main.SCHEDULE_MAX_FETCH_WEEKS)).isoformat()
+    assert client.get("/schedule/weeks/", params={"from": MONDAY.isoformat(), "n": 0}).json()["n"] == 1
+
+
+def test_a_bad_date_is_a_400_and_the_tab_is_guarded(client):
+    client, allowed = client
+    resp = client.get("/schedule/weeks/", params={"from": "2026-13-40"})
+    assert resp.status_code == 400 and "invalid from date" in resp.json()["detail"]
+
+    allowed.clear()
+    resp = client.get("/schedule/weeks/", params={"from": MONDAY.isoformat()},
+                      follow_redirects=False)
+    assert resp.status_code == 303 and resp.headers["location"] == "/no_access/"
+
+
+def test_items_match_the_weeks_rendered_with_the_page(client):
+    client, _ = client
+    page = client.get("/schedule/")
+    assert page.status_code == 200
+    weeks = client.get("/schedule/weeks/", params={
+        "from": MONDAY.isoformat(), "n": main.SCHEDULE_FIRST_WEEKS}).json()
+    assert weeks["items_by_date"] == page.context["items_by_date"]
+    assert weeks["next"] == page.context["weeks_next"]
@@ -9,7 +9,8 @@ import sqlite3
 from api.schema_check import missing_schema, format_warning, MIGRATION_COMMAND
 
 
-def _make_db(path, *, with_user_group, with_allowed_group, with_tab_group_table):
+def _make_db(path, *, with_user_group, with_allowed_group, with_tab_group_table,
+             with_repeat_rule=True):
     conn = sqlite3.connect(path)
     user_cols = "id INTEGER PRIMARY KEY, username TEXT"
     if with_user_group:
@@ -23,6 +24,11 @@ def _make_db(path, *, with_user_group, with_allowed_group, with_tab_group_table)
 
     if with_tab_group_table:
         conn.execute("CREATE TABLE tab_group (id INTEGER PRIMARY KEY, group_key TEXT)")
+
+    schedule_cols = "id INTEGER PRIMARY KEY, repeat_type TEXT"
+    if with_repeat_rule:
+        schedule_cols += ", repeat_interval INTEGER, repeat_month_day INTEGER"
+    conn.execute(f"CREATE TABLE schedules ({schedule_cols})")
     conn.commit()
     conn.close()
 
@@ -54,6 +60,15 @@ def test_missing_tab_group_table_is_detected(tmp_path):
     assert any("tab_group" in m for m in missing)
 
 
+def test_missing_repeat_rule_columns_are_detected(tmp_path):
+    db = tmp_path / "stale5.db"
+    _make_db(db, with_user_group=True, with_allowed_group=True, with_tab_group_table=True,
+             with_repeat_rule=False)
+    missing = missing_schema(str(db))
+    assert any("schedules.repeat_interval" in m for m in missing)
+    assert any("schedules.repeat_month_day" in m for m in missing)
+
+
 def test_nonexistent_db_file_reports_no_false_positive(tmp_path):
     # A brand-new deploy with no DB yet should not crash the check.
     db = tmp_path / "does_not_exist.db"
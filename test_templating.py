@@ -0,0 +1,58 @@
+"""Tests for the shared Jinja2 environment and the cached top-bar fragment."""
+import pytest
+from starlette.requests import Request
+
+from api import permissions, templating
+
+
+@pytest.fixture
+def tabs(monkeypatch):
+    by_user = {"a": frozenset({"schedule", "todo"}), "b": frozenset({"schedule", "todo"}),
+               "c": frozenset({"admin"})}
+    monkeypatch.setattr(permissions, "_load_tabs", lambda username: by_user[username])
+    permissions.invalidate_tab_cache()
+    templating._nav_cache.clear()
+    yield by_user
+    permissions.invalidate_tab_cache()
+    templating._nav_cache.clear()
+
+
+def _request(username):
+    return Request({"type": "http", "session": {"login_username": username}})
+
+
+def test_nav_tabs_renders_only_allowed_tabs_and_marks_the_active_one(tabs):
+    html = templating.nav_tabs(_request("a"), "todo")
+    assert 'action="/schedule/"' in html and 'action="/todo/"' in html
+    assert 'action="/admin/"' not in html
+    assert 'color: #0f0;">To Do' in html and 'color: #aaa;">Schedule' in html
+
+
+def test_nav_tabs_renders_once_per_tab_set_and_active_tab(tabs, monkeypatch):
+    template = templating.templates.env.get_template(templating.NAV_TEMPLATE)
+    renders = []
+    real_render = template.render
+    monkeypatch.setattr(template, "render", lambda **kw: renders.append(kw) or real_render(**kw))
+
+    first = templating.nav_tabs(_request("a"), "schedule")
+    assert templating.nav_tabs(_request("b"), "schedule") is first  # same tab set
+    templating.nav_tabs(_request("a"), "todo")
+    templating.nav_tabs(_request("c"), "schedule")
+    assert [(kw["allowed_tabs"], kw["tab_page_active"]) for kw in renders] == [
+        (tabs["a"], "schedule"), (tabs["a"], "todo"), (tabs["c"], "schedule")]
+
+
+def test_base_html_pastes_the_nav_fragment(tabs):
+    page = templating.templates.env.get_template("no_access.html")
+    html = page.render(request=_request("a"), tab_page_active="schedule")
+    assert str(templating.nav_tabs(_request("a"), "schedule")) in html
+
+
+def test_one_environment_serves_every_router():
+    from api import admin, main
+    from translator_on_drawings import routes
+
+    assert main.templates is admin.templates is routes.templates is templating.templates
+    env = templating.templates.env
+    assert env.bytecode_cache is not None
+    assert env.get_template("function_translator_on_drawings.html")
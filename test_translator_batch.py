@@ -0,0 +1,186 @@
+"""Tests for the concurrent Claude batch translator, against a local stub of
+the Messages streaming endpoint (no network, no API key)."""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import anthropic
+import pytest
+
+from translator_on_drawings import pipeline
+
+
+class _Stub(BaseHTTPRequestHandler):
+    # Set per test: requests seen, the in-flight high-water mark, a status to
+    # return instead of a message (for the first "failures" requests only, when
+    # set), phrases that make a chunk come back broken, and the chunk size
+    # from which a reply takes longer than any timeout a test sets.
+    state = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        items = json.loads(body["messages"][0]["content"].split("\n\n", 1)[1])
+        st = self.state
+        with st["lock"]:
+            st["requests"].append([item["text"] for item in items])
+            st["in_flight"] += 1
+            st["max_in_flight"] = max(st["max_in_flight"], st["in_flight"])
+        try:
+            time.sleep(0.05)
+            if len(items) >= st.get("slow_from", len(items) + 1):
+                time.sleep(1)
+            if st.get("status") and st.setdefault("failures", None) != 0:
+                if st["failures"]:
+                    st["failures"] -= 1
+                return self._error(st["status"])
+            if any(item["text"] in st.get("broken", ()) for item in items):
+                text = "Sorry, I cannot produce JSON for this."
+            else:
+                text = json.dumps([{"id": item["id"], "kind": "phrase",
+                                    "target": "term " + re.sub(r"\D", "", item["text"])}
+                                   for item in items])
+            self._stream(text)
+        finally:
+            with st["lock"]:
+                st["in_flight"] -= 1
+
+    def _error(self, status):
+        kind = {401: "authentication_error", 429: "rate_limit_error", 529: "overloaded_error"}[status]
+        payload = json.dumps({"type": "error", "error": {"type": kind, "message": kind}})
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if "retry_after" in self.state:
+            self.send_header("retry-after", self.state["retry_after"])
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload.encode())
+
+    def _stream(self, text):
+        usage = {"input_tokens": 10, "output_tokens": 1}
+        events = [
+            ("message_start", {"type": "message_start", "message": {
+                "id": "msg_stub", "type": "message", "role": "assistant", "model": pipeline.CLAUDE_MODEL,
+                "content": [], "stop_reason": None, "stop_sequence": None, "usage": usage}}),
+            ("content_block_start", {"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}}),
+            ("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                     "delta": {"type": "text_delta", "text": text}}),
+            ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+            ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                               "usage": {"output_tokens": 5}}),
+            ("message_stop", {"type": "message_stop"}),
+        ]
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for name, data in events:
+                self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (a test's timeout)
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    _Stub.state = {"lock": threading.Lock(), "requests": [], "in_flight": 0, "max_in_flight": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = anthropic.Anthropic(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}",
+                                 max_retries=0)
+    monkeypatch.setattr(pipeline, "_CLAUDE_CLIENT", client)
+    yield _Stub.state
+    server.shutdown()
+    server.server_close()
+
+
+def _phrases(n):
+    return [f"คำ{i}" for i in range(n)]
+
+
+def test_chunks_follow_the_token_budget_and_phrase_cap(monkeypatch):
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_TOKEN_BUDGET", 100)
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_CHUNK_SIZE", 3)
+    long_phrase = "ก" * 150  # over budget on its own: still sent, alone
+    phrases = ["ก" * 30, "ข" * 30, long_phrase, "ค", "ง", "จ", "ฉ"]
+    chunks = pipeline._plan_chunks(phrases)
+    assert chunks == [phrases[0:2], [long_phrase], phrases[3:6], phrases[6:]]
+    assert pipeline._plan_chunks([]) == []
+
+
+def test_chunks_run_concurrently_and_are_reported_as_they_land(stub, monkeypatch):
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_CHUNK_SIZE", 5)
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_CONCURRENCY", 4)
+    phrases = _phrases(40)
+    landed = []
+    results = pipeline._claude_translate_batch(phrases, on_chunk=landed.append)
+
+    assert results == {p: ("term " + p[2:], "phrase") for p in phrases}
+    assert len(stub["requests"]) == 8 and stub["max_in_flight"] > 1
+    assert sorted(len(chunk) for chunk in landed) == [5] * 8
+
+
+def test_a_failing_chunk_is_split_until_only_the_bad_phrase_is_dropped(stub, monkeypatch):
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_CHUNK_SIZE", 8)
+    phrases = _phrases(8)
+    stub["broken"] = {phrases[5]}
+    metrics = pipeline._JobMetrics()
+    results = pipeline._claude_translate_batch(phrases, metrics=metrics)
+
+    assert set(results) == set(phrases) - {phrases[5]}
+    sizes = sorted(len(r) for r in stub["requests"])
+    assert sizes == [1, 1, 2, 2, 4, 4, 8]  # 8 -> 4+4 -> 2+2 -> 1+1
+    # Usage is counted for the three calls that came back; the four broken ones only as failures.
+    assert metrics.failed_chunks == 4 and len(metrics.chunk_ms) == 3
+    assert metrics.tokens["input_tokens"] == 30 and metrics.tokens["output_tokens"] == 15
+
+
+def test_an_auth_error_aborts_instead_of_retrying(stub):
+    stub["status"] = 401
+    with pytest.raises(anthropic.AuthenticationError):
+        pipeline._claude_translate_batch(_phrases(3))
+    assert len(stub["requests"]) == 1
+
+
+def test_every_chunk_failing_raises(stub, monkeypatch):
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_CHUNK_SIZE", 2)
+    phrases = _phrases(2)
+    stub["broken"] = set(phrases)
+    with pytest.raises(RuntimeError, match="every chunk"):
+        pipeline._claude_translate_batch(phrases)
+
+
+def test_a_rate_limited_chunk_is_sent_again_whole_after_retry_after(stub, monkeypatch):
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_CHUNK_SIZE", 4)
+    phrases = _phrases(4)
+    stub.update(status=429, failures=2, retry_after="0")
+    results = pipeline._claude_translate_batch(phrases)
+
+    assert set(results) == set(phrases)
+    assert [len(r) for r in stub["requests"]] == [4, 4, 4]  # no split
+
+
+def test_an_overloaded_chunk_gives_up_after_its_retries_without_splitting(stub, monkeypatch):
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_CHUNK_SIZE", 2)
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_RETRIES", 2)
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_RETRY_BASE_S", 0.01)
+    stub.update(status=529)
+    with pytest.raises(RuntimeError, match="every chunk"):
+        pipeline._claude_translate_batch(_phrases(2))
+    assert [len(r) for r in stub["requests"]] == [2, 2, 2]
+
+
+def test_a_chunk_that_times_out_is_split_not_sent_again(stub, monkeypatch):
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_CHUNK_SIZE", 4)
+    monkeypatch.setattr(pipeline, "CLAUDE_BATCH_TIMEOUT_S", 0.5)
+    phrases = _phrases(4)
+    stub["slow_from"] = 3
+    results = pipeline._claude_translate_batch(phrases)
+
+    assert set(results) == set(phrases)
+    assert sorted(len(r) for r in stub["requests"]) == [2, 2, 4]  # one try at 4, then halves
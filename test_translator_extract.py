@@ -0,0 +1,147 @@
+"""Tests for the translator's Phase 1 extraction stage (pipeline.extract_pages)."""
+import os
+import subprocess
+import sys
+
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+from translator_on_drawings import pipeline
+
+SAMPLE = os.path.join(pipeline.BASE_DIR, "translator_on_drawings", "01_AR-FOR TENDER R0_Part1.pdf")
+
+
+@pytest.fixture
+def drawing_set(tmp_path):
+    # The sample's lightest sheet, three times: cheap, but still several pages.
+    page = PdfReader(SAMPLE).pages[0]
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_page(page)
+    path = tmp_path / "set.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def _summary(spans_by_page):
+    return [[(s.text, s.page_index, s.matrix_sig, s.x0, s.y0, s.x1, s.y1, s.fontname, s.size)
+             for s in spans] for spans in spans_by_page]
+
+
+def test_worker_count_is_capped_by_pages(monkeypatch):
+    monkeypatch.setattr(pipeline, "EXTRACT_WORKERS", 8)
+    assert pipeline._extract_workers(3) == 3
+    monkeypatch.setattr(pipeline, "EXTRACT_WORKERS", 0)
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    assert pipeline._extract_workers(40) == 4
+    assert pipeline._extract_workers(0) == 1
+
+
+def test_pool_matches_serial(drawing_set, monkeypatch):
+    monkeypatch.setattr(pipeline, "EXTRACT_WORKERS", 1)
+    progress = []
+    sizes, serial = pipeline.extract_pages(drawing_set, lambda pct, msg: progress.append(pct))
+    assert len(serial) == 3 and all(serial) and progress[-1] == 20
+
+    monkeypatch.setattr(pipeline, "EXTRACT_WORKERS", 2)
+    pool_sizes, pooled = pipeline.extract_pages(drawing_set)
+    assert pool_sizes == sizes
+    assert _summary(pooled) == _summary(serial)
+    assert [s.page_index for s in pooled[2]] == [2] * len(pooled[2])
+
+
+def test_falls_back_to_serial_when_the_pool_fails(drawing_set, monkeypatch):
+    def broken(*args):
+        raise OSError("worker died")
+
+    monkeypatch.setattr(pipeline, "EXTRACT_WORKERS", 2)
+    monkeypatch.setattr(pipeline, "_extract_with_pool", broken)
+    _, spans_by_page = pipeline.extract_pages(drawing_set)
+    assert len(spans_by_page) == 3 and all(spans_by_page)
+
+
+def test_spans_are_compact():
+    span = pipeline.TextSpan("ก", 0, (1.0, 0.0, 0.0, 1.0), 0, 0, 1, 1, "f", 8.0)
+    assert not hasattr(span, "__dict__") and not hasattr(span, "chars")
+
+
+def test_streaming_windows_match_the_single_window_run(drawing_set, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "DB_PATH", str(tmp_path / "translator.db"))
+    monkeypatch.setattr(pipeline, "JOBS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline, "EXTRACT_WORKERS", 1)
+    monkeypatch.setattr(pipeline, "STREAM_WINDOW_PAGES", 2)
+    monkeypatch.setattr(pipeline, "_resolve_all", lambda phrases, metrics=None: {
+        p: pipeline.TranslationResult(p, "Label", "phrase", "claude") for p in phrases})
+    pipeline._reset_db_initialization()
+
+    single = pipeline.translate_pdf(drawing_set, str(tmp_path / "single.pdf"), stream=False)
+    progress = []
+    streamed = pipeline.translate_pdf(drawing_set, str(tmp_path / "streamed.pdf"),
+                                      progress_cb=lambda pct, msg: progress.append(pct), stream=True)
+    pipeline._reset_db_initialization()
+
+    assert streamed["mappings"] == single["mappings"] and streamed["text_count"] == single["text_count"]
+    assert streamed["peak_rss_mb"] > 0 and progress == sorted(progress) and progress[-1] == 100
+    metrics = streamed["metrics"]
+    phases = [metrics[f"{phase}_ms"] for phase in ("extract", "resolve", "render", "merge")]
+    assert metrics["extract_ms"] > 0 and sum(phases) <= metrics["total_ms"]
+    assert metrics["page_count"] == 3 and metrics["claude_chunks"] == 0
+    out = [PdfReader(str(tmp_path / name)) for name in ("single.pdf", "streamed.pdf")]
+    assert len(out[0].pages) == len(out[1].pages) == 3
+    assert [p.extract_text() for p in out[0].pages] == [p.extract_text() for p in out[1].pages]
+    assert not [d for d in os.listdir(tmp_path) if d.startswith("translator_parts_")]
+
+
+def _heavy_parts(tmp_path, count, pages=4):
+    """Part PDFs whose pages each carry 1 MB of incompressible image data."""
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+    paths = []
+    for n in range(count):
+        writer = PdfWriter()
+        for _ in range(pages):
+            page = writer.add_blank_page(200, 200)
+            image = DecodedStreamObject()
+            image.set_data(os.urandom(1024 * 1024))
+            image.update({NameObject("/Type"): NameObject("/XObject"),
+                          NameObject("/Subtype"): NameObject("/Image"),
+                          NameObject("/Width"): NumberObject(1024), NameObject("/Height"): NumberObject(1024),
+                          NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                          NameObject("/BitsPerComponent"): NumberObject(8)})
+            page[NameObject("/Resources")] = DictionaryObject({NameObject("/XObject"): DictionaryObject(
+                {NameObject("/Im0"): writer._add_object(image)})})
+        paths.append(str(tmp_path / f"{n:06d}.pdf"))
+        with open(paths[-1], "wb") as f:
+            writer.write(f)
+    return paths
+
+
+_STITCH_PEAK = """
+import sys
+from translator_on_drawings import pipeline
+
+def status(key):
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(key))
+
+before = status("VmRSS:")
+pipeline._stitch_parts(sys.argv[2:], sys.argv[1])
+print(status("VmHWM:") - before)
+"""
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs /proc")
+def test_the_stitch_holds_one_part_at_a_time(tmp_path):
+    parts = _heavy_parts(tmp_path, 2)
+
+    def peak_kb(copies):
+        out = subprocess.run([sys.executable, "-c", _STITCH_PEAK, str(tmp_path / "out.pdf"), *parts * copies],
+                             cwd=pipeline.BASE_DIR, capture_output=True, text=True, check=True)
+        return int(out.stdout.split()[-1])
+
+    small, large = peak_kb(1), peak_kb(8)  # 8 MB vs 64 MB of output
+    reader = PdfReader(str(tmp_path / "out.pdf"))
+    assert len(reader.pages) == 64
+    assert len(reader.pages[-1]["/Resources"]["/XObject"]["/Im0"].get_data()) == 1024 * 1024
+    assert large - small < 16 * 1024, (small, large)
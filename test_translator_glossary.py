@@ -0,0 +1,84 @@
+"""Tests for the translator's in-memory glossary and deferred use_count writes.
+
+Each test runs against its own translator.db in tmp_path.
+"""
+import json
+import sqlite3
+
+import pytest
+
+from translator_on_drawings import pipeline
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "DB_PATH", str(tmp_path / "translator.db"))
+    monkeypatch.setattr(pipeline, "JOBS_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline, "_GLOSSARY", pipeline._GlossaryCache())
+    pipeline._reset_db_initialization()
+    pipeline.init_db()
+    yield pipeline.DB_PATH
+    pipeline._reset_db_initialization()
+
+
+def _use_count(path, text):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT use_count FROM translation_dictionary WHERE source_text=?",
+                            (text,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _no_db(*args, **kwargs):
+    raise AssertionError("glossary lookup touched the database")
+
+
+def test_repeat_lookups_stay_in_memory_and_flush_hits_in_one_write(db, monkeypatch):
+    pipeline._bulk_cache_lookup(["เสา"])  # first call loads the glossary
+    with monkeypatch.context() as m:
+        m.setattr(pipeline, "_connect", _no_db)
+        for _ in range(3):
+            cached, missing = pipeline._bulk_cache_lookup(["เสา", "คาน", "ไม่มีคำนี้"])
+            assert cached["เสา"].target == "Column" and cached["เสา"].via == "cache"
+            assert missing == ["ไม่มีคำนี้"]
+        assert pipeline._lookup_or_translate("คาน").target == "Beam"
+    assert _use_count(db, "เสา") == 0
+
+    pipeline._GLOSSARY.flush()
+    assert _use_count(db, "เสา") == 4 and _use_count(db, "คาน") == 4
+    pipeline._GLOSSARY.flush()  # nothing pending: no double counting
+    assert _use_count(db, "เสา") == 4
+
+
+def test_hits_flush_on_their_own_once_the_interval_passes(db, monkeypatch):
+    monkeypatch.setattr(pipeline, "GLOSSARY_FLUSH_INTERVAL_S", 0.0)
+    pipeline._bulk_cache_lookup(["เสา"])
+    assert _use_count(db, "เสา") == 1
+
+
+def test_new_translations_and_imports_update_the_cache(db, monkeypatch):
+    pipeline._bulk_cache_lookup(["เสา"])
+    pipeline._save_batch_translations({"ใหม่": ("New", "phrase"), "เสา": ("Post", "phrase")}, via="claude")
+    pipeline.import_glossary_from_bytes(
+        json.dumps([{"source_text": "คาน", "target_text": "Girder", "kind": "phrase"}]).encode(), "g.json")
+
+    monkeypatch.setattr(pipeline, "_connect", _no_db)
+    cached, _ = pipeline._bulk_cache_lookup(["ใหม่", "เสา", "คาน"])
+    assert {k: v.target for k, v in cached.items()} == {"ใหม่": "New", "เสา": "Column", "คาน": "Girder"}
+
+
+def test_replacing_the_database_reloads_the_glossary(db, tmp_path):
+    pipeline._bulk_cache_lookup(["เสา"])
+    other = tmp_path / "other.db"
+    conn = sqlite3.connect(other)
+    conn.executescript(pipeline.SCHEMA_SQL)
+    conn.execute("INSERT INTO translation_dictionary (source_text, target_text) VALUES ('เสา', 'Pillar')")
+    conn.commit()
+    conn.close()
+
+    pipeline.replace_database_from_bytes(other.read_bytes(), "other.db")
+    cached, _ = pipeline._bulk_cache_lookup(["เสา"])
+    assert cached["เสา"].target == "Pillar"
+    # The hit counted before the swap went into the backup, not the new file.
+    assert _use_count(db, "เสา") == 0
@@ -0,0 +1,83 @@
+"""Tests for the translation_mappings table and the paginated mappings endpoint.
+
+Each test runs against its own translator.db in tmp_path.
+"""
+import json
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from translator_on_drawings import pipeline
+
+MAPPINGS = [
+    {"source": "เสา", "target": "Column", "kind": "phrase", "via": "cache", "page": 1},
+    {"source": "คาน", "target": "Beam", "kind": "phrase", "via": "claude", "page": 1},
+    {"source": "เสา", "target": "Column", "kind": "phrase", "via": "cache", "page": 2},
+    {"source": "สมชาย", "target": "Somchai", "kind": "name", "via": "transliterate", "page": 2},
+    {"source": "เสา", "target": "Column", "kind": "phrase", "via": "cache", "page": 3},
+]
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "DB_PATH", str(tmp_path / "translator.db"))
+    pipeline._reset_db_initialization()
+    yield tmp_path / "translator.db"
+    pipeline._reset_db_initialization()
+
+
+def _done_job(mappings=MAPPINGS):
+    job_id = pipeline.create_job("set.pdf", None)
+    pipeline._save_mappings(job_id, mappings)
+    pipeline._update_job(job_id, status="done", text_count=len(mappings))
+    return job_id
+
+
+def test_mappings_page_in_order_and_filter_by_page_kind_and_via(db):
+    job_id = _done_job()
+    _done_job([MAPPINGS[1]])  # another job's rows stay out
+
+    first = pipeline.get_job_mappings(job_id, limit=2)
+    rest = pipeline.get_job_mappings(job_id, offset=2, limit=10)
+    assert first["total"] == 5 and [m["source"] for m in first["items"]] == ["เสา", "คาน"]
+    assert [(m["page"], m["source"]) for m in rest["items"]] == [(2, "เสา"), (2, "สมชาย"), (3, "เสา")]
+
+    assert pipeline.get_job_mappings(job_id, page=2)["total"] == 2
+    assert pipeline.get_job_mappings(job_id, kind="name")["items"][0]["target"] == "Somchai"
+    assert pipeline.get_job_mappings(job_id, via="cache", page=3)["total"] == 1
+
+    grouped = pipeline.get_job_mappings(job_id, grouped=True)
+    assert grouped["total"] == 3
+    assert grouped["items"][0] == {"source": "เสา", "target": "Column", "kind": "phrase",
+                                   "via": "cache", "count": 3, "page": 1}
+
+
+def test_older_job_rows_move_their_mappings_json_into_the_table(db):
+    pipeline.init_db()
+    with sqlite3.connect(db) as conn:
+        conn.execute("INSERT INTO translation_jobs (id, status, mappings_json) VALUES ('old', 'done', ?)",
+                     (json.dumps(MAPPINGS, ensure_ascii=False),))
+    pipeline._reset_db_initialization()
+
+    assert pipeline.get_job_mappings("old")["total"] == 5
+    assert "mappings_json" not in pipeline.get_job("old")
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT mappings_json FROM translation_jobs WHERE id = 'old'").fetchone() == (None,)
+
+
+def test_the_status_response_is_a_summary_and_mappings_are_paged(db):
+    from api import main
+
+    job_id = _done_job()
+    client = TestClient(main.app)
+    status = client.get(f"/action/translator_on_drawings/status/{job_id}").json()
+    assert status["status"] == "done" and status["mappings_count"] == 5 and "mappings" not in status
+
+    resp = client.get(f"/action/translator_on_drawings/mappings/{job_id}",
+                      params={"page": 2, "kind": "name", "limit": 1})
+    assert resp.json()["items"] == [{"page": 2, "source": "สมชาย", "target": "Somchai",
+                                     "kind": "name", "via": "transliterate"}]
+    assert client.get(f"/action/translator_on_drawings/mappings/{job_id}",
+                      params={"limit": pipeline.MAPPINGS_MAX_LIMIT + 1}).status_code == 422
+    assert client.get("/action/translator_on_drawings/mappings/missing").status_code == 404
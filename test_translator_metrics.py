@@ -0,0 +1,58 @@
+"""Tests for translator job metrics and the aggregate metrics endpoint.
+
+Each test runs against its own translator.db in tmp_path.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from translator_on_drawings import pipeline
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "DB_PATH", str(tmp_path / "translator.db"))
+    pipeline._reset_db_initialization()
+    yield
+    pipeline._reset_db_initialization()
+
+
+def _row(pages, spans, hits, chunk_ms, tokens):
+    metrics = pipeline._JobMetrics()
+    metrics.phase_ms.update(extract=100 * pages, resolve=50, render=10 * pages, merge=20 * pages)
+    for ms in chunk_ms:
+        metrics.add_chunk({"ms": ms, "input_tokens": tokens, "output_tokens": tokens // 2,
+                           "cache_read_tokens": 1000, "cache_write_tokens": 0})
+    return metrics.as_row({"page_count": pages, "text_count": spans, "cache_hits": hits,
+                           "duration_ms": 200 * pages})
+
+
+def test_a_runs_metrics_row_has_rates_and_chunk_latencies():
+    row = _row(pages=10, spans=400, hits=300, chunk_ms=[900, 300, 600], tokens=2000)
+    assert row["pages_per_s"] == 5.0 and row["cache_hit_ratio"] == 0.75
+    assert row["input_tokens"] == 6000 and row["cache_read_tokens"] == 3000
+    assert (row["chunk_ms_median"], row["chunk_ms_max"]) == (600, 900)
+    assert row["claude_chunks"] == 3 and row["extract_ms"] == 1000
+
+
+def test_the_summary_weighs_jobs_by_size_and_lists_recent_ones(db):
+    for job_id, pages, spans, hits in (("a", 10, 400, 400), ("b", 30, 600, 0)):
+        pipeline.init_db()
+        pipeline._save_job_metrics(job_id, _row(pages, spans, hits, [500], 100))
+
+    summary = pipeline.get_metrics_summary(days=7, recent=1)
+    totals = summary["totals"]
+    assert totals["jobs"] == 2 and totals["pages"] == 40
+    assert totals["pages_per_s"] == 5.0 and totals["cache_hit_ratio"] == 0.4
+    assert totals["extract_ms_per_page"] == 100.0 and totals["input_tokens"] == 200
+    assert len(summary["daily"]) == 1 and summary["daily"][0]["jobs"] == 2
+    assert [job["job_id"] for job in summary["recent"]] == ["b"]
+    assert summary["recent"][0]["chunk_ms"] == [500]
+
+
+def test_the_metrics_endpoint(db):
+    from api import main
+
+    client = TestClient(main.app)
+    body = client.get("/action/translator_on_drawings/metrics/", params={"days": 3}).json()
+    assert body["days"] == 3 and body["totals"]["jobs"] == 0 and body["recent"] == []
+    assert client.get("/action/translator_on_drawings/metrics/", params={"days": 0}).status_code == 422
@@ -0,0 +1,68 @@
+"""Tests for the translator's overlay rendering (Phase 3) and stamping (Phase 4)."""
+import io
+
+from pypdf import PdfReader, PdfWriter
+from reportlab.pdfgen import canvas as rl_canvas
+
+from translator_on_drawings import pipeline
+
+SIZE = (420.0, 297.0)
+
+
+def _stepwise_fit(font, text, max_extent, max_size):
+    # The original search: measure every 0.5 pt step down from the start size.
+    size = min(max_size, 14.0)
+    while size > 3.0:
+        if pipeline.pdfmetrics.stringWidth(text, font, size) <= max_extent:
+            return size
+        size -= 0.5
+    return 3.0
+
+
+def test_the_closed_form_font_fit_matches_the_stepwise_search():
+    font = pipeline._get_overlay_font()
+    for text in ("Level", "Existing Ground Level", "Drawing No. A-101 (rev. 2)"):
+        for max_size in (2.0, 3.2, 7.3, 8.0, 20.0):
+            for extent in (0.5, 10.0, 33.3, 60.0, 120.0, 500.0):
+                assert pipeline._fit_font_size(font, text, extent, max_size) == \
+                    _stepwise_fit(font, text, extent, max_size), (text, max_size, extent)
+
+
+def _duplicated_sheets(tmp_path, n):
+    buf = io.BytesIO()
+    c = rl_canvas.Canvas(buf, pagesize=SIZE)
+    c.drawString(20, 250, "Sheet")
+    c.save()
+    sheet = PdfReader(buf).pages[0]
+    writer = PdfWriter()
+    for _ in range(n):
+        writer.add_page(sheet)  # the copies share one content stream
+    path = tmp_path / "sheets.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_each_sheet_gets_its_own_overlay_and_keeps_its_content(tmp_path):
+    source = PdfReader(_duplicated_sheets(tmp_path, 3))
+    overlays = PdfReader(io.BytesIO(pipeline._build_overlay_pdf([
+        (SIZE, [(pipeline.TextSpan("ก", i, (1.0, 0.0, 0.0, 1.0), 20, 100, 200, 112, "f", 10.0),
+                 pipeline.TranslationResult("ก", f"Label {i}", "phrase", "cache"))])
+        for i in range(3)
+    ])))
+    writer = PdfWriter()
+    for i in range(3):
+        page = writer.add_page(source.pages[i])
+        pipeline._stamp_overlay(writer, page, overlays.pages[i])
+    out = io.BytesIO()
+    writer.write(out)
+
+    pages = PdfReader(out).pages
+    for i, page in enumerate(pages):
+        text = page.extract_text()
+        assert "Sheet" in text and f"Label {i}" in text and text.count("Label") == 1
+        assert page["/Contents"][1].get_data() == source.pages[i].get_contents().get_data()
+    fonts = {frozenset(ref.idnum for ref in
+                       page["/Resources"]["/XObject"]["/TrOverlay"]["/Resources"]["/Font"].values())
+             for page in pages}
+    assert len(fonts) == 1  # every overlay refers to the same embedded font objects
@@ -0,0 +1,172 @@
+"""Tests for the translator job queue on translation_jobs.
+
+Each test runs against its own translator.db and jobs directory in tmp_path;
+translate_pdf is replaced by a stub that records how many jobs run at once.
+"""
+import os
+import threading
+import time
+
+import pytest
+
+from translator_on_drawings import pipeline
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    for name in ("jobs", "results"):
+        (tmp_path / name).mkdir()
+    monkeypatch.setattr(pipeline, "DB_PATH", str(tmp_path / "translator.db"))
+    monkeypatch.setattr(pipeline, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(pipeline, "RESULTS_DIR", str(tmp_path / "results"))
+    state = {"lock": threading.Lock(), "running": 0, "max_running": 0, "order": [],
+             "release": threading.Event()}
+
+    def fake_translate(input_path, output_path, progress_cb=None, on_mappings=None):
+        with state["lock"]:
+            state["running"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+            state["order"].append(input_path)
+        state["release"].wait(10)
+        time.sleep(0.02)
+        with open(output_path, "wb") as f:
+            f.write(b"%PDF")
+        on_mappings([{"source": "ก", "target": "a", "kind": "phrase", "via": "cache", "page": 1}])
+        with state["lock"]:
+            state["running"] -= 1
+        return {"page_count": 1, "text_count": 1, "api_calls": 0, "cache_hits": 1,
+                "duration_ms": 1, "peak_rss_mb": 1, "mappings": [], "untranslated": 0}
+
+    monkeypatch.setattr(pipeline, "translate_pdf", fake_translate)
+    pipeline._reset_db_initialization()
+    pipeline.init_db()
+    yield state
+    state["release"].set()
+    pipeline.stop_job_workers(wait=5)
+    pipeline._reset_db_initialization()
+
+
+def _submit(name):
+    job_id = pipeline.create_job(name, None)
+    pipeline.save_uploaded_pdf(job_id, b"%PDF-1.4 " + name.encode())
+    pipeline.enqueue_job(job_id)
+    return job_id
+
+
+def _wait_for(job_ids, status="done"):
+    deadline = time.time() + 10
+    while any(pipeline.get_job(j)["status"] != status for j in job_ids):
+        assert time.time() < deadline, [pipeline.get_job(j)["status"] for j in job_ids]
+        time.sleep(0.01)
+
+
+def test_workers_bound_how_many_jobs_run_and_take_them_oldest_first(queue, monkeypatch):
+    monkeypatch.setattr(pipeline, "JOB_WORKERS", 2)
+    job_ids = [_submit(f"set{i}.pdf") for i in range(5)]
+    _wait_for(job_ids[:2], "processing")
+    assert [pipeline.get_job(j)["queue_position"] for j in job_ids] == [None, None, 1, 2, 3]
+
+    queue["release"].set()
+    _wait_for(job_ids)
+    assert queue["max_running"] == 2
+    # Claims follow the queue; two workers may enter translate_pdf in either order.
+    paths = [pipeline._input_path(j) for j in job_ids]
+    assert set(queue["order"][:2]) == set(paths[:2]) and sorted(queue["order"]) == sorted(paths)
+
+
+def test_each_queued_job_is_claimed_exactly_once(queue, monkeypatch):
+    monkeypatch.setattr(pipeline, "start_job_workers", lambda: None)
+    job_ids = [_submit(f"set{i}.pdf") for i in range(20)]
+    claimed = []
+
+    def claim_all():
+        while (job_id := pipeline._claim_next_job()) is not None:
+            claimed.append(job_id)
+
+    threads = [threading.Thread(target=claim_all) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(claimed) == sorted(job_ids)
+
+
+def test_jobs_interrupted_by_a_restart_resume_ahead_of_new_uploads(queue, monkeypatch):
+    monkeypatch.setattr(pipeline, "start_job_workers", lambda: None)
+    interrupted, waiting = _submit("old.pdf"), _submit("new.pdf")
+    assert pipeline._claim_next_job() == interrupted  # then the server restarts
+
+    assert pipeline._requeue_interrupted_jobs() == 1
+    assert pipeline.get_job(interrupted)["queue_position"] == 1
+    assert pipeline.get_job(waiting)["queue_position"] == 2
+
+
+def test_a_job_is_not_claimed_before_its_pdf_is_saved(queue, monkeypatch):
+    monkeypatch.setattr(pipeline, "start_job_workers", lambda: None)
+    job_id = pipeline.create_job("set.pdf", None)
+    assert pipeline._claim_next_job() is None
+    assert pipeline.get_job(job_id)["status"] == "received"
+
+
+def test_the_stale_file_sweep_keeps_uploads_still_in_the_queue(queue, monkeypatch):
+    monkeypatch.setattr(pipeline, "start_job_workers", lambda: None)
+    job_id = _submit("set.pdf")
+    assert pipeline._cleanup_stale_job_files(max_age_seconds=-1) == 0
+    assert os.path.exists(pipeline._input_path(job_id))
+
+
+def test_progress_goes_to_the_stream_but_only_status_changes_to_the_db(queue, monkeypatch):
+    writes = []
+    real_update = pipeline._update_job
+    monkeypatch.setattr(pipeline, "_update_job",
+                        lambda job_id, **fields: writes.append(fields) or real_update(job_id, **fields))
+    fake_translate = pipeline.translate_pdf
+
+    def chatty_translate(input_path, output_path, progress_cb=None, on_mappings=None):
+        for pct in range(5, 95):
+            progress_cb(pct, f"Rendering page {pct}")
+        assert pipeline.progress_hub.latest(pipeline._job_topic(job_id))["progress_percent"] == 94
+        return fake_translate(input_path, output_path, progress_cb, on_mappings)
+
+    monkeypatch.setattr(pipeline, "translate_pdf", chatty_translate)
+    queue["release"].set()
+    job_id = _submit("set.pdf")
+    _wait_for([job_id])
+    assert [w.get("status") for w in writes] == ["done"]
+    assert pipeline.count_job_mappings(job_id) == 1  # written by the window, not at the end
+    assert pipeline.progress_hub.latest(pipeline._job_topic(job_id))["status"] == "done"
+
+
+def test_an_upload_that_cannot_be_saved_fails_its_job(queue, monkeypatch):
+    from fastapi.testclient import TestClient
+    from api import main
+
+    def disk_full(job_id, file_bytes):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(pipeline, "save_uploaded_pdf", disk_full)
+    resp = TestClient(main.app).post("/action/translator_on_drawings/upload/",
+                                     files={"pdf_file": ("set.pdf", b"%PDF-1.4 set")})
+    assert resp.status_code == 500 and "No space left" in resp.json()["error"]
+    job = pipeline.get_job(resp.json()["job_id"])
+    assert job["status"] == "error" and "No space left" in job["error_message"]
+
+
+def test_startup_fails_received_jobs_whose_upload_was_lost(queue, monkeypatch):
+    monkeypatch.setattr(pipeline, "start_job_workers", lambda: None)
+    lost, in_flight = pipeline.create_job("lost.pdf", None), pipeline.create_job("new.pdf", None)
+    with pipeline._connect() as conn:
+        conn.execute("UPDATE translation_jobs SET updated_at = datetime('now', '-1 hour') "
+                     "WHERE id = ?", (lost,))
+
+    assert pipeline._fail_abandoned_uploads() == 1
+    assert pipeline.get_job(lost)["status"] == "error"
+    assert pipeline.get_job(in_flight)["status"] == "received"
+
+
+def test_fail_job_leaves_a_job_a_worker_already_claimed(queue, monkeypatch):
+    monkeypatch.setattr(pipeline, "start_job_workers", lambda: None)
+    job_id = _submit("set.pdf")
+    assert pipeline._claim_next_job() == job_id
+    assert not pipeline.fail_job(job_id, RuntimeError("late"))
+    assert pipeline.get_job(job_id)["status"] == "processing"
@@ -0,0 +1,105 @@
+"""Tests for reusing a translated output when the same PDF is uploaded again.
+
+Each test runs against its own translator.db, jobs and results directories in
+tmp_path; translate_pdf is replaced by a stub that writes a 1 MB file.
+"""
+import os
+import time
+
+import pytest
+
+from translator_on_drawings import pipeline
+
+PDF = b"%PDF-1.4 drawing set"
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    for name in ("jobs", "results"):
+        (tmp_path / name).mkdir()
+    monkeypatch.setattr(pipeline, "DB_PATH", str(tmp_path / "translator.db"))
+    monkeypatch.setattr(pipeline, "JOBS_DIR", str(tmp_path / "jobs"))
+    monkeypatch.setattr(pipeline, "RESULTS_DIR", str(tmp_path / "results"))
+    monkeypatch.setattr(pipeline, "_GLOSSARY", pipeline._GlossaryCache())
+    calls, untranslated = [], []
+
+    def fake_translate(input_path, output_path, progress_cb=None, on_mappings=None):
+        calls.append(input_path)
+        with open(output_path, "wb") as f:
+            f.write(b"x" * 1024 * 1024)
+        via = "untranslated" if untranslated else "claude"
+        on_mappings([{"source": "เสา", "target": "Column", "kind": "phrase", "via": via, "page": 1}])
+        return {"page_count": 1, "text_count": 1, "api_calls": 1, "cache_hits": 0,
+                "duration_ms": 5, "peak_rss_mb": 50, "mappings": [],
+                "untranslated": 1 if untranslated else 0}
+
+    monkeypatch.setattr(pipeline, "translate_pdf", fake_translate)
+    pipeline._reset_db_initialization()
+    yield calls, untranslated
+    pipeline.stop_job_workers(wait=5)
+    pipeline._reset_db_initialization()
+
+
+def _upload(file_bytes=PDF):
+    """What the upload route does, waiting for the background job to finish."""
+    content_hash = pipeline.content_sha256(file_bytes)
+    job_id = pipeline.create_job("set.pdf", None, content_hash)
+    if not pipeline.complete_from_cache(job_id, content_hash):
+        pipeline.save_uploaded_pdf(job_id, file_bytes)
+        pipeline.enqueue_job(job_id)
+    deadline = time.time() + 10
+    while pipeline.get_job(job_id)["status"] not in ("done", "error"):
+        assert time.time() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return pipeline.get_job(job_id)
+
+
+def test_a_repeat_upload_reuses_the_earlier_output(jobs):
+    calls, _ = jobs
+    first = _upload()
+    second = _upload()
+    assert len(calls) == 1
+    assert second["reused_from"] == first["id"] and second["api_calls"] == 0
+    assert second["output_path"] == first["output_path"] and os.path.exists(first["output_path"])
+    assert (pipeline.get_job_mappings(second["id"])["items"]
+            == pipeline.get_job_mappings(first["id"])["items"]
+            == [{"page": 1, "source": "เสา", "target": "Column", "kind": "phrase", "via": "claude"}])
+
+    _upload(PDF + b" revised")
+    assert len(calls) == 2
+
+
+def test_a_glossary_import_invalidates_earlier_outputs(jobs):
+    calls, _ = jobs
+    _upload()
+    pipeline.import_glossary_from_bytes(b"source_text,target_text\n\xe0\xb9\x80\xe0\xb8\xaa\xe0\xb8\xb2,Pillar\n",
+                                        "glossary.csv")
+    _upload()
+    _upload()
+    assert len(calls) == 2
+
+
+def test_outputs_with_untranslated_phrases_are_not_reused(jobs):
+    calls, untranslated = jobs
+    untranslated.append(True)
+    _upload()
+    untranslated.clear()
+    _upload()
+    _upload()
+    assert len(calls) == 2
+
+
+def test_the_result_cache_evicts_the_least_recently_used_output(jobs):
+    calls, _ = jobs
+    a = _upload(b"a")
+    b = _upload(b"b")
+    old = time.time() - 60
+    os.utime(b["output_path"], (old, old))
+    os.utime(a["output_path"], (old - 60, old - 60))
+    assert pipeline.mark_result_used(a["output_path"])  # downloaded again: now the most recent
+
+    pipeline._trim_result_cache(max_mb=1)  # room for one 1 MB output
+    assert os.path.exists(a["output_path"]) and not os.path.exists(b["output_path"])
+    assert pipeline.get_job(b["id"])["output_path"] is None
+    _upload(b"b")
+    assert len(calls) == 3
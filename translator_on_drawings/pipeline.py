@@ -14,12 +14,19 @@ job table, and lazy-loads heavy dependencies (Argos, pythainlp).
 
 from __future__ import annotations
 
+import atexit
 import io
 import csv
+import functools
+import gc
+import hashlib
 import json
 import logging
+import math
 import os
+import random
 import re
+import shutil
 import socket
 import sqlite3
 import sys
@@ -28,16 +35,20 @@ import threading
 import time
 import unicodedata
 import uuid
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from typing import Optional
 
 import pdfplumber
 from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, IndirectObject, NameObject,
+                           NumberObject, StreamObject)
 from reportlab.lib.pagesizes import landscape
 from reportlab.pdfgen import canvas as rl_canvas
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
+from api.progress import progress_hub
+
 logger = logging.getLogger(__name__)
 
 
@@ -65,8 +76,13 @@ else:
 DB_PATH = os.path.join(DATA_DIR, "translator.db")
 JOBS_DIR = os.path.join(DATA_DIR, "translator_jobs")
 ARGOS_MODELS_DIR = os.path.join(DATA_DIR, "argos_models")
+# Translated outputs, kept for re-downloads and repeat uploads of the same PDF.
+# Not under JOBS_DIR: _cleanup_stale_job_files() sweeps that by age, while this
+# directory is trimmed by size, least recently used first.
+RESULTS_DIR = os.path.join(DATA_DIR, "translator_results")
 os.makedirs(DATA_DIR, exist_ok=True)
 os.makedirs(JOBS_DIR, exist_ok=True)
+os.makedirs(RESULTS_DIR, exist_ok=True)
 os.makedirs(ARGOS_MODELS_DIR, exist_ok=True)
 
 OVERLAY_FONT_FALLBACK = "Helvetica"
@@ -115,7 +131,7 @@ CREATE TABLE IF NOT EXISTS translation_jobs (
     id                TEXT PRIMARY KEY,
     user_id           INTEGER,
     filename          TEXT,
-    status            TEXT NOT NULL DEFAULT 'queued',  -- queued | processing | done | error
+    status            TEXT NOT NULL DEFAULT 'queued',  -- received | queued | processing | done | error
     page_count        INTEGER,
     text_count        INTEGER DEFAULT 0,
     api_calls         INTEGER DEFAULT 0,
@@ -125,10 +141,64 @@ CREATE TABLE IF NOT EXISTS translation_jobs (
     error_message     TEXT,
     duration_ms       INTEGER,
     output_path       TEXT,
-    mappings_json     TEXT,
+    mappings_json     TEXT,      -- legacy: moved into translation_mappings by init_db()
+    peak_rss_mb       INTEGER,
+    content_sha256    TEXT,
+    glossary_version  INTEGER,   -- set on done jobs whose output may be reused
+    reused_from       TEXT,      -- job id whose output this job reused
     created_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at        TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status
+    ON translation_jobs (status);
+
+-- One row per translated span, in page order (rowid follows insertion order).
+CREATE TABLE IF NOT EXISTS translation_mappings (
+    id      INTEGER PRIMARY KEY,
+    job_id  TEXT NOT NULL,
+    page    INTEGER NOT NULL,
+    source  TEXT NOT NULL,
+    target  TEXT NOT NULL,
+    kind    TEXT NOT NULL,
+    via     TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_mappings_job_page
+    ON translation_mappings (job_id, page);
+
+-- One row per translated job (not reused ones): where its time and tokens went.
+CREATE TABLE IF NOT EXISTS translation_job_metrics (
+    job_id                TEXT PRIMARY KEY,
+    page_count            INTEGER,
+    span_count            INTEGER,
+    cache_hits            INTEGER,
+    extract_ms            INTEGER,
+    resolve_ms            INTEGER,
+    render_ms             INTEGER,
+    merge_ms              INTEGER,   -- merging overlays and writing the output
+    total_ms              INTEGER,
+    pages_per_s           REAL,
+    cache_hit_ratio       REAL,      -- cache_hits / span_count
+    input_tokens          INTEGER,
+    output_tokens         INTEGER,
+    cache_read_tokens     INTEGER,
+    cache_write_tokens    INTEGER,
+    claude_chunks         INTEGER,
+    claude_failed_chunks  INTEGER,
+    chunk_ms_median       INTEGER,
+    chunk_ms_max          INTEGER,
+    chunk_ms_json         TEXT,      -- each Claude call's latency, in completion order
+    created_at            TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_metrics_created
+    ON translation_job_metrics (created_at);
+
+CREATE TABLE IF NOT EXISTS translator_meta (
+    key    TEXT PRIMARY KEY,
+    value  INTEGER NOT NULL
+);
 """
 
 # A small seed of common Thai construction terms. Users can refine via the glossary
@@ -179,6 +249,19 @@ SEED_DICTIONARY = [
 _INIT_LOCK = threading.Lock()
 _INITIALIZED = False
 REQUIRED_DB_TABLES = {"translation_dictionary", "translation_jobs"}
+# Columns added to translation_jobs after it first shipped. CREATE TABLE IF NOT
+# EXISTS leaves an existing table alone, so init_db() adds any that are missing.
+JOB_COLUMNS_ADDED = {
+    "peak_rss_mb": "INTEGER",
+    "content_sha256": "TEXT",
+    "glossary_version": "INTEGER",
+    "reused_from": "TEXT",
+}
+# Indexes on added columns: created after the ALTERs above, not in SCHEMA_SQL.
+JOB_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_jobs_content
+    ON translation_jobs (content_sha256, glossary_version);
+"""
 GLOSSARY_COLUMNS = [
     "source_lang",
     "target_lang",
@@ -214,6 +297,12 @@ def init_db() -> None:
             return
         with _connect() as conn:
             conn.executescript(SCHEMA_SQL)
+            have = {row["name"] for row in conn.execute("PRAGMA table_info(translation_jobs)")}
+            for name, decl in JOB_COLUMNS_ADDED.items():
+                if name not in have:
+                    conn.execute(f"ALTER TABLE translation_jobs ADD COLUMN {name} {decl}")
+            conn.executescript(JOB_INDEXES_SQL)
+            _migrate_mappings_json(conn)
             n = conn.execute("SELECT COUNT(*) FROM translation_dictionary").fetchone()[0]
             if n == 0:
                 conn.executemany(
@@ -226,12 +315,53 @@ def init_db() -> None:
         _INITIALIZED = True
 
 
+def _migrate_mappings_json(conn: sqlite3.Connection) -> None:
+    """Move mappings stored as a JSON blob on older job rows into translation_mappings."""
+    rows = conn.execute(
+        "SELECT id, mappings_json FROM translation_jobs WHERE mappings_json IS NOT NULL"
+    ).fetchall()
+    if not rows:
+        return
+    conn.execute("BEGIN")
+    try:
+        for row in rows:
+            try:
+                mappings = json.loads(row["mappings_json"])
+            except ValueError:
+                mappings = []
+            _insert_mappings(conn, row["id"], mappings)
+        conn.execute("UPDATE translation_jobs SET mappings_json = NULL WHERE mappings_json IS NOT NULL")
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    _log(f"init_db: moved the mappings of {len(rows)} job(s) into translation_mappings")
+
+
 def _reset_db_initialization() -> None:
     global _INITIALIZED
     with _INIT_LOCK:
         _INITIALIZED = False
 
 
+def _glossary_version(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM translator_meta WHERE key = 'glossary_version'").fetchone()
+    return row["value"] if row else 0
+
+
+def _bump_glossary_version(conn: sqlite3.Connection) -> None:
+    """Record that existing glossary rows may have changed.
+
+    Only edits that can change a phrase already translated count: imports and
+    database replacement. New rows from INSERT OR IGNORE never alter an earlier
+    result, so they leave the version alone and cached outputs stay valid.
+    """
+    conn.execute(
+        "INSERT INTO translator_meta (key, value) VALUES ('glossary_version', 1) "
+        "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+    )
+
+
 def _timestamp() -> str:
     return datetime_now_safe().strftime("%Y%m%d_%H%M%S")
 
@@ -266,6 +396,7 @@ def _validate_sqlite_db(path: str) -> tuple[bool, str]:
 def create_database_backup_file() -> tuple[str, str]:
     """Create a consistent translator.db backup file and return (path, filename)."""
     init_db()
+    _GLOSSARY.flush()  # so the backup carries the current use_count values
     filename = f"translator_backup_{_timestamp()}.db"
     backup_path = os.path.join(JOBS_DIR, filename)
     if os.path.exists(backup_path):
@@ -313,8 +444,11 @@ def replace_database_from_bytes(file_bytes: bytes, original_filename: str | None
 
         os.replace(temp_path, DB_PATH)
         temp_path = None
+        _GLOSSARY.reset()
         _reset_db_initialization()
         init_db()
+        with _connect() as conn:
+            _bump_glossary_version(conn)
         return {
             "backup_path": backup_path,
             "backup_filename": backup_filename,
@@ -408,15 +542,24 @@ def import_glossary_from_bytes(file_bytes: bytes, original_filename: str | None)
             "notes=excluded.notes, updated_at=CURRENT_TIMESTAMP",
             clean_rows,
         )
+        _bump_glossary_version(conn)
+    _GLOSSARY.upsert({
+        row[2]: (row[3], row[4]) for row in clean_rows if row[0] == "th" and row[1] == "en"
+    })
     return {"imported": len(clean_rows)}
 
 
 # --------------------------------------------------------------------------------------
 # Text-extraction core
 # --------------------------------------------------------------------------------------
-@dataclass
+@dataclass(slots=True)
 class TextSpan:
-    """A run of Thai-containing characters that share a rotation matrix and a baseline."""
+    """A run of Thai-containing characters that share a rotation matrix and a baseline.
+
+    Only the merged text and geometry are kept (slots, no per-instance dict):
+    the pdfplumber char dicts it was built from are dropped, since a dense A1
+    sheet has tens of thousands of them and nothing downstream reads them.
+    """
     text: str
     page_index: int
     matrix_sig: tuple
@@ -426,8 +569,6 @@ class TextSpan:
     y1: float
     fontname: str
     size: float
-    # Original characters (kept for debugging / advanced redraw)
-    chars: list = field(default_factory=list, repr=False)
 
 
 def _matrix_sig(matrix) -> tuple:
@@ -514,10 +655,150 @@ def _span_from_chars(chars: list, sig: tuple, page_index: int) -> TextSpan:
     size = max((c.get("size") or 0) for c in chars) or 8.0
     return TextSpan(
         text=text, page_index=page_index, matrix_sig=sig,
-        x0=x0, y0=y0, x1=x1, y1=y1, fontname=fontname, size=size, chars=chars,
+        x0=x0, y0=y0, x1=x1, y1=y1, fontname=fontname, size=size,
+    )
+
+
+# --------------------------------------------------------------------------------------
+# Page extraction stage (Phase 1), optionally spread over worker processes
+# --------------------------------------------------------------------------------------
+# pdfplumber's char parsing is pure Python and dominates a drawing set's run
+# time (0.3 s – 18 s per sheet on the sample tender sets), so pages are handed
+# to a process pool. Each worker opens the PDF once and is fed single page
+# indexes, which balances sheets of very different density; only the compact
+# TextSpans cross the process boundary. TRANSLATOR_EXTRACT_WORKERS: 0
+# (default) = one per CPU, 1 = extract in-process.
+EXTRACT_WORKERS = int(os.getenv("TRANSLATOR_EXTRACT_WORKERS", "0") or 0)
+
+_WORKER_PDF = None
+
+
+def _extract_workers(page_count: int) -> int:
+    workers = EXTRACT_WORKERS if EXTRACT_WORKERS > 0 else (os.cpu_count() or 1)
+    return max(1, min(workers, page_count))
+
+
+def _extract_page(pdf, page_index: int) -> tuple[int, tuple[float, float], list[TextSpan]]:
+    page = pdf.pages[page_index]
+    spans = _extract_thai_spans(page)
+    size = (page.width, page.height)
+    page.close()  # drop pdfplumber's parsed-object cache for this page
+    return page_index, size, spans
+
+
+def _open_worker_pdf(input_path: str) -> None:
+    global _WORKER_PDF
+    _WORKER_PDF = pdfplumber.open(input_path)
+
+
+def _extract_worker_page(page_index: int):
+    return _extract_page(_WORKER_PDF, page_index)
+
+
+def _start_extract_pool(input_path: str, workers: int, max_pages_per_worker: Optional[int] = None):
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+
+    # forkserver: the caller is a background thread of the web server, and
+    # forking a threaded process can copy held locks into the child.
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(method),
+        initializer=_open_worker_pdf,
+        initargs=(input_path,),
+        # pdfminer keeps every object it has parsed until the document is
+        # closed; replacing the worker is how that cache gets dropped.
+        max_tasks_per_child=max_pages_per_worker,
     )
 
 
+def _extract_with_pool(pool, page_indexes, on_page) -> dict:
+    from concurrent.futures import as_completed
+
+    results = {}
+    futures = [pool.submit(_extract_worker_page, i) for i in page_indexes]
+    for future in as_completed(futures):
+        page_index, size, spans = future.result()
+        results[page_index] = (size, spans)
+        on_page(len(results))
+    return results
+
+
+class _PageExtractor:
+    """Extracts any subset of a PDF's pages, keeping one pool for the whole
+    run, so streaming mode can feed it one window at a time.
+
+    pdfminer caches every object it parses until its document is closed, and
+    one heavy drawing sheet can take a few hundred MB to parse. With
+    max_pages_per_worker set (streaming mode) extraction always runs in worker
+    processes, even just one, and each is replaced after that many pages, so
+    those peaks never land in the web server process. In-process extraction
+    opens the PDF once per extract() call.
+
+    Falls back to in-process extraction for a single page, a worker count of
+    1 outside streaming mode, or when the pool cannot be started or a worker
+    dies.
+    """
+
+    def __init__(self, input_path: str, page_count: int, max_pages_per_worker: Optional[int] = None):
+        self.input_path = input_path
+        self.workers = _extract_workers(page_count)
+        self._pool = None
+        if self.workers > 1 or (max_pages_per_worker and page_count > 1):
+            try:
+                self._pool = _start_extract_pool(input_path, self.workers, max_pages_per_worker)
+            except Exception as e:
+                self._fallback(e)
+
+    def _fallback(self, e: Exception) -> None:
+        _log(f"extract_pages: process pool failed ({type(e).__name__}: {e}); extracting serially")
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+        self.workers = 1
+
+    def extract(self, page_indexes, on_page=lambda done: None) -> dict:
+        """{page_index: (page size, spans)} for the given pages."""
+        if self._pool is not None:
+            try:
+                return _extract_with_pool(self._pool, page_indexes, on_page)
+            except Exception as e:
+                self._fallback(e)
+        results = {}
+        with pdfplumber.open(self.input_path) as pdf:
+            for i in page_indexes:
+                _, size, spans = _extract_page(pdf, i)
+                results[i] = (size, spans)
+                on_page(len(results))
+        return results
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def extract_pages(input_path: str, progress_cb=None) -> tuple[list[tuple[float, float]], list[list[TextSpan]]]:
+    """Phase 1 for a whole document: (page sizes, Thai spans per page), in page order."""
+    page_count = len(PdfReader(input_path).pages)
+
+    def on_page(done: int) -> None:
+        if progress_cb:
+            progress_cb(5 + int(15 * done / max(1, page_count)),
+                        f"Extracting Thai phrases… page {done}/{page_count}")
+
+    with _PageExtractor(input_path, page_count) as extractor:
+        results = extractor.extract(range(page_count), on_page)
+        _log(f"extract_pages: {page_count} pages with {extractor.workers} worker(s)")
+    return [results[i][0] for i in range(page_count)], [results[i][1] for i in range(page_count)]
+
+
 # --------------------------------------------------------------------------------------
 # Translation backends (lazy-loaded)
 # --------------------------------------------------------------------------------------
@@ -871,10 +1152,15 @@ def _claude_translate(text: str) -> tuple[str, str]:
 # Massively faster than per-phrase on Render (latency ~30 s for 200 phrases vs
 # ~17 minutes), and ~3× cheaper because the system prompt is cache-written once.
 # --------------------------------------------------------------------------------------
-CLAUDE_BATCH_CHUNK_SIZE = 100   # phrases per Claude call (limits per-chunk timeout)
-CLAUDE_BATCH_MAX_TOKENS = 16000  # per chunk; fits ~150 phrases of typical length
+CLAUDE_BATCH_CHUNK_SIZE = 100   # max phrases per Claude call (limits per-chunk timeout)
+CLAUDE_BATCH_TOKEN_BUDGET = 3000  # estimated tokens per chunk (_estimate_tokens)
+CLAUDE_BATCH_MAX_TOKENS = 16000  # per chunk; far above the budget, so output is not cut off
+CLAUDE_BATCH_CONCURRENCY = int(os.getenv("TRANSLATOR_BATCH_CONCURRENCY", "4") or 4)  # chunks in flight
 CLAUDE_BATCH_TIMEOUT_S = 120.0   # total per-chunk timeout — fail fast on hangs
 CLAUDE_BATCH_CONNECT_S = 10.0    # TCP connect timeout
+CLAUDE_BATCH_RETRIES = 4         # extra attempts for a chunk hit by 429 / 5xx / connection errors
+CLAUDE_BATCH_RETRY_BASE_S = 2.0  # backoff without retry-after: base, 2×base, 4×base, ... (+ jitter)
+CLAUDE_BATCH_RETRY_MAX_S = 60.0  # cap on any one wait, retry-after included
 
 CLAUDE_BATCH_SYSTEM_PROMPT = CLAUDE_SYSTEM_PROMPT.replace(
     """# Output format
@@ -933,141 +1219,364 @@ def _extract_json_array(raw: str) -> list:
     raise json.JSONDecodeError("No JSON array found", raw, 0)
 
 
-def _claude_translate_batch(phrases: list[str]) -> dict[str, tuple[str, str]]:
-    """Translate many Thai phrases in one (or a few) Claude API call(s).
+class _ChunkError(RuntimeError):
+    """A batch chunk came back unusable (malformed or truncated JSON)."""
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token cost of one batch item, in and out.
+
+    Thai runs about one token per character, the English target is usually
+    shorter than the Thai, and the JSON wrapper ({"id": .., "kind": ..,
+    "target": ..}) is ~16 tokens. Errs high, which only makes chunks smaller.
+    """
+    return 16 + len(text)
+
+
+def _plan_chunks(phrases: list[str]) -> list[list[str]]:
+    """Greedy split into chunks of at most CLAUDE_BATCH_TOKEN_BUDGET estimated
+    tokens and CLAUDE_BATCH_CHUNK_SIZE phrases, keeping input order."""
+    chunks: list[list[str]] = []
+    current: list[str] = []
+    budget = 0
+    for phrase in phrases:
+        cost = _estimate_tokens(phrase)
+        if current and (budget + cost > CLAUDE_BATCH_TOKEN_BUDGET
+                        or len(current) >= CLAUDE_BATCH_CHUNK_SIZE):
+            chunks.append(current)
+            current, budget = [], 0
+        current.append(phrase)
+        budget += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _claude_batch_chunk(client, timeout, chunk: list[str], label: str) -> tuple[dict[str, tuple[str, str]], dict]:
+    """One streaming Claude call for one chunk: its translations and usage
+    (latency and token counts). Raises _ChunkError if the response cannot be
+    parsed; API errors propagate as raised by the SDK."""
+    items = [{"id": i, "text": text} for i, text in enumerate(chunk)]
+    items_json = json.dumps(items, ensure_ascii=False)
+    _log(
+        f"_claude_translate_batch: chunk {label} — "
+        f"{len(chunk)} phrases, {len(items_json)} input chars"
+    )
+    t0 = time.time()
+
+    # Streaming is required for large max_tokens (SDK refuses non-streaming
+    # requests it estimates will exceed ~10 minutes). The SDK's own retries
+    # are off: _claude_batch_chunk_retrying owns the retry policy.
+    with client.with_options(timeout=timeout, max_retries=0).messages.stream(
+        model=CLAUDE_MODEL,
+        max_tokens=CLAUDE_BATCH_MAX_TOKENS,
+        system=[{
+            "type": "text",
+            "text": CLAUDE_BATCH_SYSTEM_PROMPT,
+            "cache_control": {"type": "ephemeral"},
+        }],
+        messages=[{
+            "role": "user",
+            "content": (
+                "Translate the following Thai construction-drawing phrases. "
+                "Respond with the JSON array specified in the system prompt.\n\n"
+                f"{items_json}"
+            ),
+        }],
+    ) as stream:
+        final = stream.get_final_message()
+
+    dt_ms = int((time.time() - t0) * 1000)
+    raw = next((b.text for b in final.content if b.type == "text"), "").strip()
+
+    if final.stop_reason == "max_tokens":
+        raise _ChunkError(f"Claude batch output was truncated at max_tokens for chunk {label}")
+    try:
+        parsed = _extract_json_array(raw)
+    except json.JSONDecodeError as e:
+        raise _ChunkError(
+            f"Claude batch returned malformed JSON for chunk {label}: "
+            f"{e.msg}. First 200 chars: {raw[:200]!r}"
+        )
+
+    results: dict[str, tuple[str, str]] = {}
+    for item in parsed:
+        if not isinstance(item, dict):
+            continue
+        i = item.get("id")
+        if not isinstance(i, int) or not (0 <= i < len(chunk)):
+            continue
+        target = _sanitize_translation_text(
+            str(item.get("target") or item.get("english") or "")
+        )
+        kind = str(item.get("kind", "phrase")).strip().lower()
+        if kind not in ("phrase", "name", "abbrev"):
+            kind = "phrase"
+        if target:
+            results[chunk[i]] = (target, kind)
+
+    usage = final.usage
+    cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
+    _log(
+        f"_claude_translate_batch: chunk {label} done "
+        f"({dt_ms} ms, {len(results)}/{len(chunk)} translated, "
+        f"in:{usage.input_tokens}/out:{usage.output_tokens}/"
+        f"cache_read:{cache_read}/cache_write:{cache_write})"
+    )
+    return results, {
+        "ms": dt_ms,
+        "input_tokens": usage.input_tokens or 0,
+        "output_tokens": usage.output_tokens or 0,
+        "cache_read_tokens": cache_read,
+        "cache_write_tokens": cache_write,
+    }
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Rate limits, overload (529), other 5xx and failed connections: the
+    same request is likely to succeed later, so the chunk is sent again as is.
+    A timeout is not one of them (see _claude_batch_chunk_retrying)."""
+    import anthropic
+
+    if isinstance(error, anthropic.APITimeoutError):
+        return False
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    return isinstance(error, anthropic.APIStatusError) and (
+        error.status_code == 429 or error.status_code >= 500)
+
+
+def _retry_delay(error: BaseException, attempt: int) -> float:
+    """Seconds to wait before retry number attempt (0-based): the server's
+    retry-after when it sent one, else exponential backoff with jitter."""
+    response = getattr(error, "response", None)
+    headers = response.headers if response is not None else {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return min(CLAUDE_BATCH_RETRY_MAX_S, max(0.0, float(headers[name]) * scale))
+        except (KeyError, TypeError, ValueError):
+            pass
+    backoff = CLAUDE_BATCH_RETRY_BASE_S * (2 ** attempt)
+    return min(CLAUDE_BATCH_RETRY_MAX_S, backoff * random.uniform(0.75, 1.25))
+
+
+def _claude_batch_chunk_retrying(client, timeout, chunk: list[str], label: str):
+    """_claude_batch_chunk, sending the same chunk again after a transient
+    API error, up to CLAUDE_BATCH_RETRIES times. The wait happens in the
+    worker thread, so a rate-limited batch also has fewer calls in flight.
+
+    A chunk that times out most likely has too much to translate within
+    CLAUDE_BATCH_TIMEOUT_S, and would time out again: it raises _ChunkError
+    at once, so the caller splits it."""
+    import anthropic
+
+    for attempt in range(CLAUDE_BATCH_RETRIES + 1):
+        try:
+            return _claude_batch_chunk(client, timeout, chunk, label)
+        except anthropic.APITimeoutError as e:
+            raise _ChunkError(f"Claude batch timed out for chunk {label}") from e
+        except Exception as e:
+            if attempt == CLAUDE_BATCH_RETRIES or not _is_transient(e):
+                raise
+            delay = _retry_delay(e, attempt)
+            _log(f"_claude_translate_batch: chunk {label} hit {type(e).__name__}; "
+                 f"retrying in {delay:.1f} s ({attempt + 1}/{CLAUDE_BATCH_RETRIES})")
+            time.sleep(delay)
+
+
+def _claude_translate_batch(phrases: list[str], on_chunk=None,
+                            metrics: Optional["_JobMetrics"] = None) -> dict[str, tuple[str, str]]:
+    """Translate many Thai phrases in a few concurrent Claude API calls.
 
     Returns a dict mapping each input phrase to (english_target, kind).
-    Sends in chunks of CLAUDE_BATCH_CHUNK_SIZE so any single hung call only
-    affects that chunk; partial results from earlier chunks are still returned
-    so they can be cached and the user can retry to fill the gaps.
+    Phrases are split by estimated token cost (_plan_chunks) and up to
+    CLAUDE_BATCH_CONCURRENCY chunks are in flight at once. A chunk hit by a
+    rate limit, overload, 5xx or failed connection is sent again unchanged
+    after a backoff (_claude_batch_chunk_retrying). A chunk that times out or
+    whose reply cannot be used (malformed/truncated JSON) is split in half and
+    both halves retried. A single phrase that still fails, or a chunk whose retries ran
+    out, is left out of the result, so the caller marks it untranslated and a
+    later run can fill the gap. Errors no retry can fix (bad key, no access,
+    unknown model) abort at once, as does every chunk failing.
+
+    on_chunk(results) is called from this thread with each chunk's
+    translations as it lands, so the caller can persist them before the rest
+    of the batch finishes. Each call's latency and token usage go to metrics.
     """
     if not phrases:
         return {}
 
-    import httpx
+    import anthropic
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
     client = _get_anthropic_client()
-    timeout = httpx.Timeout(CLAUDE_BATCH_TIMEOUT_S, connect=CLAUDE_BATCH_CONNECT_S)
+    # The SDK's own re-export: newer SDKs reject a timeout built from plain httpx.
+    timeout = anthropic.Timeout(CLAUDE_BATCH_TIMEOUT_S, connect=CLAUDE_BATCH_CONNECT_S)
+    fatal = (anthropic.AuthenticationError, anthropic.PermissionDeniedError, anthropic.NotFoundError)
     results: dict[str, tuple[str, str]] = {}
+    chunks = _plan_chunks(phrases)
+    total = len(chunks)
+    succeeded = 0
+    last_error: Optional[BaseException] = None
+
+    with ThreadPoolExecutor(max_workers=max(1, CLAUDE_BATCH_CONCURRENCY)) as pool:
+        pending = {}
+
+        def submit(chunk: list[str], label: str) -> None:
+            pending[pool.submit(_claude_batch_chunk_retrying, client, timeout, chunk, label)] = (chunk, label)
+
+        for n, chunk in enumerate(chunks, start=1):
+            submit(chunk, f"{n}/{total}")
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk, label = pending.pop(future)
+                try:
+                    chunk_results, usage = future.result()
+                except fatal:
+                    for f in pending:
+                        f.cancel()
+                    raise
+                except anthropic.APIError as e:
+                    # Retried in the worker already; a smaller chunk would not help.
+                    last_error = e
+                    if metrics:
+                        metrics.add_chunk(None)
+                    _log(f"_claude_translate_batch: chunk {label} failed ({e}); "
+                         f"leaving its {len(chunk)} phrases untranslated")
+                    continue
+                except _ChunkError as e:
+                    last_error = e
+                    if metrics:
+                        metrics.add_chunk(None)
+                    if len(chunk) == 1:
+                        _log(f"_claude_translate_batch: chunk {label} failed for its only phrase, skipping: {e}")
+                        continue
+                    half = len(chunk) // 2
+                    _log(f"_claude_translate_batch: chunk {label} failed ({e}); retrying as two halves")
+                    submit(chunk[:half], f"{label}a")
+                    submit(chunk[half:], f"{label}b")
+                    continue
+                succeeded += 1
+                if metrics:
+                    metrics.add_chunk(usage)
+                results.update(chunk_results)
+                if on_chunk and chunk_results:
+                    on_chunk(chunk_results)
+
+    if not succeeded and last_error is not None:
+        raise RuntimeError(f"Claude batch translation failed for every chunk: {last_error}") from last_error
+    return results
 
-    for chunk_start in range(0, len(phrases), CLAUDE_BATCH_CHUNK_SIZE):
-        chunk = phrases[chunk_start:chunk_start + CLAUDE_BATCH_CHUNK_SIZE]
-        chunk_idx = chunk_start // CLAUDE_BATCH_CHUNK_SIZE + 1
-        chunk_total = (len(phrases) + CLAUDE_BATCH_CHUNK_SIZE - 1) // CLAUDE_BATCH_CHUNK_SIZE
 
-        items = [{"id": i, "text": text} for i, text in enumerate(chunk)]
-        items_json = json.dumps(items, ensure_ascii=False)
-        _log(
-            f"_claude_translate_batch: chunk {chunk_idx}/{chunk_total} — "
-            f"{len(chunk)} phrases, {len(items_json)} input chars"
-        )
-        t0 = time.time()
-
-        # Streaming is required for large max_tokens (SDK refuses non-streaming
-        # requests it estimates will exceed ~10 minutes).
-        with client.with_options(timeout=timeout).messages.stream(
-            model=CLAUDE_MODEL,
-            max_tokens=CLAUDE_BATCH_MAX_TOKENS,
-            system=[{
-                "type": "text",
-                "text": CLAUDE_BATCH_SYSTEM_PROMPT,
-                "cache_control": {"type": "ephemeral"},
-            }],
-            messages=[{
-                "role": "user",
-                "content": (
-                    "Translate the following Thai construction-drawing phrases. "
-                    "Respond with the JSON array specified in the system prompt.\n\n"
-                    f"{items_json}"
-                ),
-            }],
-        ) as stream:
-            final = stream.get_final_message()
-
-        dt_ms = int((time.time() - t0) * 1000)
-        raw = next((b.text for b in final.content if b.type == "text"), "").strip()
-
-        try:
-            parsed = _extract_json_array(raw)
-        except json.JSONDecodeError as e:
-            raise RuntimeError(
-                f"Claude batch returned malformed JSON for chunk {chunk_idx}: "
-                f"{e.msg}. First 200 chars: {raw[:200]!r}"
-            )
-        if not isinstance(parsed, list):
-            raise RuntimeError(
-                f"Claude batch did not return a JSON array. Got: {type(parsed).__name__}"
+# --------------------------------------------------------------------------------------
+# In-memory glossary
+# --------------------------------------------------------------------------------------
+# Every th→en row of translation_dictionary, loaded once per process, so lookups
+# never touch SQLite. Hits are counted in memory and added to use_count /
+# updated_at in one executemany at most every GLOSSARY_FLUSH_INTERVAL_S
+# (and before a backup or a DB swap). Writes made through this module update
+# the cache directly; the TTL bounds staleness for writes from elsewhere (the
+# sqlite shell, another worker process).
+GLOSSARY_CACHE_TTL = 300.0
+GLOSSARY_FLUSH_INTERVAL_S = 30.0
+
+
+class _GlossaryCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Optional[dict[str, tuple[str, str]]] = None  # source -> (target, kind)
+        self._expires_at = 0.0
+        self._hits: dict[str, int] = {}
+        self._last_flush = time.monotonic()
+
+    def _entries_locked(self) -> dict[str, tuple[str, str]]:
+        now = time.monotonic()
+        if self._entries is None or now >= self._expires_at:
+            with _connect() as conn:
+                rows = conn.execute(
+                    "SELECT source_text, target_text, kind FROM translation_dictionary "
+                    "WHERE source_lang='th' AND target_lang='en'"
+                ).fetchall()
+            self._entries = {
+                row["source_text"]: (_sanitize_translation_text(row["target_text"]), row["kind"])
+                for row in rows
+            }
+            self._expires_at = now + GLOSSARY_CACHE_TTL
+        return self._entries
+
+    def lookup(self, phrases: list[str]) -> dict[str, tuple[str, str]]:
+        """(target, kind) for every phrase in the glossary; counts each as a hit."""
+        with self._lock:
+            entries = self._entries_locked()
+            found = {p: entries[p] for p in phrases if p in entries}
+            for p in found:
+                self._hits[p] = self._hits.get(p, 0) + 1
+        self.flush(force=False)
+        return found
+
+    def add(self, translations: dict[str, tuple[str, str]]) -> None:
+        """Mirror an INSERT OR IGNORE: rows already cached keep their value."""
+        with self._lock:
+            if self._entries is not None:
+                for text, (target, kind) in translations.items():
+                    self._entries.setdefault(text, (_sanitize_translation_text(target), kind))
+
+    def upsert(self, translations: dict[str, tuple[str, str]]) -> None:
+        """Mirror an INSERT … ON CONFLICT DO UPDATE: new values win."""
+        with self._lock:
+            if self._entries is not None:
+                for text, (target, kind) in translations.items():
+                    self._entries[text] = (_sanitize_translation_text(target), kind)
+
+    def flush(self, force: bool = True) -> None:
+        """Write pending hit counts (only if the interval has passed, unless forced)."""
+        with self._lock:
+            if not self._hits:
+                return
+            if not force and time.monotonic() - self._last_flush < GLOSSARY_FLUSH_INTERVAL_S:
+                return
+            hits, self._hits = self._hits, {}
+            self._last_flush = time.monotonic()
+        with _connect() as conn:
+            conn.executemany(
+                "UPDATE translation_dictionary SET use_count = use_count + ?, "
+                "updated_at = CURRENT_TIMESTAMP "
+                "WHERE source_lang='th' AND target_lang='en' AND source_text=?",
+                [(n, text) for text, n in hits.items()],
             )
 
-        for item in parsed:
-            if not isinstance(item, dict):
-                continue
-            i = item.get("id")
-            if not isinstance(i, int) or not (0 <= i < len(chunk)):
-                continue
-            target = _sanitize_translation_text(
-                str(item.get("target") or item.get("english") or "")
-            )
-            kind = str(item.get("kind", "phrase")).strip().lower()
-            if kind not in ("phrase", "name", "abbrev"):
-                kind = "phrase"
-            if target:
-                results[chunk[i]] = (target, kind)
-
-        usage = final.usage
-        cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
-        cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
-        translated = sum(1 for p in chunk if p in results)
-        _log(
-            f"_claude_translate_batch: chunk {chunk_idx}/{chunk_total} done "
-            f"({dt_ms} ms, {translated}/{len(chunk)} translated, "
-            f"in:{usage.input_tokens}/out:{usage.output_tokens}/"
-            f"cache_read:{cache_read}/cache_write:{cache_write})"
-        )
+    def reset(self) -> None:
+        """Forget everything, pending hits included (they belong to a replaced DB)."""
+        with self._lock:
+            self._entries = None
+            self._hits = {}
 
-    return results
+
+_GLOSSARY = _GlossaryCache()
+
+
+@atexit.register
+def _flush_glossary_at_exit() -> None:
+    try:
+        _GLOSSARY.flush()
+    except sqlite3.Error as e:
+        _log(f"glossary: could not flush use_count at exit: {e}")
 
 
 def _bulk_cache_lookup(phrases: list[str]) -> tuple[dict[str, "TranslationResult"], list[str]]:
-    """Look up many phrases in the SQLite glossary in one query.
+    """Look up many phrases in the in-memory glossary.
 
-    Returns (cached_results_dict, list_of_missing_phrases).
-    For each cache hit, also bumps the use_count for stats.
+    Returns (cached_results_dict, list_of_missing_phrases). Hits are counted
+    for use_count and written back in batches by _GLOSSARY.flush().
     """
     if not phrases:
         return {}, []
-    cached: dict[str, "TranslationResult"] = {}
-    with _connect() as conn:
-        # SQLite has a SQLITE_MAX_VARIABLE_NUMBER limit (default 999); chunk if huge.
-        for i in range(0, len(phrases), 500):
-            batch = phrases[i:i + 500]
-            placeholders = ",".join("?" * len(batch))
-            rows = conn.execute(
-                f"SELECT source_text, target_text, kind FROM translation_dictionary "
-                f"WHERE source_lang='th' AND target_lang='en' "
-                f"AND source_text IN ({placeholders})",
-                batch,
-            ).fetchall()
-            for row in rows:
-                cached[row["source_text"]] = TranslationResult(
-                    source=row["source_text"],
-                    target=_sanitize_translation_text(row["target_text"]),
-                    kind=row["kind"],
-                    via="cache",
-                )
-        # Bump use_count for hits (in one statement)
-        if cached:
-            hit_phrases = list(cached.keys())
-            for i in range(0, len(hit_phrases), 500):
-                batch = hit_phrases[i:i + 500]
-                placeholders = ",".join("?" * len(batch))
-                conn.execute(
-                    f"UPDATE translation_dictionary SET use_count = use_count + 1, "
-                    f"updated_at = CURRENT_TIMESTAMP "
-                    f"WHERE source_lang='th' AND target_lang='en' "
-                    f"AND source_text IN ({placeholders})",
-                    batch,
-                )
+    cached = {
+        text: TranslationResult(source=text, target=target, kind=kind, via="cache")
+        for text, (target, kind) in _GLOSSARY.lookup(phrases).items()
+    }
     missing = [p for p in phrases if p not in cached]
     return cached, missing
 
@@ -1087,13 +1596,15 @@ def _save_batch_translations(translations: dict[str, tuple[str, str]], via: str)
             "VALUES ('th', 'en', ?, ?, ?, ?)",
             rows,
         )
+    _GLOSSARY.add(translations)
 
 
-def _resolve_all(phrases: set[str]) -> dict[str, "TranslationResult"]:
+def _resolve_all(phrases: set[str], metrics: Optional["_JobMetrics"] = None) -> dict[str, "TranslationResult"]:
     """Get TranslationResult for every input phrase — cache + engine in batch.
 
     Used by translate_pdf() in the new batch flow. Per-phrase _lookup_or_translate
-    is kept for compatibility with the Argos engine path and tests.
+    is kept for compatibility with the Argos engine path and tests. Claude
+    usage is recorded on metrics.
     """
     if not phrases:
         return {}
@@ -1107,8 +1618,11 @@ def _resolve_all(phrases: set[str]) -> dict[str, "TranslationResult"]:
     engine = os.getenv("TRANSLATOR_ENGINE", "claude").strip().lower()
 
     if engine == "claude":
-        new_translations = _claude_translate_batch(missing)
-        _save_batch_translations(new_translations, via="claude")
+        # Each chunk is written to the glossary as it returns, so a crash or
+        # restart mid-batch keeps what was already paid for.
+        new_translations = _claude_translate_batch(
+            missing, on_chunk=lambda chunk: _save_batch_translations(chunk, via="claude"),
+            metrics=metrics)
         for phrase, (target, kind) in new_translations.items():
             cached[phrase] = TranslationResult(phrase, target, kind, "claude")
         # Phrases Claude failed to translate fall through to a placeholder
@@ -1179,25 +1693,10 @@ def _lookup_or_translate(text: str) -> TranslationResult:
     if not text:
         return TranslationResult(text, text, "phrase", "cache")
 
-    # 1) Glossary cache (read + bookkeeping update, both autocommit)
-    with _connect() as conn:
-        row = conn.execute(
-            "SELECT target_text, kind FROM translation_dictionary "
-            "WHERE source_lang='th' AND target_lang='en' AND source_text=?",
-            (text,),
-        ).fetchone()
-        if row:
-            conn.execute(
-                "UPDATE translation_dictionary SET use_count = use_count + 1, "
-                "updated_at = CURRENT_TIMESTAMP WHERE source_text=?",
-                (text,),
-            )
-            return TranslationResult(
-                text,
-                _sanitize_translation_text(row["target_text"]),
-                row["kind"],
-                "cache",
-            )
+    # 1) Glossary cache (in memory; the hit is counted and flushed later)
+    hit = _GLOSSARY.lookup([text]).get(text)
+    if hit:
+        return TranslationResult(text, hit[0], hit[1], "cache")
 
     # 2) Translation-engine dispatch (no DB lock held during this).
     #    TRANSLATOR_ENGINE=claude (default) — high-quality paid Anthropic API.
@@ -1235,6 +1734,7 @@ def _lookup_or_translate(text: str) -> TranslationResult:
             "VALUES ('th', 'en', ?, ?, ?, ?)",
             (text, target, kind, via),
         )
+    _GLOSSARY.add({text: (target, kind)})
     return TranslationResult(text, target, kind, via)
 
 
@@ -1276,14 +1776,26 @@ def _normalize_overlay_text(text: str) -> str:
 
 
 def _build_overlay_pdf(
-    page_size: tuple[float, float],
-    spans_with_translations: list[tuple[TextSpan, TranslationResult]],
+    pages: list[tuple[tuple[float, float], list[tuple[TextSpan, TranslationResult]]]],
 ) -> bytes:
-    """Build a single-page PDF containing white redaction rects and English text."""
+    """Build one PDF with an overlay page — white redaction rects and English
+    text — for each (page_size, spans_with_translations) in pages.
+
+    All overlays share one document, so the overlay font is embedded once and
+    the caller parses a single PDF to merge every page from.
+    """
     buf = io.BytesIO()
-    c = rl_canvas.Canvas(buf, pagesize=page_size)
+    c = rl_canvas.Canvas(buf)
     overlay_font = _get_overlay_font()
+    for page_size, spans_with_translations in pages:
+        c.setPageSize(page_size)
+        _draw_overlay_page(c, overlay_font, spans_with_translations)
+        c.showPage()
+    c.save()
+    return buf.getvalue()
 
+
+def _draw_overlay_page(c, overlay_font: str, spans_with_translations) -> None:
     for span, tr in spans_with_translations:
         w = max(span.x1 - span.x0, 1.0)
         h = max(span.y1 - span.y0, 1.0)
@@ -1333,120 +1845,411 @@ def _build_overlay_pdf(
             c.drawString(0, 0, en)
         c.restoreState()
 
-    c.showPage()
-    c.save()
-    return buf.getvalue()
+
+@functools.lru_cache(maxsize=8192)
+def _unit_string_width(font: str, text: str) -> float:
+    """Width of text at 1 pt; widths scale linearly with the font size."""
+    return pdfmetrics.stringWidth(text, font, 1.0)
 
 
 def _fit_font_size(font: str, text: str, max_extent: float, max_size: float) -> float:
-    """Largest font size such that drawString(text) fits within max_extent points."""
+    """Largest font size such that drawString(text) fits within max_extent points.
+
+    Sizes step down by 0.5 pt from min(max_size, 14) to a floor of 3 pt; the
+    step is computed from the width at 1 pt instead of measured size by size.
+    """
     if not text:
         return max_size
     size = min(max_size, 14.0)
-    while size > 3.0:
-        width = pdfmetrics.stringWidth(text, font, size)
-        if width <= max_extent:
-            return size
+    if size <= 3.0:
+        return 3.0
+    unit = _unit_string_width(font, text)
+    if unit * size <= max_extent:
+        return size
+    size -= 0.5 * math.ceil((size - max_extent / unit) / 0.5)
+    # Guard the rounding at exact multiples of 0.5 pt.
+    while size > 3.0 and unit * size > max_extent:
         size -= 0.5
-    return 3.0
+    return size if size > 3.0 else 3.0
+
+
+def _stamp_overlay(writer: PdfWriter, page, overlay_page) -> None:
+    """Draw overlay_page over page, a page already added to writer.
+
+    pypdf's merge_page parses the page's whole content stream — for a drawing
+    sheet, most of the merge time — and writes it back uncompressed. Here the
+    overlay becomes a Form XObject, and the page's content array gains two short
+    streams around its original ones, which are copied byte for byte. Form
+    resources are cloned through the writer, so every page of one overlay
+    document refers to the same embedded font.
+    """
+    form_ref = overlay_page.raw_get("/Contents").clone(writer)
+    form = form_ref.get_object()
+    form[NameObject("/Type")] = NameObject("/XObject")
+    form[NameObject("/Subtype")] = NameObject("/Form")
+    form[NameObject("/BBox")] = ArrayObject(page.mediabox)  # clip no more than merge_page did
+    form[NameObject("/Resources")] = overlay_page.raw_get("/Resources").clone(writer)
+
+    # Own copies of the resource dicts: sheets often share one, and each page
+    # gets its own overlay. Values stay references, so nothing is duplicated.
+    resources = DictionaryObject(dict.items(page["/Resources"])) if "/Resources" in page \
+        else DictionaryObject()
+    xobjects = DictionaryObject(dict.items(resources["/XObject"])) if "/XObject" in resources \
+        else DictionaryObject()
+    name, n = "/TrOverlay", 0
+    while name in xobjects:
+        n += 1
+        name = f"/TrOverlay{n}"
+    xobjects[NameObject(name)] = form_ref
+    resources[NameObject("/XObject")] = xobjects
+    page[NameObject("/Resources")] = resources
+
+    def stream(data: bytes) -> IndirectObject:
+        obj = DecodedStreamObject()
+        obj.set_data(data)
+        return writer._add_object(obj)  # pypdf has no public way to add a bare object
+
+    contents = page.raw_get("/Contents") if "/Contents" in page else None
+    original = contents.get_object() if contents is not None else None
+    if isinstance(original, ArrayObject):
+        parts = list(original)
+    else:
+        parts = [contents] if contents is not None else []
+    parts = [p if isinstance(p, IndirectObject) else writer._add_object(p) for p in parts]
+    page[NameObject("/Contents")] = ArrayObject(
+        [stream(b"q\n"), *parts, stream(f"\nQ\nq {name} Do Q\n".encode())])
+
+
+def _stitch_parts(parts: list[str], output_path: str) -> int:
+    """Concatenate the part PDFs' pages into output_path, one part at a time.
+
+    PdfWriter.append would keep every part's objects until write(), so memory
+    would grow with the finished file. Here each object reachable from a
+    part's pages is renumbered and written out as soon as it is reached, with
+    streams copied still encoded; only the byte offsets for the xref table and
+    the page numbers outlive a part. Objects 1 and 2 are the new catalog and
+    page tree, written last. Returns the page count.
+    """
+    catalog, root = 1, 2
+    offsets: dict[int, int] = {}
+    kids: list[int] = []
+    next_num = 3
+    with open(output_path, "wb") as out:
+        out.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+        def write_object(num: int, obj) -> None:
+            offsets[num] = out.tell()
+            out.write(f"{num} 0 obj\n".encode())
+            obj.write_to_stream(out)
+            out.write(b"\nendobj\n")
+
+        for part in parts:
+            reader = PdfReader(part)
+            pages = {page.indirect_reference.idnum for page in reader.pages}  # flattens inherited attributes
+            numbers: dict[tuple[int, int], int] = {}
+            todo: list[tuple[int, int]] = []
+
+            def ref(indirect: IndirectObject) -> IndirectObject:
+                key = (indirect.idnum, indirect.generation)
+                if key not in numbers:
+                    obj = indirect.get_object()
+                    kind = obj.get("/Type") if isinstance(obj, DictionaryObject) else None
+                    if kind in ("/Pages", "/Catalog"):  # the part's own tree: use ours
+                        return IndirectObject(root if kind == "/Pages" else catalog, 0, None)
+                    nonlocal next_num
+                    numbers[key] = next_num
+                    next_num += 1
+                    todo.append(key)
+                return IndirectObject(numbers[key], 0, None)
+
+            def remap(obj):
+                if isinstance(obj, IndirectObject):
+                    return ref(obj)
+                if isinstance(obj, ArrayObject):
+                    return ArrayObject(remap(v) for v in obj)
+                if isinstance(obj, DictionaryObject):
+                    copy = type(obj)() if isinstance(obj, StreamObject) else DictionaryObject()
+                    for k, v in obj.items():
+                        copy[k] = remap(v)
+                    if isinstance(obj, StreamObject):
+                        copy._data = obj._data  # still encoded: no decode, no re-compress
+                    return copy
+                return obj
+
+            for page in reader.pages:
+                kids.append(ref(page.indirect_reference).idnum)
+            while todo:
+                key = todo.pop()
+                obj = remap(reader.get_object(IndirectObject(*key, reader)))
+                if key[0] in pages:
+                    obj[NameObject("/Parent")] = IndirectObject(root, 0, None)
+                write_object(numbers[key], obj)
+            # A reader is a web of cycles (objects point back at it), which
+            # the collector's allocation-count trigger may not reach for many
+            # parts of large streams: free it now.
+            del reader, numbers
+            gc.collect()
+
+        write_object(root, DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(IndirectObject(k, 0, None) for k in kids),
+            NameObject("/Count"): NumberObject(len(kids)),
+        }))
+        write_object(catalog, DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): IndirectObject(root, 0, None),
+        }))
+        xref = out.tell()
+        out.write(f"xref\n0 {next_num}\n0000000000 65535 f \n".encode())
+        out.write(b"".join(b"%010d 00000 n \n" % offsets[n] for n in range(1, next_num)))
+        out.write(f"trailer\n<< /Size {next_num} /Root {catalog} 0 R >>\n"
+                  f"startxref\n{xref}\n%%EOF\n".encode())
+    return len(kids)
 
 
 # --------------------------------------------------------------------------------------
 # Pipeline
 # --------------------------------------------------------------------------------------
-def translate_pdf(input_path: str, output_path: str, progress_cb=None) -> dict:
-    """Run the full pipeline using the batch flow.
+# Streaming mode: documents of at least STREAM_MIN_PAGES pages are processed
+# STREAM_WINDOW_PAGES at a time — extract, resolve, render and merge one window,
+# write it to a part file, drop it — so parsed page objects, merged content
+# streams and overlays never exist for more than one window at once. Smaller
+# documents run as a single window (the original all-at-once behaviour).
+STREAM_WINDOW_PAGES = int(os.getenv("TRANSLATOR_STREAM_WINDOW", "8") or 8)
+STREAM_MIN_PAGES = int(os.getenv("TRANSLATOR_STREAM_MIN_PAGES", "40") or 40)
+
+
+def _rss_mb() -> int:
+    """Current resident set size of this process in MB (0 if unknown)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KB on Linux, bytes on macOS
+        return peak // (1024 * 1024) if sys.platform == "darwin" else peak // 1024
+    except (ImportError, OSError):
+        return 0
+
 
-    Phase 1 — extract all Thai spans from every page (one pdfplumber pass).
-    Phase 2 — bulk SQLite lookup; resolve cache misses via _claude_translate_batch.
-    Phase 3 — render overlays (one per page) using the now-complete translation map.
-    Phase 4 — merge overlays onto the original PDF.
+class _JobMetrics:
+    """Phase timings and Claude usage for one translate_pdf() run.
 
-    This collapses what was 150+ sequential Claude calls into ~1 batched call,
-    cutting wall-clock time from ~15 minutes to ~30 seconds on Render and
-    eliminating the per-call hang risk that killed earlier deploys.
+    Phases are timed with lap(): each call charges the time since the
+    previous one to a phase, and windows add up. Claude chunks report from
+    the batch's collecting thread, so add_chunk() takes the lock anyway.
+    """
+
+    PHASES = ("extract", "resolve", "render", "merge")
+    TOKENS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._clock = time.perf_counter()
+        self.phase_ms = dict.fromkeys(self.PHASES, 0)
+        self.tokens = dict.fromkeys(self.TOKENS, 0)
+        self.chunk_ms: list[int] = []
+        self.failed_chunks = 0
+
+    def lap(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phase_ms[phase] += int((now - self._clock) * 1000)
+        self._clock = now
+
+    def add_chunk(self, usage: Optional[dict]) -> None:
+        """Record one Claude call; usage None for a call that failed."""
+        with self._lock:
+            if usage is None:
+                self.failed_chunks += 1
+                return
+            self.chunk_ms.append(usage["ms"])
+            for key in self.TOKENS:
+                self.tokens[key] += usage.get(key, 0)
+
+    def as_row(self, stats: dict) -> dict:
+        """translation_job_metrics columns for a finished run's stats."""
+        duration_s = stats["duration_ms"] / 1000
+        chunk_ms = sorted(self.chunk_ms)
+        return {
+            "page_count": stats["page_count"],
+            "span_count": stats["text_count"],
+            "cache_hits": stats["cache_hits"],
+            **{f"{phase}_ms": ms for phase, ms in self.phase_ms.items()},
+            "total_ms": stats["duration_ms"],
+            "pages_per_s": round(stats["page_count"] / duration_s, 3) if duration_s else None,
+            "cache_hit_ratio": (round(stats["cache_hits"] / stats["text_count"], 4)
+                                if stats["text_count"] else None),
+            **self.tokens,
+            "claude_chunks": len(chunk_ms),
+            "claude_failed_chunks": self.failed_chunks,
+            "chunk_ms_median": chunk_ms[len(chunk_ms) // 2] if chunk_ms else None,
+            "chunk_ms_max": chunk_ms[-1] if chunk_ms else None,
+            "chunk_ms_json": json.dumps(self.chunk_ms),
+        }
+
+
+def translate_pdf(input_path: str, output_path: str, progress_cb=None, stream: Optional[bool] = None,
+                  on_mappings=None) -> dict:
+    """Run the full pipeline using the batch flow, one page window at a time.
+
+    Per window:
+      Phase 1 — extract Thai spans (_PageExtractor, in worker processes).
+      Phase 2 — resolve phrases not seen in earlier windows: in-memory glossary,
+                cache misses via _claude_translate_batch.
+      Phase 3 — render the window's overlays, one page each, in one document.
+      Phase 4 — merge overlays onto the original pages and write the window.
+
+    stream=None picks streaming mode for documents of STREAM_MIN_PAGES pages
+    or more; without it the whole document is one window, so every phrase is
+    still resolved in one batch. stats["peak_rss_mb"] is the highest resident
+    size of this process sampled during the run (extraction workers are
+    separate processes and not included). stats["metrics"] holds the
+    translation_job_metrics row: per-phase times and Claude usage.
+
+    Each window's mappings ({source, target, kind, via, page}) go to
+    on_mappings(rows) as the window finishes, so a long document never holds
+    them all; without it they are collected in stats["mappings"].
+    stats["untranslated"] counts the spans left untranslated either way.
     """
     init_db()
     t0 = time.time()
+    metrics = _JobMetrics()
     stats = {
         "page_count": 0, "text_count": 0,
         "api_calls": 0, "cache_hits": 0, "transliterations": 0,
-        "mappings": [],  # list of {source, target, kind, via, page}
+        "mappings": [],  # list of {source, target, kind, via, page}; empty with on_mappings
+        "untranslated": 0,
+        "peak_rss_mb": _rss_mb(),
     }
 
-    # ---- Phase 1: extract all spans + collect unique phrases ----
-    if progress_cb:
-        progress_cb(5, "Reading PDF and extracting Thai phrases…")
-
-    spans_by_page: list[list[TextSpan]] = []
-    page_sizes: list[tuple[float, float]] = []
-    unique_phrases: set[str] = set()
-
-    with pdfplumber.open(input_path) as pdf:
-        stats["page_count"] = len(pdf.pages)
-        for page in pdf.pages:
-            spans = _extract_thai_spans(page)
-            spans_by_page.append(spans)
-            page_sizes.append((page.width, page.height))
-            for s in spans:
-                unique_phrases.add(s.text)
-            stats["text_count"] += len(spans)
-
-    _log(
-        f"translate_pdf: extracted {stats['text_count']} spans "
-        f"({len(unique_phrases)} unique) from {stats['page_count']} pages"
-    )
-
-    # ---- Phase 2: bulk-resolve every unique phrase (cache + batched Claude) ----
-    if progress_cb:
-        progress_cb(20, f"Translating {len(unique_phrases)} unique phrases…")
-
-    phrase_to_tr = _resolve_all(unique_phrases)
+    def sample_memory() -> None:
+        stats["peak_rss_mb"] = max(stats["peak_rss_mb"], _rss_mb())
 
-    # ---- Phase 3: render overlays per page ----
-    overlay_pages: list[bytes] = []
-    for page_index, spans in enumerate(spans_by_page):
+    def report(fraction: float, msg: str) -> None:
+        # 5 → 95 % across the document; the window's phases share its slice.
         if progress_cb:
-            # Allocate 60→90% of the bar to rendering — 3% per page for 10 pages.
-            pct = 60 + int(30 * page_index / max(1, stats["page_count"]))
-            progress_cb(pct, f"Rendering page {page_index + 1}/{stats['page_count']}")
-
-        spans_with_tr: list[tuple[TextSpan, TranslationResult]] = []
-        for span in spans:
-            tr = phrase_to_tr.get(span.text)
-            if tr is None:
-                # Defensive: should never happen because Phase 2 fills every phrase.
-                tr = TranslationResult(span.text, span.text, "phrase", "untranslated")
-            if tr.via == "cache":
-                stats["cache_hits"] += 1
-            elif tr.via in ("argos", "claude"):
-                stats["api_calls"] += 1
-            elif tr.via == "transliterate":
-                stats["transliterations"] += 1
-            spans_with_tr.append((span, tr))
-            stats["mappings"].append({
-                "source": tr.source, "target": tr.target,
-                "kind": tr.kind, "via": tr.via,
-                "page": page_index + 1,
-            })
-
-        overlay_pdf = _build_overlay_pdf(page_sizes[page_index], spans_with_tr)
-        overlay_pages.append(overlay_pdf)
-
-    # ---- Phase 4: merge overlays onto original ----
-    if progress_cb:
-        progress_cb(95, "Merging overlays into output PDF")
-
-    original = PdfReader(input_path)
-    writer = PdfWriter()
-    for i, page in enumerate(original.pages):
-        overlay_reader = PdfReader(io.BytesIO(overlay_pages[i]))
-        page.merge_page(overlay_reader.pages[0])
-        writer.add_page(page)
-    with open(output_path, "wb") as f:
-        writer.write(f)
+            progress_cb(5 + int(90 * fraction), msg)
+
+    page_count = len(PdfReader(input_path).pages)
+    stats["page_count"] = page_count
+    if stream is None:
+        stream = page_count >= STREAM_MIN_PAGES
+    window = max(1, STREAM_WINDOW_PAGES) if stream else max(1, page_count)
+    _log(f"translate_pdf: {page_count} pages, "
+         + (f"streaming in windows of {window}" if stream else "single window"))
+
+    phrase_to_tr: dict[str, TranslationResult] = {}
+    parts_dir = tempfile.mkdtemp(prefix="translator_parts_", dir=JOBS_DIR) if stream else None
+    parts: list[str] = []
+    try:
+        with _PageExtractor(input_path, page_count, window if stream else None) as extractor:
+            for lo in range(0, max(page_count, 1), window):
+                hi = min(lo + window, page_count)
+                span_lo, span_hi = lo / max(1, page_count), hi / max(1, page_count)
+
+                def at(frac: float) -> float:
+                    return span_lo + (span_hi - span_lo) * frac
+
+                # ---- Phase 1: extract spans for this window ----
+                report(at(0), "Reading PDF and extracting Thai phrases…")
+                results = extractor.extract(range(lo, hi), lambda done: report(
+                    at(0.17 * done / (hi - lo)),
+                    f"Extracting Thai phrases… page {lo + done}/{page_count}"))
+                sample_memory()
+                new_phrases: set[str] = set()
+                for i in range(lo, hi):
+                    spans = results[i][1]
+                    stats["text_count"] += len(spans)
+                    new_phrases.update(sp.text for sp in spans if sp.text not in phrase_to_tr)
+                _log(f"translate_pdf: pages {lo + 1}-{hi}: {sum(len(results[i][1]) for i in range(lo, hi))} "
+                     f"spans, {len(new_phrases)} new unique phrases")
+                metrics.lap("extract")
+
+                # ---- Phase 2: bulk-resolve phrases first seen in this window ----
+                report(at(0.17), f"Translating {len(new_phrases)} unique phrases…")
+                phrase_to_tr.update(_resolve_all(new_phrases, metrics=metrics))
+                sample_memory()
+                metrics.lap("resolve")
+
+                # ---- Phase 3: render the window's overlays as one document ----
+                report(at(0.61), f"Rendering overlays for pages {lo + 1}-{hi}")
+                overlay_pages = []
+                window_mappings = []
+                for page_index in range(lo, hi):
+                    size, spans = results.pop(page_index)
+                    spans_with_tr: list[tuple[TextSpan, TranslationResult]] = []
+                    for span in spans:
+                        tr = phrase_to_tr.get(span.text)
+                        if tr is None:
+                            # Defensive: should never happen because Phase 2 fills every phrase.
+                            tr = TranslationResult(span.text, span.text, "phrase", "untranslated")
+                        if tr.via == "cache":
+                            stats["cache_hits"] += 1
+                        elif tr.via in ("argos", "claude"):
+                            stats["api_calls"] += 1
+                        elif tr.via == "transliterate":
+                            stats["transliterations"] += 1
+                        elif tr.via == "untranslated":
+                            stats["untranslated"] += 1
+                        spans_with_tr.append((span, tr))
+                        window_mappings.append({
+                            "source": tr.source, "target": tr.target,
+                            "kind": tr.kind, "via": tr.via,
+                            "page": page_index + 1,
+                        })
+                    overlay_pages.append((size, spans_with_tr))
+                if on_mappings:
+                    on_mappings(window_mappings)
+                else:
+                    stats["mappings"].extend(window_mappings)
+                del window_mappings
+                overlay_reader = PdfReader(io.BytesIO(_build_overlay_pdf(overlay_pages)))
+                del overlay_pages
+                sample_memory()
+                metrics.lap("render")
+
+                # ---- Phase 4: merge each overlay onto its original page ----
+                original = PdfReader(input_path)  # fresh per window: its object cache dies with it
+                writer = PdfWriter()
+                for page_index in range(lo, hi):
+                    report(at(0.72 + 0.22 * (page_index - lo) / (hi - lo)),
+                           f"Merging page {page_index + 1}/{page_count}")
+                    page = writer.add_page(original.pages[page_index])
+                    _stamp_overlay(writer, page, overlay_reader.pages[page_index - lo])
+                sample_memory()
+
+                report(at(0.94), "Merging overlays into output PDF")
+                if stream:
+                    part = os.path.join(parts_dir, f"{lo:06d}.pdf")
+                    with open(part, "wb") as f:
+                        writer.write(f)
+                    parts.append(part)
+                else:
+                    with open(output_path, "wb") as f:
+                        writer.write(f)
+                del writer, original, overlay_reader, results
+                sample_memory()
+                metrics.lap("merge")
+
+        if stream:
+            # One part in memory at a time, like the windows that wrote them.
+            report(1.0, "Writing output PDF")
+            _stitch_parts(parts, output_path)
+            sample_memory()
+            metrics.lap("merge")
+    finally:
+        if parts_dir:
+            shutil.rmtree(parts_dir, ignore_errors=True)
 
     stats["duration_ms"] = int((time.time() - t0) * 1000)
+    stats["metrics"] = metrics.as_row(stats)
+    _log("translate_pdf: " + ", ".join(f"{phase} {ms} ms" for phase, ms in metrics.phase_ms.items())
+         + f"; {len(metrics.chunk_ms)} Claude call(s), {metrics.tokens['input_tokens']} input / "
+         f"{metrics.tokens['output_tokens']} output / {metrics.tokens['cache_read_tokens']} cache-read tokens")
     if progress_cb:
         progress_cb(100, "Done")
     return stats
@@ -1455,19 +2258,90 @@ def translate_pdf(input_path: str, output_path: str, progress_cb=None) -> dict:
 # --------------------------------------------------------------------------------------
 # Background-job orchestration
 # --------------------------------------------------------------------------------------
-def create_job(filename: str, user_id: Optional[int]) -> str:
+def content_sha256(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def create_job(filename: str, user_id: Optional[int], content_hash: Optional[str] = None) -> str:
     init_db()
     job_id = uuid.uuid4().hex
     with _connect() as conn:
+        # 'received' until enqueue_job(): workers must not claim it before its PDF is saved.
         conn.execute(
-            "INSERT INTO translation_jobs (id, user_id, filename, status) "
-            "VALUES (?, ?, ?, 'queued')",
-            (job_id, user_id, filename),
+            "INSERT INTO translation_jobs (id, user_id, filename, status, content_sha256) "
+            "VALUES (?, ?, ?, 'received', ?)",
+            (job_id, user_id, filename, content_hash),
         )
         conn.commit()
     return job_id
 
 
+def complete_from_cache(job_id: str, content_hash: str) -> bool:
+    """Finish job_id from an earlier translation of the same PDF, if one is usable.
+
+    Usable means done, stamped with the current glossary version, and with its
+    output still in RESULTS_DIR. The new job shares that output file and copies
+    its mapping rows; nothing is parsed or translated. Returns False on a miss.
+    """
+    t0 = time.time()
+    with _connect() as conn:
+        version = _glossary_version(conn)
+        rows = conn.execute(
+            "SELECT id, page_count, text_count, output_path FROM translation_jobs "
+            "WHERE content_sha256 = ? AND glossary_version = ? AND status = 'done' "
+            "AND output_path IS NOT NULL AND id != ? ORDER BY updated_at DESC",
+            (content_hash, version, job_id),
+        ).fetchall()
+    for row in rows:
+        if not mark_result_used(row["output_path"]):
+            continue
+        with _connect() as conn:
+            conn.execute(
+                "INSERT INTO translation_mappings (job_id, page, source, target, kind, via) "
+                "SELECT ?, page, source, target, kind, via FROM translation_mappings "
+                "WHERE job_id = ? ORDER BY id",
+                (job_id, row["id"]),
+            )
+        _update_job(
+            job_id,
+            status="done",
+            page_count=row["page_count"],
+            text_count=row["text_count"],
+            api_calls=0,
+            cache_hits=row["text_count"],
+            duration_ms=int((time.time() - t0) * 1000),
+            output_path=row["output_path"],
+            glossary_version=version,
+            reused_from=row["id"],
+            progress_percent=100,
+            progress_message="Done (same PDF and glossary as an earlier job)",
+        )
+        _log(f"complete_from_cache: job {job_id} reused the output of job {row['id']}")
+        return True
+    return False
+
+
+# Job fields pushed to progress streams (api.progress); mappings stay in the DB.
+JOB_EVENT_FIELDS = (
+    "status", "progress_percent", "progress_message", "error_message", "page_count",
+    "text_count", "api_calls", "cache_hits", "duration_ms", "peak_rss_mb",
+    "queue_position", "reused_from",
+)
+# While a job runs, its progress goes to the stream on every step but to the DB
+# (for status polls and restarts) at most this often; status changes always do.
+PROGRESS_DB_INTERVAL_S = 15.0
+
+
+def _job_topic(job_id: str) -> str:
+    return f"translator:{job_id}"
+
+
+def _publish_job(job_id: str, fields: dict) -> None:
+    event = {k: v for k, v in fields.items() if k in JOB_EVENT_FIELDS}
+    if event:
+        progress_hub.publish(_job_topic(job_id), event)
+
+
 def _update_job(job_id: str, **fields) -> None:
     if not fields:
         return
@@ -1477,6 +2351,30 @@ def _update_job(job_id: str, **fields) -> None:
         conn.execute(f"UPDATE translation_jobs SET {cols} WHERE id = ?",
                      (*fields.values(), job_id))
         conn.commit()
+    _publish_job(job_id, fields)
+
+
+def _queue_position(conn: sqlite3.Connection, job_id: str) -> int:
+    return conn.execute(
+        "SELECT COUNT(*) FROM translation_jobs WHERE status = 'queued' AND rowid <= "
+        "(SELECT rowid FROM translation_jobs WHERE id = ?)",
+        (job_id,),
+    ).fetchone()[0]
+
+
+def get_job_summary(job_id: str) -> Optional[dict]:
+    """The job's JOB_EVENT_FIELDS (no mappings), as the first progress event."""
+    init_db()
+    columns = ", ".join(f for f in JOB_EVENT_FIELDS if f != "queue_position")
+    with _connect() as conn:
+        row = conn.execute(
+            f"SELECT {columns} FROM translation_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if not row:
+            return None
+        d = dict(row)
+        d["queue_position"] = _queue_position(conn, job_id) if d["status"] == "queued" else None
+    return d
 
 
 def get_job(job_id: str) -> Optional[dict]:
@@ -1485,86 +2383,430 @@ def get_job(job_id: str) -> Optional[dict]:
         row = conn.execute(
             "SELECT * FROM translation_jobs WHERE id = ?", (job_id,)
         ).fetchone()
+        position = _queue_position(conn, job_id) if row and row["status"] == "queued" else None
     if not row:
         return None
     d = dict(row)
-    if d.get("mappings_json"):
-        try:
-            d["mappings"] = json.loads(d["mappings_json"])
-        except Exception:
-            d["mappings"] = []
-    else:
-        d["mappings"] = []
+    d["queue_position"] = position  # 1 = next to run; None unless queued
     d.pop("mappings_json", None)
     return d
 
 
-def run_job_in_background(job_id: str, input_path: str) -> None:
-    """Kick off a background thread that runs the pipeline and updates the job row."""
+# Page size for get_job_mappings(); the mappings endpoint caps `limit` here.
+MAPPINGS_PAGE_SIZE = 100
+MAPPINGS_MAX_LIMIT = 1000
 
-    # Opportunistic sweep — keeps the JOBS_DIR bounded over time without a cron.
-    _cleanup_stale_job_files()
 
-    def _runner():
-        _log(f"_runner: thread started for job {job_id}")
+def _insert_mappings(conn: sqlite3.Connection, job_id: str, mappings: list[dict]) -> None:
+    conn.executemany(
+        "INSERT INTO translation_mappings (job_id, page, source, target, kind, via) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        ((job_id, m["page"], m["source"], m["target"], m["kind"], m["via"]) for m in mappings),
+    )
+
+
+def _save_mappings(job_id: str, mappings: list[dict]) -> None:
+    """Replace job_id's mapping rows in one transaction."""
+    with _connect() as conn:
+        conn.execute("BEGIN")
         try:
-            _log("_runner: calling _update_job(status=processing)…")
-            _update_job(job_id, status="processing", progress_percent=1,
-                        progress_message="Starting…")
-            _log("_runner: status set to 'processing'")
-            output_path = os.path.join(JOBS_DIR, f"{job_id}.translated.pdf")
-
-            def cb(pct: int, msg: str):
-                _log(f"_runner: progress {pct}% — {msg}")
+            conn.execute("DELETE FROM translation_mappings WHERE job_id = ?", (job_id,))
+            _insert_mappings(conn, job_id, mappings)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def _append_mappings(job_id: str, mappings: list[dict]) -> None:
+    """Add one window's mapping rows to job_id's, in one transaction."""
+    with _connect() as conn:
+        conn.execute("BEGIN")
+        try:
+            _insert_mappings(conn, job_id, mappings)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def count_job_mappings(job_id: str) -> int:
+    init_db()
+    with _connect() as conn:
+        return conn.execute(
+            "SELECT COUNT(*) FROM translation_mappings WHERE job_id = ?", (job_id,)
+        ).fetchone()[0]
+
+
+def get_job_mappings(
+    job_id: str,
+    page: Optional[int] = None,
+    kind: Optional[str] = None,
+    via: Optional[str] = None,
+    grouped: bool = False,
+    offset: int = 0,
+    limit: int = MAPPINGS_PAGE_SIZE,
+) -> dict:
+    """One page of a job's mappings, optionally filtered by page, kind and via.
+
+    Rows come in page order. With grouped=True each distinct (source, target,
+    kind, via) is one item with its `count` and the first `page` it is on,
+    most used first. Returns {"total", "offset", "limit", "items"}.
+    """
+    init_db()
+    where, params = ["job_id = ?"], [job_id]
+    for column, value in (("page", page), ("kind", kind), ("via", via)):
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(value)
+    where_sql = " AND ".join(where)
+    if grouped:
+        select = (
+            "SELECT source, target, kind, via, COUNT(*) AS count, MIN(page) AS page "
+            f"FROM translation_mappings WHERE {where_sql} GROUP BY source, target, kind, via"
+        )
+        count_sql = f"SELECT COUNT(*) FROM ({select})"
+        query = f"{select} ORDER BY count DESC, page, source LIMIT ? OFFSET ?"
+    else:
+        count_sql = f"SELECT COUNT(*) FROM translation_mappings WHERE {where_sql}"
+        query = (
+            "SELECT page, source, target, kind, via FROM translation_mappings "
+            f"WHERE {where_sql} ORDER BY page, id LIMIT ? OFFSET ?"
+        )
+    with _connect() as conn:
+        total = conn.execute(count_sql, params).fetchone()[0]
+        items = [dict(r) for r in conn.execute(query, (*params, limit, offset))]
+    return {"total": total, "offset": offset, "limit": limit, "items": items}
+
+
+def _save_job_metrics(job_id: str, row: dict) -> None:
+    cols = ["job_id", *row]
+    with _connect() as conn:
+        conn.execute(
+            f"INSERT OR REPLACE INTO translation_job_metrics ({', '.join(cols)}) "
+            f"VALUES ({', '.join('?' * len(cols))})",
+            (job_id, *row.values()),
+        )
+
+
+# Aggregates over translation_job_metrics rows: sums, then ratios of sums, so
+# large drawing sets weigh in by their size rather than one job, one vote.
+_METRICS_AGGREGATES = """
+    COUNT(*) AS jobs,
+    SUM(page_count) AS pages,
+    SUM(span_count) AS spans,
+    ROUND(SUM(page_count) * 1000.0 / NULLIF(SUM(total_ms), 0), 3) AS pages_per_s,
+    ROUND(SUM(extract_ms) * 1.0 / NULLIF(SUM(page_count), 0), 1) AS extract_ms_per_page,
+    ROUND(SUM(resolve_ms) * 1.0 / NULLIF(SUM(page_count), 0), 1) AS resolve_ms_per_page,
+    ROUND(SUM(render_ms) * 1.0 / NULLIF(SUM(page_count), 0), 1) AS render_ms_per_page,
+    ROUND(SUM(merge_ms) * 1.0 / NULLIF(SUM(page_count), 0), 1) AS merge_ms_per_page,
+    ROUND(SUM(cache_hits) * 1.0 / NULLIF(SUM(span_count), 0), 4) AS cache_hit_ratio,
+    SUM(input_tokens) AS input_tokens,
+    SUM(output_tokens) AS output_tokens,
+    SUM(cache_read_tokens) AS cache_read_tokens,
+    SUM(cache_write_tokens) AS cache_write_tokens,
+    SUM(claude_chunks) AS claude_chunks,
+    SUM(claude_failed_chunks) AS claude_failed_chunks,
+    MAX(chunk_ms_max) AS chunk_ms_max
+"""
+
+
+def get_metrics_summary(days: int = 30, recent: int = 20) -> dict:
+    """Job metrics over the last `days`: totals, one row per day, and the
+    `recent` latest jobs, newest first."""
+    init_db()
+    since = f"-{int(days)} days"
+    with _connect() as conn:
+        totals = conn.execute(
+            f"SELECT {_METRICS_AGGREGATES} FROM translation_job_metrics "
+            "WHERE created_at >= datetime('now', ?)",
+            (since,),
+        ).fetchone()
+        daily = conn.execute(
+            f"SELECT date(created_at) AS day, {_METRICS_AGGREGATES} FROM translation_job_metrics "
+            "WHERE created_at >= datetime('now', ?) GROUP BY day ORDER BY day",
+            (since,),
+        ).fetchall()
+        latest = conn.execute(
+            "SELECT m.*, j.filename FROM translation_job_metrics m "
+            "LEFT JOIN translation_jobs j ON j.id = m.job_id "
+            "WHERE m.created_at >= datetime('now', ?) "
+            "ORDER BY m.created_at DESC, m.rowid DESC LIMIT ?",
+            (since, recent),
+        ).fetchall()
+    jobs = []
+    for row in latest:
+        d = dict(row)
+        d["chunk_ms"] = json.loads(d.pop("chunk_ms_json") or "[]")
+        jobs.append(d)
+    return {"days": days, "totals": dict(totals), "daily": [dict(r) for r in daily], "recent": jobs}
+
+
+def _run_job(job_id: str) -> None:
+    """Translate a claimed job's uploaded PDF and record the result on its row."""
+    _log(f"_run_job: starting job {job_id}")
+    input_path = _input_path(job_id)
+    try:
+        if not os.path.exists(input_path):
+            raise FileNotFoundError("The uploaded PDF is no longer on disk; please upload it again.")
+        with _connect() as conn:
+            # Read before translating: an import during the run leaves the
+            # output stamped with the older version, so it is never reused.
+            version = _glossary_version(conn)
+        output_path = os.path.join(RESULTS_DIR, f"{job_id}.translated.pdf")
+        last_db_write = time.monotonic()
+
+        def cb(pct: int, msg: str):
+            nonlocal last_db_write
+            _log(f"_run_job: progress {pct}% — {msg}")
+            if time.monotonic() - last_db_write >= PROGRESS_DB_INTERVAL_S:
                 _update_job(job_id, progress_percent=pct, progress_message=msg)
+                last_db_write = time.monotonic()
+            else:
+                _publish_job(job_id, {"progress_percent": pct, "progress_message": msg})
+
+        # Mapping rows are written window by window; a rerun after a restart
+        # starts from none.
+        _save_mappings(job_id, [])
+        _log(f"_run_job: calling translate_pdf({input_path!r})…")
+        stats = translate_pdf(input_path, output_path, progress_cb=cb,
+                              on_mappings=lambda rows: _append_mappings(job_id, rows))
+        _log(f"_run_job: translate_pdf returned. stats={stats}")
+        # A phrase left untranslated (e.g. a Claude chunk that failed) may
+        # succeed next time, so only complete results are offered for reuse.
+        complete = stats["untranslated"] == 0
+        # The rows are all in by now, so a job is never 'done' without them.
+        if stats.get("metrics"):
+            _save_job_metrics(job_id, stats["metrics"])
+        _update_job(
+            job_id,
+            status="done",
+            page_count=stats["page_count"],
+            text_count=stats["text_count"],
+            api_calls=stats["api_calls"],
+            cache_hits=stats["cache_hits"],
+            duration_ms=stats["duration_ms"],
+            peak_rss_mb=stats["peak_rss_mb"],
+            glossary_version=version if complete else None,
+            output_path=output_path,
+            progress_percent=100,
+            progress_message="Done",
+        )
+        _log(f"_run_job: job {job_id} marked done")
+        _trim_result_cache()
+        # Input PDF is no longer needed once the translated output exists.
+        if _safe_remove(input_path):
+            _log(f"_run_job: deleted input PDF {input_path}")
+    except Exception as e:
+        _log(f"_run_job: EXCEPTION {type(e).__name__}: {e}")
+        logger.exception("Translation job failed")
+        _update_job(
+            job_id, status="error", error_message=f"{type(e).__name__}: {e}",
+            progress_message="Error",
+        )
+        # On failure, also drop the input PDF — nothing is going to read it.
+        _safe_remove(input_path)
 
-            _log(f"_runner: calling translate_pdf({input_path!r})…")
-            stats = translate_pdf(input_path, output_path, progress_cb=cb)
-            _log(f"_runner: translate_pdf returned. stats={stats}")
-            _update_job(
-                job_id,
-                status="done",
-                page_count=stats["page_count"],
-                text_count=stats["text_count"],
-                api_calls=stats["api_calls"],
-                cache_hits=stats["cache_hits"],
-                duration_ms=stats["duration_ms"],
-                output_path=output_path,
-                mappings_json=json.dumps(stats["mappings"], ensure_ascii=False),
-                progress_percent=100,
-                progress_message="Done",
-            )
-            _log(f"_runner: job {job_id} marked done")
-            # Input PDF is no longer needed once the translated output exists.
-            if _safe_remove(input_path):
-                _log(f"_runner: deleted input PDF {input_path}")
-        except Exception as e:
-            _log(f"_runner: EXCEPTION {type(e).__name__}: {e}")
-            logger.exception("Translation job failed")
-            _update_job(
-                job_id, status="error", error_message=f"{type(e).__name__}: {e}",
-                progress_message="Error",
-            )
-            # On failure, also drop the input PDF — nothing is going to read it.
-            _safe_remove(input_path)
 
-    _log(f"run_job_in_background: starting thread for job {job_id}")
-    t = threading.Thread(target=_runner, daemon=True)
-    t.start()
-    _log(f"run_job_in_background: thread.start() returned")
+def _input_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.input.pdf")
 
 
 def save_uploaded_pdf(job_id: str, file_bytes: bytes) -> str:
-    path = os.path.join(JOBS_DIR, f"{job_id}.input.pdf")
+    path = _input_path(job_id)
     with open(path, "wb") as f:
         f.write(file_bytes)
     return path
 
 
+def fail_job(job_id: str, error: BaseException) -> bool:
+    """Mark a job that never reached a worker as failed, e.g. when saving its
+    upload raised. Only a 'received' or still unclaimed 'queued' job changes;
+    returns whether this one did."""
+    message = f"{type(error).__name__}: {error}"
+    with _connect() as conn:
+        cur = conn.execute(
+            "UPDATE translation_jobs SET status = 'error', error_message = ?, "
+            "progress_message = 'Error', updated_at = CURRENT_TIMESTAMP "
+            "WHERE id = ? AND status IN ('received', 'queued')",
+            (message, job_id),
+        )
+    if not cur.rowcount:
+        return False
+    _log(f"fail_job: job {job_id} failed before it was queued: {message}")
+    _publish_job(job_id, {"status": "error", "error_message": message, "progress_message": "Error"})
+    _safe_remove(_input_path(job_id))
+    return True
+
+
+# --------------------------------------------------------------------------------------
+# Job queue — translation_jobs is the queue: JOB_WORKERS threads claim 'queued'
+# rows oldest first, so a burst of uploads waits its turn instead of running
+# every parse and Claude stream at once, and the queue survives a restart.
+# --------------------------------------------------------------------------------------
+JOB_WORKERS = int(os.getenv("TRANSLATOR_JOB_WORKERS", "1") or 1)
+JOB_POLL_INTERVAL_S = 5.0  # idle workers also re-check the table this often
+RECEIVED_STALE_S = 300  # a 'received' job this old lost its upload request
+
+_QUEUE_WAKE = threading.Semaphore(0)  # one release per enqueued job
+_QUEUE_LOCK = threading.Lock()
+_WORKER_THREADS: list[threading.Thread] = []
+_WORKERS_STOP = threading.Event()  # replaced on each start; set by stop_job_workers()
+_REQUEUED = False
+
+
+def _requeue_interrupted_jobs() -> int:
+    """Put jobs a previous server process left 'processing' back in the queue.
+
+    Only run before this process starts its workers. The app is a single
+    uvicorn process, so no other live worker can own those rows.
+    """
+    with _connect() as conn:
+        cur = conn.execute(
+            "UPDATE translation_jobs SET status = 'queued', progress_percent = 0, "
+            "progress_message = 'Requeued after a restart', updated_at = CURRENT_TIMESTAMP "
+            "WHERE status = 'processing'"
+        )
+    if cur.rowcount:
+        _log(f"_requeue_interrupted_jobs: requeued {cur.rowcount} job(s)")
+    return cur.rowcount
+
+
+def _fail_abandoned_uploads(max_age_seconds: float = RECEIVED_STALE_S) -> int:
+    """Fail 'received' jobs older than max_age_seconds.
+
+    A job is 'received' only while its upload request saves the PDF; one still
+    there minutes later lost that request (the process exited, or the save
+    failed before fail_job could run) and would otherwise show as pending
+    forever. Younger rows may belong to an upload in flight and are left alone.
+    """
+    with _connect() as conn:
+        cur = conn.execute(
+            "UPDATE translation_jobs SET status = 'error', "
+            "error_message = 'The upload was not saved; please upload the PDF again.', "
+            "progress_message = 'Error', updated_at = CURRENT_TIMESTAMP "
+            "WHERE status = 'received' AND updated_at < datetime('now', ?)",
+            (f"-{int(max_age_seconds)} seconds",),
+        )
+    if cur.rowcount:
+        _log(f"_fail_abandoned_uploads: failed {cur.rowcount} job(s)")
+    return cur.rowcount
+
+
+def start_job_workers() -> None:
+    """Start the queue's worker threads unless they are running. The first
+    start in a process requeues jobs a restart interrupted and fails uploads
+    it abandoned. Runs at app startup and from enqueue_job()."""
+    global _WORKERS_STOP, _REQUEUED
+    with _QUEUE_LOCK:
+        if _WORKER_THREADS:
+            return
+        init_db()
+        if not _REQUEUED:
+            _requeue_interrupted_jobs()
+            _fail_abandoned_uploads()
+            _REQUEUED = True
+        _WORKERS_STOP = stop = threading.Event()
+        for n in range(max(1, JOB_WORKERS)):
+            t = threading.Thread(target=_job_worker, args=(stop,), name=f"translator-job-{n}", daemon=True)
+            t.start()
+            _WORKER_THREADS.append(t)
+    _log(f"start_job_workers: {JOB_WORKERS} worker(s) started")
+
+
+def stop_job_workers(wait: float = 0) -> None:
+    """Stop claiming jobs and give running ones up to `wait` seconds to finish.
+
+    Runs at app shutdown with no wait: a job cut off by the exit is still
+    'processing' and is requeued by the next process.
+    """
+    with _QUEUE_LOCK:
+        threads, stop = list(_WORKER_THREADS), _WORKERS_STOP
+        _WORKER_THREADS.clear()
+        stop.set()
+    for _ in threads:
+        _QUEUE_WAKE.release()
+    deadline = time.monotonic() + wait
+    for t in threads:
+        t.join(max(0.0, deadline - time.monotonic()))
+
+
+def enqueue_job(job_id: str) -> None:
+    """Queue a job whose PDF has been saved, and wake a worker for it."""
+    # Opportunistic sweep — keeps the JOBS_DIR bounded over time without a cron.
+    _cleanup_stale_job_files()
+    with _connect() as conn:
+        conn.execute(
+            "UPDATE translation_jobs SET status = 'queued', updated_at = CURRENT_TIMESTAMP "
+            "WHERE id = ? AND status = 'received'",
+            (job_id,),
+        )
+    _publish_job(job_id, {"status": "queued"})
+    start_job_workers()
+    _QUEUE_WAKE.release()
+
+
+def _claim_next_job() -> Optional[str]:
+    """Move the oldest queued job to 'processing' and return its id.
+
+    The UPDATE only succeeds while the row is still 'queued', so when two
+    workers pick the same row, exactly one of them gets it; the other tries
+    the next one.
+    """
+    with _connect() as conn:
+        while True:
+            row = conn.execute(
+                "SELECT id FROM translation_jobs WHERE status = 'queued' ORDER BY rowid LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            cur = conn.execute(
+                "UPDATE translation_jobs SET status = 'processing', progress_percent = 1, "
+                "progress_message = 'Starting…', updated_at = CURRENT_TIMESTAMP "
+                "WHERE id = ? AND status = 'queued'",
+                (row["id"],),
+            )
+            if cur.rowcount == 1:
+                _publish_job(row["id"], {"status": "processing", "progress_percent": 1,
+                                         "progress_message": "Starting…", "queue_position": None})
+                return row["id"]
+
+
+def _publish_queue_positions() -> None:
+    """Tell streams of queued jobs that they moved up. Only topics someone is
+    watching are published, so an unwatched backlog costs one SELECT."""
+    with _connect() as conn:
+        queued = [row["id"] for row in conn.execute(
+            "SELECT id FROM translation_jobs WHERE status = 'queued' ORDER BY rowid")]
+    for position, job_id in enumerate(queued, start=1):
+        if progress_hub.has_subscribers(_job_topic(job_id)):
+            _publish_job(job_id, {"queue_position": position})
+
+
+def _job_worker(stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            job_id = _claim_next_job()
+        except sqlite3.Error as e:
+            _log(f"_job_worker: could not claim a job: {e}")
+            job_id = None
+        if job_id is None:
+            _QUEUE_WAKE.acquire(timeout=JOB_POLL_INTERVAL_S)
+            continue
+        try:
+            _publish_queue_positions()
+        except sqlite3.Error as e:
+            _log(f"_job_worker: could not publish queue positions: {e}")
+        _run_job(job_id)
+
+
 # --------------------------------------------------------------------------------------
-# PDF cleanup — translation results live in the DB; the PDFs themselves are transient.
+# PDF cleanup — uploads and scratch files in JOBS_DIR are transient; translated
+# outputs in RESULTS_DIR are kept up to RESULT_CACHE_MAX_MB, least recently used
+# evicted first.
 # --------------------------------------------------------------------------------------
 PDF_RETENTION_SECONDS = 3600  # 1 hour — generous window for download retries
+RESULT_CACHE_MAX_MB = int(os.getenv("TRANSLATOR_RESULT_CACHE_MB", "512") or 512)  # the Render disk is 2 GB
 
 
 def _safe_remove(path: str) -> bool:
@@ -1579,36 +2821,81 @@ def _safe_remove(path: str) -> bool:
         return False
 
 
-def remove_output_after_download(job_id: str, output_path: str) -> None:
-    """BackgroundTask callback: drop the translated PDF after FastAPI streams it
-    back to the user, and null out the DB pointer so a re-download cleanly 404s."""
-    if _safe_remove(output_path):
-        _log(f"remove_output_after_download: deleted {output_path}")
+def mark_result_used(output_path: str) -> bool:
+    """Move a translated PDF to the recent end of the LRU (its mtime is the
+    recency). Returns False if it has already been evicted."""
     try:
-        with _connect() as conn:
-            conn.execute(
-                "UPDATE translation_jobs SET output_path = NULL WHERE id = ?",
-                (job_id,),
-            )
-    except Exception as e:  # pragma: no cover - defensive
-        _log(f"remove_output_after_download: DB update failed: {e}")
+        os.utime(output_path)
+        return True
+    except FileNotFoundError:
+        return False
+    except OSError as e:
+        _log(f"mark_result_used: could not touch {output_path}: {e}")
+        return False
+
+
+def _trim_result_cache(max_mb: Optional[int] = None) -> int:
+    """Evict least recently used outputs until RESULTS_DIR fits in max_mb, and
+    clear output_path on every job row that pointed at an evicted file."""
+    budget = (RESULT_CACHE_MAX_MB if max_mb is None else max_mb) * 1024 * 1024
+    entries = []
+    try:
+        with os.scandir(RESULTS_DIR) as it:
+            for entry in it:
+                if entry.is_file():
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+    except OSError as e:
+        _log(f"_trim_result_cache: cannot list {RESULTS_DIR}: {e}")
+        return 0
+
+    total = sum(size for _, size, _ in entries)
+    removed: list[str] = []
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        if _safe_remove(path):
+            removed.append(path)
+        total -= size
+
+    if removed:
+        try:
+            with _connect() as conn:
+                placeholders = ",".join("?" * len(removed))
+                conn.execute(
+                    f"UPDATE translation_jobs SET output_path = NULL "
+                    f"WHERE output_path IN ({placeholders})",
+                    removed,
+                )
+        except Exception as e:  # pragma: no cover - defensive
+            _log(f"_trim_result_cache: DB update failed: {e}")
+        _log(f"_trim_result_cache: evicted {len(removed)} output(s), "
+             f"{total // (1024 * 1024)} MB kept")
+    return len(removed)
 
 
 def _cleanup_stale_job_files(max_age_seconds: int = PDF_RETENTION_SECONDS) -> int:
     """Sweep JOBS_DIR for files older than max_age_seconds and delete them.
-    Also clear output_path on any DB row whose file we just removed."""
+    Also clear output_path on any DB row whose file we just removed.
+    Uploads of jobs still waiting in the queue are kept however old they are."""
     now = time.time()
     removed: list[str] = []
     try:
         names = os.listdir(JOBS_DIR)
-    except OSError as e:
+        with _connect() as conn:
+            waiting = {
+                _input_path(row["id"]) for row in conn.execute(
+                    "SELECT id FROM translation_jobs "
+                    "WHERE status IN ('received', 'queued', 'processing')")
+            }
+    except (OSError, sqlite3.Error) as e:
         _log(f"_cleanup_stale_job_files: cannot list {JOBS_DIR}: {e}")
         return 0
 
     for fname in names:
         path = os.path.join(JOBS_DIR, fname)
         try:
-            if not os.path.isfile(path):
+            if path in waiting or not os.path.isfile(path):
                 continue
             if (now - os.path.getmtime(path)) <= max_age_seconds:
                 continue
@@ -1,8 +1,8 @@
 """FastAPI routes for the Translator on Drawings sub-tab.
 
-Self-contained — owns its own Jinja2 environment with two search paths:
-  1. ``translator_on_drawings/templates/`` — for ``function_translator_on_drawings.html``
-  2. ``templates/`` — for ``base.html`` and any future shared templates
+Renders through the app's shared Jinja2 environment (``api.templating``), whose
+search path includes ``translator_on_drawings/templates/`` for
+``function_translator_on_drawings.html`` next to ``templates/`` for ``base.html``.
 
 Mounted into the main FastAPI app via ``app.include_router(...)`` in ``api/main.py``.
 """
@@ -11,31 +11,32 @@ from __future__ import annotations
 
 import json
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import APIRouter, File, Request, UploadFile
+from fastapi import APIRouter, File, Query, Request, UploadFile
 from fastapi.responses import FileResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
 from starlette.background import BackgroundTask
 
-from api.database import ENVIRONMENT
+from api.file_streaming import CACHE_IMMUTABLE, RangeFileResponse
+from api.progress import progress_hub, sse_response
+from api.templating import templates
 from translator_on_drawings import pipeline as _translator
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+@asynccontextmanager
+async def _job_workers(app):
+    # Queue workers start with the app, so jobs interrupted by a restart
+    # resume without waiting for the next upload.
+    _translator.start_job_workers()
+    yield
+    _translator.stop_job_workers()
 
-# Self-contained Jinja2 setup — looks in our local templates/ first, then
-# falls back to the project-wide templates/ for base.html.
-templates = Jinja2Templates(directory=[
-    os.path.join(BASE_DIR, "translator_on_drawings", "templates"),
-    os.path.join(BASE_DIR, "templates"),
-])
-templates.env.globals["ENVIRONMENT"] = ENVIRONMENT
 
-router = APIRouter()
+router = APIRouter(lifespan=_job_workers)
 
 
 @router.get("/action/translator_on_drawings/")
-async def action_translator_on_drawings(request: Request):
+def action_translator_on_drawings(request: Request):
     request.session["function_sub_tab_active"] = "translator_on_drawings"
     return templates.TemplateResponse(
         "function_translator_on_drawings.html",
@@ -51,51 +52,101 @@ async def action_translator_on_drawings(request: Request):
 
 
 @router.post("/action/translator_on_drawings/upload/")
-async def translator_upload(request: Request, pdf_file: UploadFile = File(...)):
-    """Accept a PDF, save it, kick off the background translation job, return job_id."""
+def translator_upload(request: Request, pdf_file: UploadFile = File(...)):
+    """Accept a PDF, save it, queue the translation job, return job_id.
+
+    A PDF already translated with the current glossary finishes at once from
+    the earlier job's output instead.
+    """
     if not pdf_file.filename or not pdf_file.filename.lower().endswith(".pdf"):
         return JSONResponse({"error": "Please upload a PDF file."}, status_code=400)
     user_id = request.session.get("id_user")
-    job_id = _translator.create_job(pdf_file.filename, user_id)
-    file_bytes = await pdf_file.read()
-    input_path = _translator.save_uploaded_pdf(job_id, file_bytes)
-    _translator.run_job_in_background(job_id, input_path)
+    file_bytes = pdf_file.file.read()
+    content_hash = _translator.content_sha256(file_bytes)
+    job_id = _translator.create_job(pdf_file.filename, user_id, content_hash)
+    try:
+        if not _translator.complete_from_cache(job_id, content_hash):
+            _translator.save_uploaded_pdf(job_id, file_bytes)
+            _translator.enqueue_job(job_id)
+    except Exception as e:
+        # Without this the job would stay 'received', never picked up.
+        _translator.fail_job(job_id, e)
+        return JSONResponse({"error": f"Could not queue the PDF: {e}", "job_id": job_id},
+                            status_code=500)
     return JSONResponse({"job_id": job_id})
 
 
 @router.get("/action/translator_on_drawings/status/{job_id}")
-async def translator_status(job_id: str):
+def translator_status(job_id: str):
+    """The job's status and counters; mappings are paged from /mappings/."""
     job = _translator.get_job(job_id)
     if not job:
         return JSONResponse({"error": "Job not found."}, status_code=404)
-    summary = {k: v for k, v in job.items() if k != "mappings"}
-    summary["mappings_count"] = len(job.get("mappings", []))
-    if job.get("status") == "done":
-        summary["mappings"] = job.get("mappings", [])
-    return JSONResponse(summary)
+    job["mappings_count"] = (
+        _translator.count_job_mappings(job_id) if job.get("status") == "done" else 0
+    )
+    return JSONResponse(job)
+
+
+@router.get("/action/translator_on_drawings/mappings/{job_id}")
+def translator_mappings(
+    job_id: str,
+    page: int | None = Query(None, ge=1),
+    kind: str | None = Query(None),
+    via: str | None = Query(None),
+    grouped: bool = Query(False),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(_translator.MAPPINGS_PAGE_SIZE, ge=1, le=_translator.MAPPINGS_MAX_LIMIT),
+):
+    """One page of the job's Thai → English mappings, filterable by page, kind and via."""
+    if not _translator.get_job_summary(job_id):
+        return JSONResponse({"error": "Job not found."}, status_code=404)
+    return JSONResponse(_translator.get_job_mappings(
+        job_id, page=page, kind=kind or None, via=via or None, grouped=grouped,
+        offset=offset, limit=limit,
+    ))
+
+
+@router.get("/action/translator_on_drawings/metrics/")
+def translator_metrics(
+    days: int = Query(30, ge=1, le=365),
+    recent: int = Query(20, ge=0, le=200),
+):
+    """Where translation time and tokens went: totals and a per-day trend over
+    the last `days`, plus the most recent jobs' own metrics."""
+    return JSONResponse(_translator.get_metrics_summary(days=days, recent=recent))
+
+
+@router.get("/action/translator_on_drawings/events/{job_id}")
+async def translator_events(job_id: str):
+    """Server-Sent Events: the job's status and progress as they change, ending
+    once it is done or failed. Mappings are paged from /mappings/."""
+    def snapshot() -> dict:
+        return _translator.get_job_summary(job_id) or {"status": "not_found"}
+
+    return sse_response(progress_hub.stream(_translator._job_topic(job_id), snapshot))
 
 
 @router.get("/action/translator_on_drawings/download/{job_id}")
-async def translator_download(job_id: str):
+def translator_download(job_id: str):
     job = _translator.get_job(job_id)
     if not job or job.get("status") != "done" or not job.get("output_path"):
         return JSONResponse({"error": "Translated file not ready."}, status_code=404)
     if not os.path.exists(job["output_path"]):
         return JSONResponse({"error": "Output file missing on disk."}, status_code=404)
     base = os.path.splitext(job.get("filename") or "translated")[0]
-    output_path = job["output_path"]
-    return FileResponse(
-        output_path,
+    _translator.mark_result_used(job["output_path"])
+    # A finished job's output never changes, so the browser may keep it.
+    return RangeFileResponse(
+        job["output_path"],
         media_type="application/pdf",
         filename=f"{base}.translated.pdf",
-        background=BackgroundTask(
-            _translator.remove_output_after_download, job_id, output_path
-        ),
+        cache_control=CACHE_IMMUTABLE,
     )
 
 
 @router.get("/action/translator_on_drawings/database/download/")
-async def translator_database_download():
+def translator_database_download():
     path, filename = _translator.create_database_backup_file()
     return FileResponse(
         path,
@@ -106,10 +157,10 @@ async def translator_database_download():
 
 
 @router.post("/action/translator_on_drawings/database/upload/")
-async def translator_database_upload(database_file: UploadFile = File(...)):
+def translator_database_upload(database_file: UploadFile = File(...)):
     try:
         result = _translator.replace_database_from_bytes(
-            await database_file.read(),
+            database_file.file.read(),
             database_file.filename,
         )
         return JSONResponse({
@@ -125,7 +176,7 @@ async def translator_database_upload(database_file: UploadFile = File(...)):
 
 
 @router.get("/action/translator_on_drawings/glossary/download/{file_format}")
-async def translator_glossary_download(file_format: str):
+def translator_glossary_download(file_format: str):
     try:
         path, filename, media_type = _translator.create_glossary_export_file(file_format)
     except ValueError as e:
@@ -139,10 +190,10 @@ async def translator_glossary_download(file_format: str):
 
 
 @router.post("/action/translator_on_drawings/glossary/upload/")
-async def translator_glossary_upload(glossary_file: UploadFile = File(...)):
+def translator_glossary_upload(glossary_file: UploadFile = File(...)):
     try:
         result = _translator.import_glossary_from_bytes(
-            await glossary_file.read(),
+            glossary_file.file.read(),
             glossary_file.filename,
         )
         return JSONResponse({